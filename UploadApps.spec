@@ -7,7 +7,8 @@ a = Analysis(['uploadapps.py'],
              pathex=['I:\\Projects\\Fortify-on-Demand-Application-Uploader'],
              binaries=[],
              datas=[],
-             hiddenimports=[],
+             hiddenimports=['fodupload.' + module for module in ['constants', 'logs', 'metrics', 'rows', 'client', 'journal', 'api',
+                                                                  'validate', 'importer', 'reconcile', 'dynamic', 'cli']],
              hookspath=[],
              runtime_hooks=[],
              excludes=[],
@@ -0,0 +1,212 @@
+#Times UploadApps.py end to end against the mock FoD API (mockfod.py), for synthetic import files of any size and each way of running the import.
+#For every file size and mode it starts a fresh mock tenant, runs the import in a child process and reports rows per second, rows that
+#failed, the peak memory of the child, and the 50th and 99th percentile latency of each endpoint as the uploader saw it, e.g.
+#
+#   python bench/benchmark.py --rows 100 1000 10000 --modes sequential threads async --latency 0.05 -d
+#
+#Files are generated once per size in the work directory and reused by later runs. The uploader's rate limit is lifted by default
+#(--rate), so what is measured is the uploader and the mock's latency, not the limiter
+import argparse
+import csv
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+BENCH_DIR   = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR    = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+from mockfod import startMockFod
+
+#Uploader arguments for each mode. Extra modes can be given on the command line as NAME=ARGUMENTS
+MODES = OrderedDict([
+    ('sequential',  '--workers 1'),
+    ('threads',     '--workers 8'),
+    ('async',       '--async --workers 32'),
+])
+
+def generateSheet(path, rowCount, userCount):
+    #A synthetic import file with every template column and a Business Units custom attribute column. Owners are spread over the mock's
+    #users and the dynamic scan columns cycle through the formats the template allows, so rows look like a real import
+    sys.path.insert(0, REPO_DIR)
+    from fodupload.rows import TEMPLATE_COLUMNS
+    headers = [header for field, header in TEMPLATE_COLUMNS] + ['Business Units']
+    rows = (syntheticRow(number, userCount) for number in range(rowCount))
+    if path.endswith('.csv'):
+        with open(path, 'w', newline='', encoding='utf-8') as sheetFile:
+            writer = csv.writer(sheetFile)
+            writer.writerow(headers)
+            writer.writerows(rows)
+        return
+    import openpyxl
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet('Sheet1')
+    sheet.append(headers)
+    for row in rows:
+        sheet.append(row)
+    workbook.save(path)
+
+def syntheticRow(number, userCount):
+    availability = ['ALL DAY', 'Monday:0800-1700;Tuesday:0800-1700;Wednesday:0800-1700;', 'Saturday:0000-2400;Sunday:0000-2400;'][number % 3]
+    return ['Bench App ' + str(number), ['High', 'Medium', 'Low'][number % 3], 'Web/Thick Client', 'R1',
+            ['Development', 'QA/Test', 'Production'][number % 3], 'User' + str(number % userCount),
+            'https://app' + str(number) + '.example.com', ['Dynamic', 'Dynamic+'][number % 2], 'Eastern Standard Time',
+            ['Internal', 'External'][number % 2], '/logout;/admin' if number % 2 else '', ['Do not repeat', 'Monthly'][number % 2],
+            availability, 'NoAuthentication', '', '', '', '', 'True', 'True', ['Retail', 'Bank', 'Insurance'][number % 3]]
+
+def runMode(sheetPath, rowCount, modeName, modeArguments, args):
+    #Runs one import in a child process, against a mock tenant of its own, and returns the child's measurements
+    server = startMockFod(latency=args.latency, jitter=args.jitter, throttle=args.throttle, rateLimit=args.rate_limit,
+                          tokenTtl=args.token_ttl, userCount=args.users)
+    runDirectory = tempfile.mkdtemp(prefix='run-' + modeName + '-', dir=args.work_dir)
+    resultPath = os.path.join(runDirectory, 'result.json')
+    uploaderArguments = [sheetPath, 'bench-key', 'bench-secret', '--api-url', server.url, '--rate', args.rate, '--cache-ttl', '0']
+    uploaderArguments += (['-d'] if args.d else []) + modeArguments.split() + args.extra.split()
+    try:
+        with open(os.path.join(runDirectory, 'output.txt'), 'w') as output:
+            subprocess.call([sys.executable, os.path.abspath(__file__), '--child', resultPath, '--'] + uploaderArguments,
+                            cwd=runDirectory, stdout=output, stderr=subprocess.STDOUT)
+    finally:
+        server.shutdown()
+        server.server_close()
+    if not os.path.exists(resultPath):
+        return {'mode': modeName, 'rows': rowCount, 'error': "the import didn't finish, see " + os.path.join(runDirectory, 'output.txt')}
+    with open(resultPath) as resultFile:
+        result = json.load(resultFile)
+    result.update({'mode': modeName, 'rows': rowCount, 'mockCalls': server.state.calls})
+    return result
+
+def runChild(resultPath, uploaderArguments):
+    #Runs in the child process: imports the uploader, times every request it sends by endpoint, runs its main() and writes the measurements
+    sys.path.insert(0, REPO_DIR)
+    from fodupload.cli import main as uploaderMain
+    from fodupload.client import AsyncFodClient, FodClient
+    from fodupload.journal import ImportJournal
+    latencies = {}
+    latencyLock = threading.Lock()
+
+    def record(endpoint, method, seconds):
+        with latencyLock:
+            latencies.setdefault(method.upper() + ' ' + endpoint, []).append(seconds)
+
+    def timedSend(self, endpoint, method, path, *sendArgs, **sendKwargs):
+        started = time.perf_counter()
+        try:
+            return originalSend(self, endpoint, method, path, *sendArgs, **sendKwargs)
+        finally:
+            record(endpoint, method, time.perf_counter() - started)
+
+    async def timedSendAsync(self, endpoint, method, path, *sendArgs, **sendKwargs):
+        started = time.perf_counter()
+        try:
+            return await originalSendAsync(self, endpoint, method, path, *sendArgs, **sendKwargs)
+        finally:
+            record(endpoint, method, time.perf_counter() - started)
+
+    originalSend = FodClient.send
+    originalSendAsync = AsyncFodClient.send
+    FodClient.send = timedSend
+    AsyncFodClient.send = timedSendAsync
+
+    started = time.perf_counter()
+    try:
+        uploaderMain(uploaderArguments)
+    except SystemExit:
+        pass
+    elapsed = time.perf_counter() - started
+
+    journal = ImportJournal(os.path.join('log', 'FodImport.db'), uploaderArguments[0])
+    completed, failed = journal.connection.execute("SELECT SUM(lastError IS NULL), SUM(lastError IS NOT NULL) FROM rows").fetchone()
+    with open(resultPath, 'w') as resultFile:
+        json.dump({'seconds': elapsed, 'completedRows': completed or 0, 'failedRows': failed or 0, 'peakMemoryMb': peakMemoryMb(),
+                   'latencies': dict((endpoint, summarise(values)) for endpoint, values in latencies.items())}, resultFile)
+
+def peakMemoryMb():
+    #Peak resident memory of this process. The resource module is not available on Windows, where None is reported
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    #Linux reports kilobytes, macOS bytes
+    return round(peak / (1024.0 * 1024.0 if sys.platform == 'darwin' else 1024.0), 1)
+
+def summarise(values):
+    values = sorted(values)
+    return {'count': len(values), 'p50Ms': round(percentile(values, 50) * 1000, 1), 'p99Ms': round(percentile(values, 99) * 1000, 1)}
+
+def percentile(sortedValues, percent):
+    if not sortedValues:
+        return 0.0
+    return sortedValues[min(len(sortedValues) - 1, int(round(percent / 100.0 * (len(sortedValues) - 1))))]
+
+def printReport(results):
+    print("")
+    print("%-12s %8s %9s %9s %8s %10s" % ('mode', 'rows', 'seconds', 'rows/s', 'failed', 'peak MB'))
+    for result in results:
+        if 'error' in result:
+            print("%-12s %8d  %s" % (result['mode'], result['rows'], result['error']))
+            continue
+        print("%-12s %8d %9.2f %9.1f %8d %10s" % (result['mode'], result['rows'], result['seconds'], result['rows'] / max(result['seconds'], 1e-9),
+                                                 result['failedRows'], result['peakMemoryMb']))
+    for result in results:
+        if 'error' in result:
+            continue
+        print("")
+        print(result['mode'] + ", " + str(result['rows']) + " rows")
+        print("  %-28s %8s %9s %9s" % ('endpoint', 'requests', 'p50 ms', 'p99 ms'))
+        for endpoint, summary in sorted(result['latencies'].items()):
+            print("  %-28s %8d %9.1f %9.1f" % (endpoint, summary['count'], summary['p50Ms'], summary['p99Ms']))
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ['--child']:
+        return runChild(argv[1], argv[3:])
+
+    parser = argparse.ArgumentParser(description="End to end throughput benchmark of UploadApps.py against a local mock of the FoD API")
+    parser.add_argument('--rows', type=int, nargs='+', default=[100, 1000], help="Sizes of the import files to generate and import. Default is 100 1000")
+    parser.add_argument('--modes', nargs='+', default=list(MODES), help="Modes to run, from " + ", ".join(MODES) + ", or NAME=\"UPLOADER ARGUMENTS\". Default is all of them")
+    parser.add_argument('--format', choices=['xlsx', 'csv'], default='xlsx', help="Type of import file to generate. Default is xlsx")
+    parser.add_argument('-d', action='store_true', default=False, help="Fill out the dynamic scan form of every release too")
+    parser.add_argument('--rate', default='100000/s', help="--rate passed to the uploader. Default is 100000/s, i.e. no limit")
+    parser.add_argument('--extra', default='', help="More arguments passed to the uploader in every mode")
+    parser.add_argument('--latency', type=float, default=0.02, help="Seconds the mock adds to every response. Default is 0.02")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Up to this many more seconds the mock adds at random. Default is 0")
+    parser.add_argument('--throttle', type=float, default=0.0, help="Fraction of requests the mock answers with 429. Default is 0")
+    parser.add_argument('--rate-limit', type=int, default=0, help="Requests per second above which the mock answers with 429. Default is no limit")
+    parser.add_argument('--token-ttl', type=int, default=21600, help="Seconds the mock accepts a bearer token for. Default is 21600")
+    parser.add_argument('--users', type=int, default=500, help="Number of users in the mock tenant. Default is 500")
+    parser.add_argument('--work-dir', default=os.path.join(BENCH_DIR, 'work'), help="Directory for generated files and run logs. Default is bench/work")
+    parser.add_argument('--json', help="Also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    modes = OrderedDict()
+    for mode in args.modes:
+        modeName, separator, modeArguments = mode.partition('=')
+        if not separator and modeName not in MODES:
+            parser.error("Unknown mode '" + mode + "', expected one of " + ", ".join(MODES) + " or NAME=\"UPLOADER ARGUMENTS\"")
+        modes[modeName] = modeArguments if separator else MODES[modeName]
+    if not os.path.exists(args.work_dir):
+        os.makedirs(args.work_dir)
+
+    results = []
+    for rowCount in args.rows:
+        sheetPath = os.path.join(args.work_dir, 'bench-' + str(rowCount) + '.' + args.format)
+        if not os.path.exists(sheetPath):
+            print("Generating " + sheetPath)
+            generateSheet(sheetPath, rowCount, args.users)
+        for modeName, modeArguments in modes.items():
+            print("Importing " + str(rowCount) + " rows, " + modeName + " (" + modeArguments + ")")
+            results.append(runMode(sheetPath, rowCount, modeName, modeArguments, args))
+
+    printReport(results)
+    if args.json:
+        with open(args.json, 'w') as jsonFile:
+            json.dump(results, jsonFile, indent=2)
+
+if __name__ == '__main__':
+    sys.exit(main())
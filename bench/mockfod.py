@@ -0,0 +1,271 @@
+#A stand-in for the parts of the Fortify on Demand API that UploadApps.py uses, so the uploader can be run and timed without a real tenant.
+#It keeps everything in memory and can be made slow (latency), busy (429 responses) and strict about tokens (tokens that expire), e.g.
+#
+#   python bench/mockfod.py --port 8765 --latency 0.05 --throttle 0.01 --token-ttl 600
+#   python UploadApps.py sheet.xlsx key secret --api-url http://127.0.0.1:8765
+#
+#Any key and secret are accepted. GET /mock/stats returns the number of requests per endpoint and what has been created.
+#benchmark.py starts one of these for each run with startMockFod
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import urlparse, parse_qs
+
+#The API never returns more than this many items per page, whatever limit is asked for
+PAGE_LIMIT = 50
+
+class MockFodState(object):
+    #The tenant: users, custom attributes, applications, releases and dynamic scan setups, and the tokens handed out
+    def __init__(self, userCount=500):
+        self.lock           = threading.Lock()
+        self.nextId         = 1000
+        self.users          = [{'userId': 100 + number, 'userName': 'User' + str(number)} for number in range(userCount)]
+        self.attributes     = [{'id': 7, 'name': 'Business Units', 'attributeType': 'Application', 'attributeDataType': 'Picklist',
+                                'picklistValues': [{'id': 71, 'name': 'Retail'}, {'id': 72, 'name': 'Bank'}, {'id': 73, 'name': 'Insurance'}]}]
+        self.applications   = {}
+        self.releases       = {}
+        self.scanSetups     = {}
+        self.tokens         = {}
+        self.calls          = {}
+
+    def newId(self):
+        with self.lock:
+            self.nextId += 1
+            return self.nextId
+
+    def count(self, name):
+        with self.lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+class MockFodServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, jitter=0.0, throttle=0.0, rateLimit=0, tokenTtl=21600, userCount=500):
+        HTTPServer.__init__(self, address, MockFodHandler)
+        self.latency    = latency
+        self.jitter     = jitter
+        self.throttle   = throttle
+        self.rateLimit  = rateLimit
+        self.tokenTtl   = tokenTtl
+        self.state      = MockFodState(userCount)
+        self.rateLock   = threading.Lock()
+        self.rateWindow = (0, 0)
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:' + str(self.server_address[1])
+
+    def overRateLimit(self):
+        #rateLimit is a number of requests per whole second, as a tenant's API limit is
+        if not self.rateLimit:
+            return False
+        with self.rateLock:
+            second, requestsSent = self.rateWindow
+            now = int(time.time())
+            if now != second:
+                second, requestsSent = now, 0
+            self.rateWindow = (second, requestsSent + 1)
+            return requestsSent >= self.rateLimit
+
+class MockFodHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    #Headers and body are written separately, and with Nagle's algorithm on every response would wait for the client's delayed ACK
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.handle_request('GET')
+
+    def do_POST(self):
+        self.handle_request('POST')
+
+    def do_PUT(self):
+        self.handle_request('PUT')
+
+    def reply(self, status, body, headers=None):
+        content = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def readBody(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length).decode('utf-8') if length else ''
+
+    def readJson(self, body):
+        #A body that isn't valid JSON raises ValueError, which handle_request answers with a 400 as FoD does
+        return json.loads(body)
+
+    def handle_request(self, method):
+        server  = self.server
+        state   = server.state
+        url     = urlparse(self.path)
+        path    = url.path
+        query   = parse_qs(url.query)
+        body    = self.readBody() if method in ('POST', 'PUT') else ''
+
+        if path == '/mock/stats':
+            with state.lock:
+                return self.reply(200, {'calls': state.calls, 'applications': len(state.applications), 'releases': len(state.releases),
+                                        'scanSetups': len(state.scanSetups)})
+
+        endpoint = method + ' ' + re.sub(r'/\d+', '/{id}', path)
+        state.count(endpoint)
+        if server.latency or server.jitter:
+            time.sleep(server.latency + random.uniform(0, server.jitter))
+
+        if server.overRateLimit() or (server.throttle and random.random() < server.throttle):
+            state.count('429')
+            return self.reply(429, {'errors': [{'message': 'Too many requests'}]}, {'Retry-After': '1'})
+
+        if path == '/oauth/token' and method == 'POST':
+            token = 'mock-' + str(state.newId())
+            with state.lock:
+                state.tokens[token] = time.time() + server.tokenTtl
+            return self.reply(200, {'access_token': token, 'token_type': 'bearer', 'expires_in': server.tokenTtl})
+
+        if path.startswith('/api/'):
+            authorization = self.headers.get('Authorization') or ''
+            token = authorization[7:] if authorization.lower().startswith('bearer ') else ''
+            with state.lock:
+                expiresAt = state.tokens.get(token, 0)
+            if expiresAt < time.time():
+                state.count('401')
+                return self.reply(401, {'errors': [{'message': 'Unauthorized'}]})
+
+        try:
+            return self.route(method, path, query, body)
+        except (KeyError, ValueError) as error:
+            return self.reply(400, {'errors': [{'message': repr(error)}], 'body': body})
+
+    def route(self, method, path, query, body):
+        state = self.server.state
+        if path == '/api/v3/users' and method == 'GET':
+            return self.page(state.users, query)
+        if path == '/api/v3/attributes' and method == 'GET':
+            return self.page(state.attributes, query)
+        if path == '/api/v3/applications' and method == 'GET':
+            return self.page(list(state.applications.values()), query)
+        if path == '/api/v3/applications' and method == 'POST':
+            return self.createApplication(self.readJson(body))
+        if path == '/api/v3/releases' and method == 'GET':
+            return self.page(list(state.releases.values()), query)
+        if path == '/api/v3/releases' and method == 'POST':
+            return self.createRelease(self.readJson(body))
+
+        match = re.match(r'^/api/v3/applications/(\d+)$', path)
+        if match and method == 'PUT':
+            application = state.applications[int(match.group(1))]
+            with state.lock:
+                application.update(self.readJson(body))
+            return self.reply(200, {'success': True})
+        if match and method == 'GET':
+            return self.reply(200, state.applications[int(match.group(1))])
+
+        match = re.match(r'^/api/v3/releases/(\d+)$', path)
+        if match and method == 'PUT':
+            release = state.releases[int(match.group(1))]
+            update = self.readJson(body)
+            with state.lock:
+                release.update((field, update[field]) for field in ('releaseName', 'releaseDescription', 'sdlcStatusType', 'ownerId') if field in update)
+            return self.reply(200, {'success': True})
+
+        match = re.match(r'^/api/v3/applications/(\d+)/releases$', path)
+        if match and method == 'GET':
+            applicationId = int(match.group(1))
+            return self.page([release for release in state.releases.values() if release['applicationId'] == applicationId], query)
+
+        match = re.match(r'^/api/v3/releases/(\d+)/dynamic-scans/scan-setup$', path)
+        if match and int(match.group(1)) in state.releases:
+            releaseId = int(match.group(1))
+            if method == 'PUT':
+                scanSetup = self.readJson(body)
+                with state.lock:
+                    state.scanSetups[releaseId] = scanSetup
+                return self.reply(200, {'success': True})
+            if method == 'GET':
+                return self.reply(200, state.scanSetups.get(releaseId, {}))
+
+        return self.reply(404, {'errors': [{'message': 'No route for ' + method + ' ' + path}]})
+
+    def page(self, items, query):
+        #filters=field:value|value+field:value, as the API does, then offset paging with at most PAGE_LIMIT items a page
+        for condition in (query.get('filters') or [''])[0].split('+'):
+            if condition:
+                field, separator, values = condition.partition(':')
+                wanted = set(value.lower() for value in values.split('|'))
+                items = [item for item in items if str(item.get(field)).lower() in wanted]
+        offset  = int((query.get('offset') or ['0'])[0])
+        limit   = min(int((query.get('limit') or [str(PAGE_LIMIT)])[0]), PAGE_LIMIT)
+        return self.reply(200, {'items': items[offset:offset + limit], 'totalCount': len(items)})
+
+    def createApplication(self, payload):
+        state = self.server.state
+        if payload.get('businessCriticalityType') not in ('High', 'Medium', 'Low'):
+            return self.reply(422, {'errors': [{'message': 'Invalid businessCriticalityType'}]})
+        with state.lock:
+            if any(application['applicationName'].lower() == payload['applicationName'].lower() for application in state.applications.values()):
+                return self.reply(422, {'errors': [{'message': 'Application name already exists'}]})
+        applicationId = state.newId()
+        releaseId = state.newId()
+        with state.lock:
+            state.applications[applicationId] = {'applicationId': applicationId, 'applicationName': payload['applicationName'],
+                                                 'applicationDescription': '', 'applicationType': payload['applicationType'],
+                                                 'businessCriticalityType': payload['businessCriticalityType'], 'emailList': '',
+                                                 'attributes': payload.get('attributes') or []}
+            state.releases[releaseId] = {'releaseId': releaseId, 'releaseName': payload['releaseName'], 'releaseDescription': '', 'applicationId': applicationId,
+                                         'applicationName': payload['applicationName'], 'sdlcStatusType': payload['sdlcStatusType'], 'ownerId': payload['ownerId']}
+        #As the real API does, only the application ID is returned, and the release has to be looked up
+        return self.reply(201, {'applicationId': applicationId, 'success': True})
+
+    def createRelease(self, payload):
+        state = self.server.state
+        releaseId = state.newId()
+        with state.lock:
+            application = state.applications[int(payload['applicationId'])]
+            state.releases[releaseId] = {'releaseId': releaseId, 'releaseName': payload['releaseName'], 'releaseDescription': payload.get('releaseDescription') or '',
+                                         'applicationId': application['applicationId'], 'applicationName': application['applicationName'],
+                                         'sdlcStatusType': payload['sdlcStatusType'], 'ownerId': payload.get('ownerId')}
+        return self.reply(201, {'releaseId': releaseId, 'success': True})
+
+def startMockFod(port=0, **settings):
+    #Starts a mock server on a background thread and returns it. Port 0 picks a free port, see server.url. Call server.shutdown() to stop it
+    server = MockFodServer(('127.0.0.1', port), **settings)
+    thread = threading.Thread(target=server.serve_forever, name='mockfod')
+    thread.daemon = True
+    thread.start()
+    return server
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="A local stand-in for the Fortify on Demand API endpoints used by UploadApps.py")
+    parser.add_argument('--port', type=int, default=8765, help="Port to listen on (127.0.0.1 only). Default is 8765")
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every response. Default is 0")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Up to this many more seconds added at random to every response. Default is 0")
+    parser.add_argument('--throttle', type=float, default=0.0, help="Fraction of requests (0 to 1) answered with 429 Too Many Requests at random. Default is 0")
+    parser.add_argument('--rate-limit', type=int, default=0, help="Requests per second above which requests are answered with 429. Default is no limit")
+    parser.add_argument('--token-ttl', type=int, default=21600, help="Seconds a bearer token is accepted for. Default is 21600 (six hours)")
+    parser.add_argument('--users', type=int, default=500, help="Number of users in the tenant, named User0, User1 and so on. Default is 500")
+    args = parser.parse_args(argv)
+
+    server = MockFodServer(('127.0.0.1', args.port), latency=args.latency, jitter=args.jitter, throttle=args.throttle, rateLimit=args.rate_limit,
+                           tokenTtl=args.token_ttl, userCount=args.users)
+    print("Mock FoD API listening on " + server.url)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    sys.exit(main())
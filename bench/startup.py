@@ -0,0 +1,94 @@
+#Times how long UploadApps.py takes to start: --help, which only builds the argument parser, and --validate of a small file against a
+#local mock of the FoD API (mockfod.py), which loads the request client but not the import pipeline. Each command is run a number of times
+#in a fresh interpreter, and so is a bare "python -c pass". The budgets are ratios of a command's median to that bare start, so they hold
+#on a slow build agent as well as on a fast laptop, e.g.
+#
+#   python bench/startup.py --runs 15 --help-budget 6 --validate-budget 20
+#
+#It exits with 1 when a command is over its budget, so it can be run by a build to catch an import that makes every run slower.
+#--report-only prints the timings without checking them
+import argparse
+import csv
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR   = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR    = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+from mockfod import startMockFod
+
+#Medians as multiples of the median bare interpreter start, with room to spare over what a developer laptop measures. There, with a
+#bare start of about 17ms, --help takes about 85ms (5x) and --validate about 290ms (17x), most of --validate being the import of requests.
+#Before the uploader was split in to the fodupload package, with the request client, the pipeline and asyncio imported only by the
+#commands that use them, --help took about 320ms (19x) and --validate about 340ms (20x)
+HELP_BUDGET     = 8.0
+VALIDATE_BUDGET = 25.0
+
+def writeSheet(path, rowCount):
+    #A small import file with every template column, owned by the mock tenant's users
+    sys.path.insert(0, REPO_DIR)
+    from fodupload.rows import TEMPLATE_COLUMNS
+    from benchmark import syntheticRow
+    with open(path, 'w', newline='', encoding='utf-8') as sheetFile:
+        writer = csv.writer(sheetFile)
+        writer.writerow([header for field, header in TEMPLATE_COLUMNS] + ['Business Units'])
+        writer.writerows(syntheticRow(number, 500) for number in range(rowCount))
+
+def timeCommand(command, runs, workDirectory):
+    #Milliseconds each run of the command took, from starting the interpreter to it exiting
+    timings = []
+    for run in range(runs):
+        started = time.perf_counter()
+        exitCode = subprocess.call(command, cwd=workDirectory, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append((time.perf_counter() - started) * 1000)
+        if exitCode != 0:
+            raise RuntimeError(" ".join(command) + " exited with " + str(exitCode))
+    return sorted(timings)
+
+def median(sortedValues):
+    middle = len(sortedValues) // 2
+    return sortedValues[middle] if len(sortedValues) % 2 else (sortedValues[middle - 1] + sortedValues[middle]) / 2.0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Startup time of UploadApps.py --help and --validate, checked against a budget relative to a bare interpreter start")
+    parser.add_argument('--runs', type=int, default=11, help="Times each command is run. Default is 11")
+    parser.add_argument('--rows', type=int, default=10, help="Rows in the file --validate checks. Default is 10")
+    parser.add_argument('--help-budget', type=float, default=HELP_BUDGET, help="Times a bare 'python -c pass' start --help may take (median). Default is " + str(HELP_BUDGET))
+    parser.add_argument('--validate-budget', type=float, default=VALIDATE_BUDGET, help="Times a bare 'python -c pass' start --validate may take (median). Default is " + str(VALIDATE_BUDGET))
+    parser.add_argument('--report-only', action='store_true', default=False, help="Print the timings without checking them against the budgets")
+    args = parser.parse_args(argv)
+
+    workDirectory = tempfile.mkdtemp(prefix='startup-')
+    sheetPath = os.path.join(workDirectory, 'startup.csv')
+    writeSheet(sheetPath, args.rows)
+    uploader = [sys.executable, os.path.join(REPO_DIR, 'UploadApps.py')]
+    server = startMockFod()
+    try:
+        validate = uploader + [sheetPath, 'bench-key', 'bench-secret', '--api-url', server.url, '--validate']
+        #One run first so the interpreter's bytecode caches are written and the local cache has the tenant's users, as for any run but the first
+        timeCommand(validate, 1, workDirectory)
+        bare = timeCommand([sys.executable, '-c', 'pass'], args.runs, workDirectory)
+        results = [('--help', timeCommand(uploader + ['--help'], args.runs, workDirectory), args.help_budget),
+                   ('--validate', timeCommand(validate, args.runs, workDirectory), args.validate_budget)]
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    print("%-12s %9s %9s %9s %9s %9s" % ('command', 'min ms', 'median ms', 'max ms', 'x bare', 'budget'))
+    print("%-12s %9.1f %9.1f %9.1f" % ('-c pass', bare[0], median(bare), bare[-1]))
+    overBudget = []
+    for name, timings, budget in results:
+        ratio = median(timings) / median(bare)
+        print("%-12s %9.1f %9.1f %9.1f %9.1f %9.1f" % (name, timings[0], median(timings), timings[-1], ratio, budget))
+        if ratio > budget:
+            overBudget.append(name)
+    if overBudget and not args.report_only:
+        print("Over budget: " + ", ".join(overBudget))
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
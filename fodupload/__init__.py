@@ -0,0 +1,54 @@
+#Onboards applications in to Fortify on Demand from an import spreadsheet. The command line is fodupload.cli.main (UploadApps.py, or
+#python -m fodupload), and everything it does can be called from Python too, e.g. fodupload.AddApplications(...) from threads or
+#await fodupload.AddApplicationsAsync(...) from an event loop.
+#Importing the package has no side effects and imports none of its modules: each name below is imported from its module the first time
+#it is used, so a tool that only needs the template columns doesn't pay for requests, openpyxl or sqlite3. fodupload.metrics is the
+#metrics module, and the registry of the run's metrics is fodupload.metrics.metrics
+import importlib
+
+_EXPORTS = {
+    'constants':   ['PAGE_WORKERS', 'OWNER_BATCH_SIZE', 'RELEASE_BATCH_SIZE', 'RELEASE_BATCH_WAIT', 'ROW_READ_CHUNK', 'AVAILABILITY_CACHE_SIZE', 'LATENCY_BUCKETS',
+                    'TOKEN_REFRESH_MARGIN', 'DEFAULT_TOKEN_LIFETIME', 'RETRY_ATTEMPTS', 'RETRY_BASE_DELAY', 'RETRY_MAX_DELAY',
+                    'CIRCUIT_FAILURE_THRESHOLD', 'CIRCUIT_RESET_SECONDS'],
+    'logs':        ['logger', 'consoleLogger', 'progressLogger', 'LOG_FIELDS', 'SECRET_PATTERN', 'BEARER_PATTERN', 'redact', 'rowLog',
+                    'RedactSecrets', 'JsonLineFormatter', 'setupLogging'],
+    'metrics':     ['Metrics', 'prometheusLabels', 'timed', 'MetricsExporter', 'writeAtomically', 'recordRequest'],
+    'rows':        ['TEMPLATE_COLUMNS', 'REQUIRED_FIELDS', 'BUSINESS_CRITICALITIES', 'APPLICATION_TYPES', 'SDLC_STATUSES', 'ASSESSMENT_TYPES',
+                    'ENVIRONMENT_FACINGS', 'REPEAT_FREQUENCIES', 'FLAG_VALUES', 'DYNAMIC_FIELDS', 'ImportFileError', 'ImportRow',
+                    'DynamicScanSettings', 'RowReader', 'inShard', 'shardOf', 'normalizeHeader', 'cellText', 'collectOwners', 'DAYS', 'ALL_WEEK',
+                    'generateSiteAvailability', 'blockout', 'parseSiteAvailability', 'dayNumber', 'clockMinutes', 'setExclusions'],
+    'client':      ['RateLimiter', 'TokenBucket', 'RetryPolicy', 'CircuitBreaker', 'CircuitBreakers', 'FodClient', 'logRetry', 'GetToken',
+                    'tokenRequest', 'tokenFromResponse', 'AuthenticationError', 'TokenManager', 'LocalCache', 'AsyncFodClient', 'GetTokenAsync'],
+    'journal':     ['ImportJournal', 'RowSync', 'contentHash', 'reportRemoved', 'DeadLetterFile'],
+    'api':         ['createApplication', 'applicationPayload', 'toJson', 'applicationCreated', 'createRelease', 'releasePayload', 'releaseCreated',
+                    'updateApplication', 'applicationUpdatePayload', 'applicationUpdated', 'updateRelease',
+                    'releaseUpdatePayload', 'releaseUpdated', 'warnApplicationType', 'ApplicationIndex', 'getUsers', 'usersByName',
+                    'resolveOwners', 'cachedOwners', 'ownerBatches', 'saveOwners', 'findUsers', 'userFilter', 'matchUsers', 'updateUsers',
+                    'usersTailOffset', 'mergeNewUsers', 'getReleaseId', 'lookupReleases', 'releaseFilter', 'firstReleases', 'populateDynamicForm',
+                    'dynamicFormRequest', 'dynamicFormSent', 'setCustomAttributeValue', 'attributeDefinition', 'AttributeCatalog',
+                    'getAllPagesConcurrently', 'getAllPages', 'getUsersAsync', 'resolveOwnersAsync', 'findUsersAsync', 'loadAttributesAsync',
+                    'createApplicationAsync', 'createReleaseAsync', 'updateApplicationAsync', 'updateReleaseAsync', 'getReleaseIdAsync', 'lookupReleasesAsync',
+                    'populateDynamicFormAsync', 'getAllPagesAsync'],
+    'validate':    ['ValidateApplications', 'RowValidator'],
+    'importer':    ['AddApplications', 'parseStageWorkers', 'ImportTask', 'PipelineStage', 'ImportPipeline', 'RowProgress', 'AddApplicationsAsync',
+                    'AsyncImport', 'dynamicFormWanted', 'AsyncReleaseLookup'],
+    'reconcile':   ['ReconcileApplications', 'ReconcileResult', 'comparable', 'scanSetupDifferences', 'fetchScanSetup', 'writeReconcileReport'],
+    'dynamic':     ['ConfigureDynamicScans', 'DynamicSetupResult', 'releaseIdsFor', 'releaseIdsFromJournal', 'releaseIdsFromLookup',
+                    'releaseIdsFromCsv', 'csvValue', 'writeConfigureReport'],
+    'cli':         ['buildParser', 'buildReconcileParser', 'buildConfigureDynamicParser', 'addApiArguments', 'addLogArguments', 'main', 'runReconcile', 'runConfigureDynamic', 'runImport', 'importWith',
+                    'retryPolicy', 'circuitBreakers', 'readCredentials', 'importShards', 'importShard', 'maskedKey'],
+}
+_MODULES = dict((name, module) for module, names in _EXPORTS.items() for name in names)
+
+__all__ = sorted(_MODULES)
+
+def __getattr__(name):
+    module = _MODULES.get(name)
+    if module is None:
+        raise AttributeError("module 'fodupload' has no attribute '" + name + "'")
+    value = getattr(importlib.import_module('.' + module, __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_MODULES))
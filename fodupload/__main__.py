@@ -0,0 +1,10 @@
+#python -m fodupload runs the same command line as UploadApps.py
+import sys
+from .cli import main
+
+if __name__ == '__main__':
+    if getattr(sys, 'frozen', False):
+        #Needed by the --credentials worker processes when this is built in to an executable
+        import multiprocessing
+        multiprocessing.freeze_support()
+    main()
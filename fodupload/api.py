@@ -0,0 +1,592 @@
+#The FoD API calls of an import, each with the payload builders and response readers it shares with its asyncio counterpart, and the
+#tenant data (users, custom attributes, applications and releases) that is looked up once per run
+import json
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from .constants import OWNER_BATCH_SIZE, PAGE_WORKERS, USER_ORDER
+from .logs import logger, rowLog
+from .metrics import timed
+from .client import LocalCache
+
+def createApplication(client, row, ownerId, attributeArray):
+    #Creates the application (and its first release) for a row, and returns the new application ID with the release ID, when the response has it
+    payload = applicationPayload(row, ownerId, attributeArray)
+    logger.debug("Application payload: %s", payload, extra=rowLog(row, 'create'))
+
+    response = client.request("Post", '/api/v3/applications', data=payload, headers={'content-type': "application/json"})
+    return applicationCreated(row, response)
+
+#The payload builders and response readers below are shared by the requests based functions and their asyncio counterparts
+#(createApplicationAsync and so on), so both send exactly the same requests
+
+def applicationPayload(row, ownerId, attributeArray):
+    payload = OrderedDict([('applicationName', row.applicationName), ('applicationType', row.fodApplicationType()), ('releaseName', row.releaseName),
+                           ('ownerId', int(ownerId)), ('businessCriticalityType', row.businessCriticality)])
+    if attributeArray:
+        payload['attributes'] = attributeArray
+    payload['sdlcStatusType'] = row.fodSdlcStatus()
+    return toJson(payload)
+
+def toJson(payload):
+    #The one serializer for every request body, so values are always escaped properly whatever the import file has in them
+    return json.dumps(payload, separators=(',', ':'))
+
+def applicationCreated(row, response):
+    logger.debug("Application: %s API Response: %s", row.get('applicationName'), response.text, extra=rowLog(row, 'create', status=response.status_code))
+    #status_code rather than requests' ok, as in applicationUpdated, so httpx responses are checked the same way
+    if response.status_code >= 400:
+        raise ValueError("Creating application " + row.get('applicationName') + " failed: " + response.text)
+    responseJson = json.loads(response.text)
+    return responseJson['applicationId'], responseJson.get('releaseId')
+
+def createRelease(client, row, applicationId):
+    #Adds the row's release to an application that already exists, and returns the new release ID
+    response = client.request("Post", '/api/v3/releases', data=releasePayload(row, applicationId), headers={'content-type': "application/json"})
+    return releaseCreated(row, response)
+
+def releasePayload(row, applicationId):
+    return toJson({'applicationId': applicationId, 'releaseName': row.releaseName, 'releaseDescription': "",
+                   'copyState': False, 'sdlcStatusType': row.fodSdlcStatus()})
+
+def releaseCreated(row, response):
+    logger.debug("Application: %s Release: %s API Response: %s", row.get('applicationName'), row.get('releaseName'), response.text,
+                 extra=rowLog(row, 'create', status=response.status_code))
+    if response.status_code >= 400:
+        raise ValueError("Creating release " + row.get('releaseName') + " of application " + row.get('applicationName') + " failed: " + response.text)
+    return json.loads(response.text)['releaseId']
+
+def updateApplication(client, row, application, attributeArray):
+    #Brings an existing application's business criticality (and custom attributes, when the row has any) in line with the row. The rest of
+    #the application is sent back as FoD has it
+    response = client.request("Put", '/api/v3/applications/' + str(application['applicationId']), data=applicationUpdatePayload(row, application, attributeArray),
+                              headers={'content-type': "application/json"})
+    applicationUpdated(row, application, response)
+
+def applicationUpdatePayload(row, application, attributeArray):
+    if not attributeArray:
+        attributeArray = [{'id': attribute['id'], 'value': attribute['value']} for attribute in application.get('attributes') or []]
+    return toJson({'applicationName': application['applicationName'], 'applicationDescription': application.get('applicationDescription') or "",
+                   'businessCriticalityType': row.businessCriticality, 'emailList': application.get('emailList') or "",
+                   'attributes': attributeArray})
+
+def applicationUpdated(row, application, response):
+    logger.debug("Application: %s update API Response: %s", row.get('applicationName'), response.text, extra=rowLog(row, 'create', status=response.status_code))
+    #status_code rather than requests' ok, so httpx responses can be checked the same way
+    if response.status_code >= 400:
+        raise ValueError("Updating application " + row.get('applicationName') + " failed: " + response.text)
+    application['businessCriticalityType'] = row.get('businessCriticality')
+
+def updateRelease(client, row, releaseId, release, ownerId):
+    #Brings an existing release's SDLC status and owner in line with the row. Its name and description are sent back as FoD has them
+    response = client.request("Put", '/api/v3/releases/' + str(releaseId), data=releaseUpdatePayload(row, release, ownerId), headers={'content-type': "application/json"})
+    releaseUpdated(row, release, ownerId, response)
+
+def releaseUpdatePayload(row, release, ownerId):
+    payload = OrderedDict([('releaseName', release.get('releaseName') or row.releaseName), ('releaseDescription', release.get('releaseDescription') or ""),
+                           ('sdlcStatusType', row.fodSdlcStatus())])
+    ownerId = ownerId if ownerId is not None else release.get('ownerId')
+    if ownerId is not None:
+        payload['ownerId'] = int(ownerId)
+    return toJson(payload)
+
+def releaseUpdated(row, release, ownerId, response):
+    logger.debug("Application: %s Release: %s update API Response: %s", row.get('applicationName'), row.get('releaseName'), response.text,
+                 extra=rowLog(row, 'create', status=response.status_code))
+    if response.status_code >= 400:
+        raise ValueError("Updating release " + row.get('releaseName') + " of " + row.get('applicationName') + " failed: " + response.text)
+    release['sdlcStatusType'] = row.fodSdlcStatus()
+    if ownerId is not None:
+        release['ownerId'] = int(ownerId)
+
+def warnApplicationType(row, application):
+    #FoD has no way to change an application's type once it is created, so a row that asks for another type is only warned about
+    found = application.get('applicationType')
+    if found and found.lower() != row.fodApplicationType().lower():
+        logger.warning("Row " + str(row.rowNumber) + ": " + row.applicationName + " is a " + found + " application in FoD, and its Application Type "
+                       "can't be changed to " + row.fodApplicationType() + " through the API", extra=rowLog(row, 'resolve'))
+
+class ApplicationIndex(object):
+    #Every application in the tenant by lower case name, with its releases by lower case name. It is built from two concurrent paged
+    #listings (/applications and /releases) at the start of the import, and kept up to date as rows create applications and releases.
+    #The releases as FoD listed them (SDLC status, owner and so on) are kept by release ID
+    def __init__(self, applicationList, releaseList):
+        self.applications   = {}
+        self.releases       = {}
+        self.lock           = threading.Lock()
+        self.nameLocks      = {}
+        for application in applicationList:
+            application = dict(application, releases={})
+            self.applications[application['applicationName'].lower()] = application
+        byId = dict((application['applicationId'], application) for application in self.applications.values())
+        for release in releaseList:
+            application = byId.get(release.get('applicationId'))
+            if application is not None:
+                application['releases'][release['releaseName'].lower()] = release['releaseId']
+                self.releases[release['releaseId']] = dict(release)
+
+    @classmethod
+    def load(cls, client, workers=PAGE_WORKERS):
+        applicationList, applicationCount = getAllPagesConcurrently(client, '/api/v3/applications', workers=workers)
+        releaseList, releaseCount = getAllPagesConcurrently(client, '/api/v3/releases', workers=workers)
+        logger.info("Found " + str(applicationCount) + " applications and " + str(releaseCount) + " releases already in FoD")
+        return cls(applicationList, releaseList)
+
+    @classmethod
+    async def loadAsync(cls, client):
+        import asyncio
+        (applicationList, applicationCount), (releaseList, releaseCount) = await asyncio.gather(getAllPagesAsync(client, '/api/v3/applications'),
+                                                                                                getAllPagesAsync(client, '/api/v3/releases'))
+        logger.info("Found " + str(applicationCount) + " applications and " + str(releaseCount) + " releases already in FoD")
+        return cls(applicationList, releaseList)
+
+    def lockFor(self, appName):
+        with self.lock:
+            return self.nameLocks.setdefault(appName.lower(), threading.Lock())
+
+    def classify(self, row, columnsChanged=False, ownerId=None):
+        #Returns (action, application, changes): 'create' for an application FoD doesn't have, 'update' with the list of what differs
+        #('release' for a release FoD doesn't have, 'releaseDetails' for its SDLC status or owner (ownerId, when known), 'businessCriticality',
+        #'attributes'), or 'unchanged'. The index doesn't hold custom attribute values, so they only count as changed when --sync says the
+        #row's columns have (columnsChanged)
+        application = self.applications.get(row.get('applicationName').lower())
+        if application is None:
+            return 'create', None, []
+        changes = []
+        releaseName = row.get('releaseName').lower()
+        if releaseName not in application['releases']:
+            changes.append('release')
+        elif self.releaseChanged(row, self.releases.get(application['releases'][releaseName]), ownerId, columnsChanged):
+            changes.append('releaseDetails')
+        if row.get('businessCriticality').lower() != (application.get('businessCriticalityType') or "").lower():
+            changes.append('businessCriticality')
+        if columnsChanged and any(row.attributes.values()):
+            changes.append('attributes')
+        return ('update' if changes else 'unchanged'), application, changes
+
+    def warnUnsynced(self, row):
+        #A row --sync skips can still differ from FoD in the columns it can't send, which are only warned about
+        application = self.applications.get(row.get('applicationName').lower())
+        if application is not None:
+            warnApplicationType(row, application)
+
+    def releaseChanged(self, row, release, ownerId, columnsChanged):
+        #The SDLC status and owner are compared with the release as FoD listed it. A release created by this run (not listed) is as its row
+        #asked, and a field the listing didn't have only counts as changed when --sync says the row's columns have
+        if release is None:
+            return False
+        for found, wanted in ((release.get('sdlcStatusType'), row.fodSdlcStatus()), (release.get('ownerId'), ownerId)):
+            if wanted is None:
+                continue
+            if found is None:
+                if columnsChanged:
+                    return True
+            elif str(found).lower() != str(wanted).lower():
+                return True
+        return False
+
+    def releaseFor(self, row, application):
+        #The release ID of the row's release and the release as FoD listed it, for updating it
+        releaseId = application['releases'].get(row.get('releaseName').lower())
+        return releaseId, self.releases.setdefault(releaseId, {})
+
+    def addApplication(self, row, applicationId, releaseId=None, attributeArray=None):
+        #The release is known to exist even while its ID is still being looked up (None), so a repeated row doesn't try to create it again.
+        #The attributes it was created with are kept, as a later row that updates the application sends them back
+        with self.lock:
+            self.applications[row.get('applicationName').lower()] = {'applicationId': applicationId, 'applicationName': row.get('applicationName'),
+                                                                     'businessCriticalityType': row.get('businessCriticality'),
+                                                                     'attributes': list(attributeArray or []),
+                                                                     'releases': {row.get('releaseName').lower(): releaseId}}
+
+    def addRelease(self, row, releaseId):
+        with self.lock:
+            application = self.applications.get(row.get('applicationName').lower())
+            if application is not None:
+                application['releases'][row.get('releaseName').lower()] = releaseId
+
+@timed
+def getUsers(client, cache=None, workers=1):
+    #This method will pull all users from the system for the given tenant and create an object of key-value pairs that looks like: 
+    #Username-User ID. This allows the organization to provide a user name (which is more human readable) in their spreadsheet
+    #and we can use that to easily pull the User ID associated with that user name, giving us the required data to pass to the 
+    #FoD API for the application owner. User names are always stored lower case, and owners are looked up lower case.
+    #The directory is kept in the local cache between runs. While the cache is younger than its TTL only users added since the last
+    #run are fetched, otherwise (or if the directory no longer matches the cache) it is rebuilt with the pages fetched concurrently
+    if cache is None:
+        cache = LocalCache(None)
+    pageWorkers = max(workers, PAGE_WORKERS)
+    cachedUsers = cache.read('users', ignoreTtl=True)
+    simplifiedUserData = None
+
+    if cachedUsers is not None and time.time() - cachedUsers.get('builtAt', 0) <= cache.ttlSeconds:
+        simplifiedUserData, numTotalUsers = updateUsers(client, cachedUsers, pageWorkers)
+        builtAt = cachedUsers['builtAt']
+
+    if simplifiedUserData is None:
+        allItems, numTotalUsers = getAllPagesConcurrently(client, '/api/v3/users', USER_ORDER, workers=pageWorkers)
+        simplifiedUserData = usersByName(allItems)
+        builtAt = time.time()
+
+    cache.write('users', {'builtAt': builtAt, 'totalCount': numTotalUsers, 'users': simplifiedUserData})
+    return simplifiedUserData
+
+def usersByName(userItems):
+    simplifiedUserData = {}
+    for thisUser in userItems:
+        simplifiedUserData[thisUser['userName'].lower()] = thisUser['userId']
+    return simplifiedUserData
+
+@timed
+def resolveOwners(client, ownerNames, cache=None, workers=1, threshold=100):
+    #Returns the lower case user name to user ID map for the owners named in the file. Owners already in a cached copy of the directory are
+    #taken from it. When no more than threshold owners are left, only those users are requested from FoD (a few names per request),
+    #otherwise the whole directory is fetched with getUsers. Owners that don't exist in FoD are left out, so their rows fail on their own
+    if cache is None:
+        cache = LocalCache(None)
+    knownUsers, missing = cachedOwners(ownerNames, cache)
+
+    if not missing:
+        return knownUsers
+    if len(missing) > threshold:
+        return getUsers(client, cache, workers)
+
+    batches = ownerBatches(missing)
+    with ThreadPoolExecutor(max_workers=min(max(workers, PAGE_WORKERS), len(batches))) as executor:
+        for foundUsers in executor.map(lambda batch: findUsers(client, batch), batches):
+            knownUsers.update(foundUsers)
+
+    saveOwners(ownerNames, knownUsers, cache)
+    return knownUsers
+
+def cachedOwners(ownerNames, cache):
+    #Returns the users already known from the cache, and the names of the owners that still have to be looked up
+    cachedUsers = cache.read('users') or {}
+    knownUsers  = dict(cachedUsers.get('users') or {})
+    knownUsers.update(cache.read('owners') or {})
+    missing     = [ownerNames[ownerKey] for ownerKey in ownerNames if ownerKey not in knownUsers]
+    return knownUsers, missing
+
+def ownerBatches(missing):
+    return [missing[start:start + OWNER_BATCH_SIZE] for start in range(0, len(missing), OWNER_BATCH_SIZE)]
+
+def saveOwners(ownerNames, knownUsers, cache):
+    #Only the owners looked up this run are kept in the owners cache, the full directory keeps its own cache entry
+    ownerCache = cache.read('owners') or {}
+    ownerCache.update((ownerKey, knownUsers[ownerKey]) for ownerKey in ownerNames if ownerKey in knownUsers)
+    cache.write('owners', ownerCache)
+
+def findUsers(client, userNames):
+    #Looks up a few users by name in one request, using the API's filter syntax where | separates the values a field may have
+    return matchUsers(userNames, getAllPages(client, '/api/v3/users', userFilter(userNames)))
+
+def userFilter(userNames):
+    return {'filters': 'userName:' + '|'.join(userNames)}
+
+def matchUsers(userNames, userItems):
+    #The filter matches on part of the name, so only users whose whole name was asked for are kept
+    wanted = set(userName.lower() for userName in userNames)
+    found  = {}
+    for thisUser in userItems:
+        thisUserName = thisUser['userName'].lower()
+        if thisUserName in wanted:
+            found[thisUserName] = thisUser['userId']
+    return found
+
+def updateUsers(client, cachedUsers, workers):
+    #Users are listed in the order of their IDs (USER_ORDER), so the users added since the cache was saved are on the last page the cache already
+    #knows about and the pages after it. That page is fetched again and checked against the cache: if a user was removed or the order
+    #changed, (None, None) is returned and the caller rebuilds the directory
+    tailOffset  = usersTailOffset(cachedUsers)
+    newItems, numTotalUsers = getAllPagesConcurrently(client, '/api/v3/users', USER_ORDER, workers=workers, startOffset=tailOffset)
+    return mergeNewUsers(cachedUsers, tailOffset, newItems, numTotalUsers)
+
+def usersTailOffset(cachedUsers):
+    return max(0, ((cachedUsers['totalCount'] - 1) // 50) * 50)
+
+def mergeNewUsers(cachedUsers, tailOffset, newItems, numTotalUsers):
+    knownCount  = cachedUsers['totalCount']
+    if numTotalUsers < knownCount:
+        return None, None
+
+    simplifiedUserData = dict(cachedUsers['users'])
+    for position, thisUser in enumerate(newItems, tailOffset):
+        thisUserName = thisUser['userName'].lower()
+        if position < knownCount and simplifiedUserData.get(thisUserName) != thisUser['userId']:
+            return None, None
+        simplifiedUserData[thisUserName] = thisUser['userId']
+    return simplifiedUserData, numTotalUsers
+
+@timed
+def getReleaseId(client, appId):
+    #When you create an application via the API, you are required to create a first release as well. But the API only returns the application ID
+    #This method gets the ID of the release that you created so that you can use it to fill out the dynamic form (which is associated with releases
+    #not applications)
+    appIdString = str(appId)
+    response = client.get('/api/v3/applications/' + appIdString + '/releases')
+    fullResponse = json.loads(response.text)
+    releaseId = fullResponse['items'][0]['releaseId']
+    
+    return releaseId
+
+@timed
+def lookupReleases(client, applicationIds):
+    #Finds the release of each of several applications with one filtered /releases listing, and returns them by application ID (as text).
+    #As with getReleaseId, the first release listed for an application is the one it was created with
+    return firstReleases(getAllPages(client, '/api/v3/releases', releaseFilter(applicationIds)))
+
+def releaseFilter(applicationIds):
+    return {'filters': 'applicationId:' + '|'.join(sorted(set(str(applicationId) for applicationId in applicationIds)))}
+
+def firstReleases(releaseItems):
+    found = {}
+    for release in releaseItems:
+        found.setdefault(str(release['applicationId']), release['releaseId'])
+    return found
+
+@timed
+def populateDynamicForm(client, releaseId, settings):
+    #Fills out the dynamic scan form of a release with a row's DynamicScanSettings. Returns False when FoD turns it down
+    dynamicFormPath, dynamicFormPayload = dynamicFormRequest(releaseId, settings)
+    headers = {
+        'content-type': "application/json"
+    }
+
+    try:
+        response = client.request("Put", dynamicFormPath, data=dynamicFormPayload, headers=headers)
+        return dynamicFormSent(response)
+    except Exception as error:
+        logger.error("Dynamic scan setup of release " + str(releaseId) + " failed: " + repr(error), extra={'stage': 'dynamic'})
+        return False
+
+def dynamicFormRequest(releaseId, settings):
+    #The blockout is the JSON text cached for the row's schedule, so it is spliced in to the serialized payload instead of serialized again
+    #for every row
+    return '/api/v3/releases/' + str(releaseId) + '/dynamic-scans/scan-setup', toJson(settings.payload())[:-1] + ',"blockout":' + settings.blockout + '}'
+
+def dynamicFormSent(response):
+    if response.status_code >= 400:
+        logger.warning("API Response while populating dynamic form: " + str(response.text), extra={'stage': 'dynamic', 'status': response.status_code})
+        return False
+    logger.debug("API Response while populating dynamic form: %s", response.text, extra={'stage': 'dynamic', 'status': response.status_code})
+    return True
+
+def setCustomAttributeValue(catalog, rowAttributes):
+    #Builds the attributes array for an application from every custom attribute column in the row that has a value, e.g.
+    #[{"id": 7, "value": 71}]. Picklist attributes are sent the id of the chosen value, other attributes are sent the value as written
+    attributeArray = []
+
+    for attributeName, givenAttributeValue in rowAttributes.items():
+        if givenAttributeValue == "":
+            continue
+        thisAttribute = {}
+        thisAttribute['id'] = catalog.attributeId(attributeName)
+        thisAttribute['value'] = catalog.valueFor(attributeName, givenAttributeValue)
+        attributeArray.append(thisAttribute)
+
+    return attributeArray
+
+def attributeDefinition(item):
+    return {'id': item['id'], 'name': item['name'], 'picklistValues': item.get('picklistValues') or []}
+
+class AttributeCatalog(object):
+    #Every custom attribute defined in the tenant, fetched in one paged listing per run (or read from the local cache) instead of once per row.
+    #Attribute names and picklist values are indexed case-insensitively, so each lookup is a dictionary access
+    def __init__(self, client, cache):
+        self.client         = client
+        self.cache          = cache
+        self.lock           = threading.Lock()
+        self.attributeIds   = None
+        self.picklists      = None
+
+    def load(self):
+        with self.lock:
+            if self.attributeIds is not None:
+                return
+            definitions = self.cache.read('attributes')
+            if definitions is None:
+                definitions = [attributeDefinition(item) for item in getAllPages(self.client, '/api/v3/attributes')]
+                self.cache.write('attributes', definitions)
+            self.useDefinitions(definitions)
+
+    def useDefinitions(self, definitions):
+        #Indexes a list of definitions as saved in the cache. loadAttributesAsync fetches them on the event loop and hands them over here
+        attributeIds = {}
+        picklists = {}
+        for definition in definitions:
+            attributeKey = definition['name'].strip().lower()
+            attributeIds[attributeKey] = definition['id']
+            if definition['picklistValues']:
+                picklists[attributeKey] = dict((option['name'].strip().lower(), option['id']) for option in definition['picklistValues'])
+        self.picklists = picklists
+        self.attributeIds = attributeIds
+
+    def attributeId(self, attributeName):
+        self.load()
+        attributeKey = attributeName.strip().lower()
+        if attributeKey not in self.attributeIds:
+            raise KeyError("No custom attribute named '" + attributeName + "'")
+        return self.attributeIds[attributeKey]
+
+    def valueFor(self, attributeName, givenAttributeValue):
+        self.load()
+        picklist = self.picklists.get(attributeName.strip().lower())
+        if picklist is None:
+            return givenAttributeValue
+        valueKey = givenAttributeValue.strip().lower()
+        if valueKey not in picklist:
+            raise KeyError("'" + givenAttributeValue + "' is not one of the values of custom attribute '" + attributeName + "'")
+        return picklist[valueKey]
+
+def getAllPagesConcurrently(client, path, params=None, workers=PAGE_WORKERS, startOffset=0, pageSize=50):
+    #Fetches the page at startOffset first to learn totalCount, then every later page at the same time, and returns (items, totalCount)
+    #with the items in listing order
+    def getPage(offset):
+        pageParams = dict(params or {})
+        pageParams.update({'offset': offset, 'limit': pageSize})
+        response = client.get(path, params=pageParams)
+        return json.loads(response.text)
+
+    firstPage   = getPage(startOffset)
+    items       = list(firstPage.get('items') or [])
+    totalCount  = firstPage.get('totalCount', 0)
+    #The API may return fewer items per page than asked for, so later offsets step by the size of the first page
+    step        = len(items)
+    if step:
+        offsets = list(range(startOffset + step, totalCount, step))
+        if offsets:
+            with ThreadPoolExecutor(max_workers=min(workers, len(offsets))) as executor:
+                for page in executor.map(getPage, offsets):
+                    items.extend(page.get('items') or [])
+    return items, totalCount
+
+def getAllPages(client, path, params=None, pageSize=50):
+    #Walks an offset paged listing (items and totalCount) and yields every item
+    offset = 0
+    while True:
+        pageParams = dict(params or {})
+        pageParams.update({'offset': offset, 'limit': pageSize})
+        response = client.get(path, params=pageParams)
+        page = json.loads(response.text)
+        items = page.get('items') or []
+        for item in items:
+            yield item
+        offset += len(items)
+        if not items or offset >= page.get('totalCount', 0):
+            return
+
+@timed
+async def getUsersAsync(client, cache=None):
+    #The asyncio counterpart of getUsers, with the same cache entry. Pages are requested all at once and the client limits how many are in flight
+    if cache is None:
+        cache = LocalCache(None)
+    cachedUsers = cache.read('users', ignoreTtl=True)
+    simplifiedUserData = None
+
+    if cachedUsers is not None and time.time() - cachedUsers.get('builtAt', 0) <= cache.ttlSeconds:
+        tailOffset = usersTailOffset(cachedUsers)
+        newItems, numTotalUsers = await getAllPagesAsync(client, '/api/v3/users', USER_ORDER, startOffset=tailOffset)
+        simplifiedUserData, numTotalUsers = mergeNewUsers(cachedUsers, tailOffset, newItems, numTotalUsers)
+        builtAt = cachedUsers['builtAt']
+
+    if simplifiedUserData is None:
+        allItems, numTotalUsers = await getAllPagesAsync(client, '/api/v3/users', USER_ORDER)
+        simplifiedUserData = usersByName(allItems)
+        builtAt = time.time()
+
+    cache.write('users', {'builtAt': builtAt, 'totalCount': numTotalUsers, 'users': simplifiedUserData})
+    return simplifiedUserData
+
+@timed
+async def resolveOwnersAsync(client, ownerNames, cache=None, threshold=100):
+    #The asyncio counterpart of resolveOwners
+    import asyncio
+    if cache is None:
+        cache = LocalCache(None)
+    knownUsers, missing = cachedOwners(ownerNames, cache)
+
+    if not missing:
+        return knownUsers
+    if len(missing) > threshold:
+        return await getUsersAsync(client, cache)
+
+    for foundUsers in await asyncio.gather(*[findUsersAsync(client, batch) for batch in ownerBatches(missing)]):
+        knownUsers.update(foundUsers)
+    saveOwners(ownerNames, knownUsers, cache)
+    return knownUsers
+
+async def findUsersAsync(client, userNames):
+    userItems, totalCount = await getAllPagesAsync(client, '/api/v3/users', userFilter(userNames))
+    return matchUsers(userNames, userItems)
+
+async def loadAttributesAsync(client, cache):
+    #Returns an AttributeCatalog with the tenant's custom attributes already loaded, from the cache or one paged listing
+    definitions = cache.read('attributes')
+    if definitions is None:
+        attributeItems, totalCount = await getAllPagesAsync(client, '/api/v3/attributes')
+        definitions = [attributeDefinition(item) for item in attributeItems]
+        cache.write('attributes', definitions)
+    catalog = AttributeCatalog(None, cache)
+    catalog.useDefinitions(definitions)
+    return catalog
+
+async def createApplicationAsync(client, row, ownerId, attributeArray):
+    payload = applicationPayload(row, ownerId, attributeArray)
+    logger.debug("Application payload: %s", payload, extra=rowLog(row, 'create'))
+
+    response = await client.request("Post", '/api/v3/applications', data=payload, headers={'content-type': "application/json"})
+    return applicationCreated(row, response)
+
+async def createReleaseAsync(client, row, applicationId):
+    response = await client.request("Post", '/api/v3/releases', data=releasePayload(row, applicationId), headers={'content-type': "application/json"})
+    return releaseCreated(row, response)
+
+async def updateApplicationAsync(client, row, application, attributeArray):
+    response = await client.request("Put", '/api/v3/applications/' + str(application['applicationId']), data=applicationUpdatePayload(row, application, attributeArray),
+                                    headers={'content-type': "application/json"})
+    applicationUpdated(row, application, response)
+
+async def updateReleaseAsync(client, row, releaseId, release, ownerId):
+    response = await client.request("Put", '/api/v3/releases/' + str(releaseId), data=releaseUpdatePayload(row, release, ownerId),
+                                    headers={'content-type': "application/json"})
+    releaseUpdated(row, release, ownerId, response)
+
+@timed
+async def getReleaseIdAsync(client, appId):
+    response = await client.get('/api/v3/applications/' + str(appId) + '/releases')
+    return json.loads(response.text)['items'][0]['releaseId']
+
+@timed
+async def lookupReleasesAsync(client, applicationIds):
+    releaseItems, totalCount = await getAllPagesAsync(client, '/api/v3/releases', releaseFilter(applicationIds))
+    return firstReleases(releaseItems)
+
+@timed
+async def populateDynamicFormAsync(client, releaseId, settings):
+    dynamicFormPath, dynamicFormPayload = dynamicFormRequest(releaseId, settings)
+    try:
+        response = await client.request("Put", dynamicFormPath, data=dynamicFormPayload, headers={'content-type': "application/json"})
+        return dynamicFormSent(response)
+    except Exception as error:
+        logger.error("Dynamic scan setup of release " + str(releaseId) + " failed: " + repr(error), extra={'stage': 'dynamic'})
+        return False
+
+async def getAllPagesAsync(client, path, params=None, startOffset=0, pageSize=50):
+    #The asyncio counterpart of getAllPagesConcurrently, returning (items, totalCount) in listing order. asyncio is imported by the
+    #coroutines that use it, not by this module, so the threaded import and --validate start without it
+    import asyncio
+    async def getPage(offset):
+        pageParams = dict(params or {})
+        pageParams.update({'offset': offset, 'limit': pageSize})
+        response = await client.get(path, params=pageParams)
+        return json.loads(response.text)
+
+    firstPage   = await getPage(startOffset)
+    items       = list(firstPage.get('items') or [])
+    totalCount  = firstPage.get('totalCount', 0)
+    step        = len(items)
+    if step:
+        for page in await asyncio.gather(*[getPage(offset) for offset in range(startOffset + step, totalCount, step)]):
+            items.extend(page.get('items') or [])
+    return items, totalCount
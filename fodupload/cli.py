@@ -0,0 +1,290 @@
+#The command line. Parsing it only imports what the help needs, and each command imports the modules (and with them requests,
+#openpyxl, sqlite3 and so on) it uses when it runs, so UploadApps.py --help starts quickly
+import os
+import sys
+import csv
+import argparse
+import logging
+import time
+from .constants import CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_SECONDS, RETRY_ATTEMPTS, RETRY_BASE_DELAY, RETRY_MAX_DELAY
+from .logs import consoleLogger, logger, setupLogging
+
+def buildParser():
+    #Argument parser implemented mainly in the interest of creating a "Help" argument that presents the user information about how to use the script
+    parser = argparse.ArgumentParser(description="This is a tool to help upload applications to the Fortify on Demand evironment. Commands should be called in the following format:  *************\"UploadApps.py [path/file.xlsx] [key] [secret] -d\"*************  After an import, \"UploadApps.py reconcile [path/file.xlsx] [key] [secret] -d\" reports which rows are in FoD as the file has them (see UploadApps.py reconcile -h), and \"UploadApps.py configure-dynamic [path/file.xlsx] [key] [secret]\" fills out the dynamic scan form of releases that are already in FoD (see UploadApps.py configure-dynamic -h).  Only add the -d at the end if the import file that you're using includes columns for filling out the dynamic scan form for the first release on the application. This tool was provided with a spreadhsheet template which must be followed for it to funciton correctly, as well as a Word Document that describes each column in the spreadsheet.")
+
+    parser.add_argument('file', help="Provide the path and Excel file that you will be using for your import e.g. C:/Path/File.xlsx. CSV (.csv) and JSON lines (.jsonl) files with the same column headers can also be used")
+    parser.add_argument('key', nargs='?', help="This is the API key provided by your Secruity Lead. Not needed with --credentials")
+    parser.add_argument('secret', nargs='?', help="This is the secret associated with the above key, also provided by your Security Lead. Not needed with --credentials")
+    parser.add_argument('--credentials', help="CSV file with a key,secret pair per line, for several API keys of the same tenant. The import is shared out between one process per key, each with its own rate limit, and the results are reported together")
+    parser.add_argument('-d', action='store_true', default=False, help="Add this flag if your import file includes dynamic scan form values, and you wish to fill out the dynamic form along with adding applications")
+    parser.add_argument('--workers', type=int, default=1, help="Number of spreadsheet rows each step of the import works on at the same time, unless --stage-workers says otherwise. Each row still runs create application, release lookup and dynamic scan setup in order")
+    parser.add_argument('--stage-workers', action='append', default=[], metavar='STAGE=COUNT[,STAGE=COUNT]', help="Number of workers for one step of the import, e.g. create=4,dynamic=2. Steps are resolve (owners, attributes and existing applications), create, release (looked up in batches, default 1 worker) and dynamic. Can be repeated")
+    parser.add_argument('--queue-size', type=int, default=None, help="Number of rows that can wait in front of each step before the step before it is held up. Default is twice the step's workers")
+    addApiArguments(parser, "the number of workers of all steps plus two")
+    parser.add_argument('--dead-letter', default=os.path.join('log', 'FodDeadLetter.jsonl'), help="JSON lines file the rows that failed after reaching the API are written to, with why. It can be imported on its own to send just those rows again. Emptied at the start of every import. Default is log/FodDeadLetter.jsonl")
+    parser.add_argument('--owner-lookup-threshold', type=int, default=100, help="When the file names this many distinct owners or fewer, only those users are looked up in FoD. Above it the whole user directory is fetched. 0 always fetches the whole directory. Default is 100")
+    parser.add_argument('--sync', nargs='?', const='default', metavar='NAME', help="Only send what changed since the last --sync run with this name (default 'default'): rows whose columns are the same as then are skipped, changed business criticality or custom attributes are updated, and dynamic scan forms are only filled out again when their columns changed. Rows that have gone from the file since are reported, not deleted from FoD")
+    parser.add_argument('--resume', action='store_true', default=False, help="Continue an import of the same file that was stopped part way. Applications, releases and dynamic scan forms already recorded in the journal are not sent again")
+    parser.add_argument('--journal', default=os.path.join('log', 'FodImport.db'), help="SQLite file where the progress of every row is recorded. Default is log/FodImport.db")
+    parser.add_argument('--validate', action='store_true', default=False, help="Check every row of the file against the template's allowed values, the FoD users and the custom attributes, and write a report of the rows with problems instead of importing. Nothing is created or changed in FoD. Add -d to check the dynamic scan columns too")
+    parser.add_argument('--validation-report', default=os.path.join('log', 'FodValidation.csv'), help="CSV file the --validate report is written to. Default is log/FodValidation.csv")
+    parser.add_argument('--metrics-json', default=os.path.join('log', 'FodMetrics.json'), help="JSON file the run's request, stage and row metrics are written to, during the run and at the end. Default is log/FodMetrics.json")
+    parser.add_argument('--metrics-textfile', default=os.path.join('log', 'fodimport.prom'), help="Prometheus textfile the same metrics are written to, e.g. in node_exporter's textfile collector directory. Default is log/fodimport.prom")
+    parser.add_argument('--metrics-interval', type=float, default=30, help="Seconds between metrics writes during the run. 0 only writes them at the end. Default is 30")
+    addLogArguments(parser)
+    parser.add_argument('--async', dest='use_async', action='store_true', default=False, help="Run the import on an asyncio event loop instead of the staged thread pipeline. Requests are sent with httpx over HTTP/2 when httpx and h2 are installed (pip install httpx[http2]), --workers rows are imported at once and --pool-size requests are in flight at once. --stage-workers and --queue-size don't apply")
+    return parser
+
+def buildReconcileParser():
+    parser = argparse.ArgumentParser(prog="UploadApps.py reconcile", description="Compares every row of an import file, and what the import journal recorded for it, with the applications, releases and (with -d) dynamic scan setups in FoD now, and writes a report of the rows that are matched, missing or mismatched. Nothing is created or changed in FoD. Exits with 1 when any row isn't matched")
+    parser.add_argument('file', help="The import file (.xlsx, .xls, .csv or .jsonl) to check")
+    parser.add_argument('key', help="The API key")
+    parser.add_argument('secret', help="The secret of the API key")
+    parser.add_argument('-d', action='store_true', default=False, help="Check the dynamic scan setup of every release too. The API has no listing of scan setups, so this is one request per release, sent by --workers threads within the scan-setup --rate limit")
+    parser.add_argument('--workers', type=int, default=8, help="Number of listing pages and scan setups fetched at the same time. Default is 8")
+    parser.add_argument('--report', default=os.path.join('log', 'FodReconcile.csv'), help="File the report is written to, as JSON when it ends in .json and as CSV otherwise. Default is log/FodReconcile.csv")
+    parser.add_argument('--journal', default=os.path.join('log', 'FodImport.db'), help="SQLite journal of the import, for the IDs and errors recorded for each row. Default is log/FodImport.db")
+    addApiArguments(parser, "the number of workers plus two")
+    addLogArguments(parser)
+    return parser
+
+def buildConfigureDynamicParser():
+    parser = argparse.ArgumentParser(prog="UploadApps.py configure-dynamic", description="Fills out the dynamic scan form of releases that are already in FoD from the dynamic scan columns of an import file, e.g. after the forms failed in an import or the template changed. Applications and releases are not created or changed. The current setup of each release is fetched first and releases that already have the row's setup are left alone. Exits with 1 when any row's release wasn't found or its setup failed")
+    parser.add_argument('file', help="The import file (.xlsx, .xls, .csv or .jsonl), with the dynamic scan columns")
+    parser.add_argument('key', help="The API key")
+    parser.add_argument('secret', help="The secret of the API key")
+    parser.add_argument('--releases', metavar='journal|lookup|FILE.csv', default=None, help="Where the release ID of each row comes from: journal for the IDs the import recorded, lookup for the release named in the row as FoD lists it now, or a CSV file with a Release ID column and an Application Name (with Release Name) or Row column, such as the reconcile report. Default is journal when the journal exists, lookup otherwise")
+    parser.add_argument('--workers', type=int, default=8, help="Number of releases worked on at the same time. Each fetches the release's setup and sends the new one, within the scan-setup --rate limit. Default is 8")
+    parser.add_argument('--force', action='store_true', default=False, help="Send every release its setup without fetching the current one first. Needed to change only a password, as FoD doesn't return passwords to compare")
+    parser.add_argument('--dry-run', action='store_true', default=False, help="Fetch and compare the setups and report which would be sent, without sending any")
+    parser.add_argument('--report', default=os.path.join('log', 'FodConfigureDynamic.csv'), help="File the report of every row is written to, as JSON when it ends in .json and as CSV otherwise. Default is log/FodConfigureDynamic.csv")
+    parser.add_argument('--journal', default=os.path.join('log', 'FodImport.db'), help="SQLite journal of the import, where release IDs are read from and filled out forms are recorded. Default is log/FodImport.db")
+    addApiArguments(parser, "the number of workers plus two")
+    addLogArguments(parser)
+    return parser
+
+def addApiArguments(parser, poolSizeDefault):
+    #How requests are sent to the API, which every command takes
+    parser.add_argument('--rate', action='append', default=[], metavar='[ENDPOINT=]COUNT/PERIOD', help="Limit the request rate, e.g. 2/s for every endpoint or applications=30/min for one endpoint. Endpoints are token, users, attributes, applications, releases and scan-setup. Can be repeated. Default is 2/s for every endpoint")
+    parser.add_argument('--api-url', default='https://api.ams.fortify.com', help="Base URL of the FoD API for your data center. Default is https://api.ams.fortify.com")
+    parser.add_argument('--pool-size', type=int, default=None, help="Number of keep-alive connections held open to the API. Default is " + poolSizeDefault)
+    parser.add_argument('--timeout', type=float, default=60, help="Seconds to wait for the API before a request is abandoned. Default is 60")
+    parser.add_argument('--retries', type=int, default=RETRY_ATTEMPTS, help="Attempts at a request that fails with 429, a server error, a timeout or a lost connection, with a growing random wait between them (or the wait the API asks for in Retry-After). Creating an application or release is only sent again when FoD can't have received it. 1 turns retries off. Default is " + str(RETRY_ATTEMPTS))
+    parser.add_argument('--retry-max-wait', type=float, default=RETRY_MAX_DELAY, help="Longest wait in seconds between two attempts at a request, unless the API asks for longer. Default is " + str(int(RETRY_MAX_DELAY)))
+    parser.add_argument('--circuit-threshold', type=int, default=CIRCUIT_FAILURE_THRESHOLD, help="Failed requests in a row to an endpoint after which every request to it is paused, so an outage holds the import up instead of failing its rows. 0 turns this off. Default is " + str(CIRCUIT_FAILURE_THRESHOLD))
+    parser.add_argument('--circuit-reset', type=float, default=CIRCUIT_RESET_SECONDS, help="Seconds requests to a failing endpoint are paused before one is let through to try it again. Default is " + str(int(CIRCUIT_RESET_SECONDS)))
+    parser.add_argument('--cache-dir', default='.fodcache', help="Directory where custom attribute definitions, the user directory and the current bearer token are kept between runs. Default is .fodcache")
+    parser.add_argument('--cache-ttl', type=float, default=24, help="Hours a cached copy of the custom attribute definitions is used before it is fetched again, and after which the cached user directory is rebuilt instead of updated. 0 turns the cache off. Default is 24")
+
+def addLogArguments(parser):
+    #Console and log file settings, which every command takes
+    parser.add_argument('-q', '--quiet', action='store_true', default=False, help="Only show warnings and errors on the console, not progress or validation problems. Everything is still written to the log")
+    parser.add_argument('--log-level', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'], default='INFO', help="Level of the log file. DEBUG adds every request payload and response, with passwords and tokens redacted. Default is INFO")
+    parser.add_argument('--log-max-bytes', type=int, default=10 * 1024 * 1024, help="Size at which log/FodImport.log is rotated. Default is 10 MB")
+    parser.add_argument('--log-backups', type=int, default=5, help="Number of rotated log files kept. Default is 5")
+
+def main(argv=None):
+    #The command line entry point. Everything it does can also be called directly: AddApplications from threads, AddApplicationsAsync
+    #from an event loop. "UploadApps.py reconcile ..." and "UploadApps.py configure-dynamic ..." run those commands instead of an import
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv[:1] == ['reconcile']:
+        parser, run, argv = buildReconcileParser(), runReconcile, argv[1:]
+    elif argv[:1] == ['configure-dynamic']:
+        parser, run, argv = buildConfigureDynamicParser(), runConfigureDynamic, argv[1:]
+    else:
+        parser, run = buildParser(), runImport
+    args = parser.parse_args(argv)
+    logListener = setupLogging(args.quiet, getattr(logging, args.log_level), args.log_max_bytes, args.log_backups)
+    try:
+        run(parser, args)
+    finally:
+        logListener.stop()
+
+def runReconcile(parser, args):
+    from .client import FodClient, LocalCache, RateLimiter
+    from .journal import ImportJournal
+    from .reconcile import ReconcileApplications
+    from .rows import ImportFileError
+    try:
+        rateLimiter = RateLimiter.fromSpecs(args.rate)
+    except ValueError as error:
+        parser.error(str(error))
+    workerCount = max(args.workers, 1)
+    fodClient   = FodClient(args.api_url, rateLimiter, args.pool_size or workerCount + 2, args.timeout, retryPolicy(args), circuitBreakers(args))
+    localCache  = LocalCache(args.cache_dir, args.cache_ttl, args.api_url + args.key)
+    #Without a journal the rows are still checked against FoD, there are just no IDs or errors to compare
+    importJournal = ImportJournal(args.journal, args.file) if os.path.exists(args.journal) else None
+    try:
+        counts = ReconcileApplications(args.file, args.key, args.secret, fodClient, localCache, importJournal, args.d, workerCount, args.report)
+    except ImportFileError as error:
+        logger.error(error)
+        sys.exit("Reconcile stopped: " + str(error))
+    sys.exit(0 if counts is not None and counts['matched'] == sum(counts.values()) else 1)
+
+def runConfigureDynamic(parser, args):
+    from .client import FodClient, LocalCache, RateLimiter
+    from .dynamic import ConfigureDynamicScans
+    from .journal import ImportJournal
+    from .rows import ImportFileError
+    try:
+        rateLimiter = RateLimiter.fromSpecs(args.rate)
+    except ValueError as error:
+        parser.error(str(error))
+    releaseSource = args.releases or ('journal' if os.path.exists(args.journal) else 'lookup')
+    if releaseSource not in ('journal', 'lookup') and not os.path.isfile(releaseSource):
+        parser.error("--releases should be journal, lookup or a CSV file, not '" + releaseSource + "'")
+    if releaseSource == 'journal' and not os.path.exists(args.journal):
+        parser.error("there is no journal at " + args.journal + " to read release IDs from, use --releases lookup")
+    workerCount = max(args.workers, 1)
+    fodClient   = FodClient(args.api_url, rateLimiter, args.pool_size or workerCount + 2, args.timeout, retryPolicy(args), circuitBreakers(args))
+    localCache  = LocalCache(args.cache_dir, args.cache_ttl, args.api_url + args.key)
+    importJournal = ImportJournal(args.journal, args.file) if os.path.exists(args.journal) else None
+    try:
+        counts = ConfigureDynamicScans(args.file, args.key, args.secret, fodClient, localCache, releaseSource, importJournal, workerCount, args.force,
+                                       args.dry_run, args.report)
+    except (ImportFileError, ValueError, IOError) as error:
+        logger.error(error)
+        sys.exit("Configure-dynamic stopped: " + str(error))
+    sys.exit(0 if counts is not None and counts['missing'] == 0 and counts['failed'] == 0 else 1)
+
+def runImport(parser, args):
+    from .client import FodClient, LocalCache, RateLimiter
+    from .metrics import MetricsExporter
+    from .client import AuthenticationError
+    from .rows import ImportFileError
+    from .importer import parseStageWorkers
+    try:
+        RateLimiter.fromSpecs(args.rate)
+        parseStageWorkers(args.stage_workers, max(args.workers, 1))
+        credentials = readCredentials(args.credentials) if args.credentials else [(args.key, args.secret)]
+    except (ValueError, IOError, OSError) as error:
+        parser.error(str(error))
+    if not all(credentials[0]):
+        parser.error("the key and secret are required, unless --credentials is given")
+    if args.retries < 1:
+        parser.error("--retries should be at least 1")
+
+    exporter = MetricsExporter(args.metrics_json, args.metrics_textfile, args.metrics_interval).start()
+    try:
+        if args.validate:
+            from .validate import ValidateApplications
+            apiKey, apiSecret = credentials[0]
+            fodClient = FodClient(args.api_url, RateLimiter.fromSpecs(args.rate), args.pool_size or 2, args.timeout, retryPolicy(args), circuitBreakers(args))
+            localCache = LocalCache(args.cache_dir, args.cache_ttl, args.api_url + apiKey)
+            invalidRows = ValidateApplications(args.file, apiKey, apiSecret, fodClient, localCache, args.owner_lookup_threshold, args.d, args.validation_report)
+            sys.exit(0 if invalidRows == 0 else 1)
+        from .journal import DeadLetterFile
+        deadLetter = DeadLetterFile(args.dead_letter).start()
+        if len(credentials) > 1:
+            importShards(args, credentials)
+        else:
+            importWith(args, credentials[0][0], credentials[0][1])
+        deadLetter.report()
+    except (ImportFileError, AuthenticationError) as error:
+        logger.error(error)
+        sys.exit("Import stopped: " + str(error))
+    finally:
+        exporter.stop()
+
+def importWith(args, apiKey, apiSecret, shard=None):
+    #The import the command line asks for, with one API key: its own rate limiter, connections and (in AddApplications) token manager
+    from .client import AsyncFodClient, FodClient, LocalCache, RateLimiter
+    from .importer import AddApplications, AddApplicationsAsync, parseStageWorkers
+    from .journal import DeadLetterFile, ImportJournal
+    rateLimiter     = RateLimiter.fromSpecs(args.rate)
+    workerCount     = max(args.workers, 1)
+    stageWorkers    = parseStageWorkers(args.stage_workers, workerCount)
+    localCache      = LocalCache(args.cache_dir, args.cache_ttl, args.api_url + apiKey)
+    importJournal   = ImportJournal(args.journal, args.file, args.resume, args.sync)
+    deadLetter      = DeadLetterFile(args.dead_letter)
+    if args.use_async:
+        import asyncio
+        async def importAsync():
+            async with AsyncFodClient(args.api_url, rateLimiter, args.pool_size or workerCount + 2, args.timeout, retry=retryPolicy(args),
+                                      breakers=circuitBreakers(args)) as asyncFodClient:
+                await AddApplicationsAsync(args.file, apiKey, apiSecret, workerCount, asyncFodClient, localCache, args.owner_lookup_threshold,
+                                           importJournal, args.d, shard, deadLetter)
+        asyncio.run(importAsync())
+    else:
+        fodClient = FodClient(args.api_url, rateLimiter, args.pool_size or sum(stageWorkers.values()) + 2, args.timeout, retryPolicy(args), circuitBreakers(args))
+        AddApplications(args.file, apiKey, apiSecret, workerCount, fodClient, localCache, args.owner_lookup_threshold, importJournal,
+                        stageWorkers, args.queue_size, args.d, shard, deadLetter)
+
+def retryPolicy(args):
+    from .client import RetryPolicy
+    return RetryPolicy(args.retries, RETRY_BASE_DELAY, args.retry_max_wait)
+
+def circuitBreakers(args):
+    from .client import CircuitBreakers
+    return CircuitBreakers(args.circuit_threshold, args.circuit_reset)
+
+def readCredentials(path):
+    #The key,secret pairs of a --credentials file. Blank lines, lines starting with # and a key,secret header line are skipped
+    credentials = []
+    with open(path, newline='', encoding='utf-8') as credentialsFile:
+        for lineNumber, line in enumerate(csv.reader(credentialsFile), 1):
+            line = [value.strip() for value in line]
+            if not any(line) or line[0].startswith('#') or (lineNumber == 1 and [value.lower() for value in line] == ['key', 'secret']):
+                continue
+            if len(line) != 2 or not all(line):
+                raise ValueError("Line " + str(lineNumber) + " of " + path + " should be key,secret")
+            credentials.append((line[0], line[1]))
+    if not credentials:
+        raise ValueError(path + " has no credentials in it")
+    return credentials
+
+def importShards(args, credentials):
+    #--credentials: one worker process per API key, each importing the rows inShard gives it with a rate limit, token and connections of its
+    #own, so an import gets faster with every key added. The processes share the journal and the cache directory, log to
+    #log/FodImport-shardN.log, and report back what they did, which is shown and logged here as one report with their metrics added together
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    from .journal import ImportJournal
+    from .metrics import metrics
+    from .rows import RowReader
+    started = time.monotonic()
+    shardCount = len(credentials)
+    #A file with bad headers is turned down here, rather than once by every process
+    RowReader(args.file, requireDynamic=args.d)
+    consoleLogger.info("Importing with " + str(shardCount) + " API keys, one process each")
+    #spawn rather than fork, as this process already has logging and metrics threads running, and it is what Windows does anyway
+    with ProcessPoolExecutor(max_workers=shardCount, mp_context=multiprocessing.get_context('spawn')) as pool:
+        futures = [pool.submit(importShard, args, apiKey, apiSecret, (index, shardCount)) for index, (apiKey, apiSecret) in enumerate(credentials)]
+        results = []
+        for index, future in enumerate(futures):
+            try:
+                results.append(future.result())
+            except Exception as error:
+                results.append({'shard': index + 1, 'key': maskedKey(credentials[index][0]), 'seconds': 0, 'done': 0, 'failed': 0,
+                                'error': repr(error), 'metrics': None})
+
+    for result in results:
+        if result['metrics']:
+            metrics.merge(result['metrics'])
+        consoleLogger.info("Shard " + str(result['shard']) + " (key " + result['key'] + "): " + str(result['done']) + " rows done, " + str(result['failed']) +
+                           " failed in " + str(round(result['seconds'], 1)) + "s" + (", stopped: " + result['error'] if result['error'] else ""))
+    seconds = time.monotonic() - started
+    doneRows = sum(result['done'] for result in results)
+    consoleLogger.info("All shards: " + str(doneRows) + " rows done, " + str(sum(result['failed'] for result in results)) + " failed in " +
+                       str(round(seconds, 1)) + "s (" + str(round(doneRows / seconds, 1) if seconds else 0) + " rows/s)")
+    logger.info(ImportJournal(args.journal, args.file).summary())
+
+def importShard(args, apiKey, apiSecret, shard):
+    #Runs in a worker process of importShards and returns a summary of its share of the import, with its metrics
+    from .metrics import metrics
+    logListener = setupLogging(True, getattr(logging, args.log_level), args.log_max_bytes, args.log_backups, 'FodImport-shard' + str(shard[0] + 1) + '.log')
+    started = time.monotonic()
+    error = None
+    try:
+        importWith(args, apiKey, apiSecret, shard)
+    except Exception as exception:
+        logger.error("Shard " + str(shard[0] + 1) + " stopped: " + repr(exception))
+        error = repr(exception)
+    finally:
+        logListener.stop()
+    return {'shard': shard[0] + 1, 'key': maskedKey(apiKey), 'seconds': time.monotonic() - started, 'done': metrics.total('fodimport_rows_total', outcome='done'),
+            'failed': metrics.total('fodimport_rows_total', outcome='failed'), 'error': error, 'metrics': metrics.state()}
+
+def maskedKey(apiKey):
+    return apiKey[:4] + "..." if len(apiKey) > 8 else "..."
@@ -0,0 +1,610 @@
+#Sending requests to the FoD API: rate limits, retries and circuit breakers, the bearer token, the local cache, and the requests (FodClient)
+#and asyncio (AsyncFodClient) clients everything else sends its requests through
+import os
+import requests
+import hashlib
+import json
+import datetime
+import time
+import re
+import threading
+import functools
+import random
+import email.utils
+import importlib.util
+from time import sleep
+from .constants import CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_SECONDS, DEFAULT_TOKEN_LIFETIME, RETRY_ATTEMPTS, RETRY_BASE_DELAY, RETRY_MAX_DELAY, TOKEN_REFRESH_MARGIN
+from .logs import consoleLogger, logger
+from .metrics import metrics, recordRequest
+
+class RateLimiter(object):
+    #A token bucket per endpoint. Every call to the API first asks the limiter for a token for its endpoint, and waits until one is available.
+    #Limits are given as COUNT/PERIOD (e.g. 2/s or 30/min), either for every endpoint or for a single one (e.g. applications=30/min).
+    #Anything with acquire(endpoint) and reserve(endpoint) methods can be passed in its place
+    ENDPOINTS   = ['token', 'users', 'attributes', 'applications', 'releases', 'scan-setup']
+    PERIODS     = {'s': 1.0, 'sec': 1.0, 'second': 1.0, 'm': 60.0, 'min': 60.0, 'minute': 60.0, 'h': 3600.0, 'hour': 3600.0}
+    DEFAULT     = '2/s'
+
+    def __init__(self, rates):
+        #rates maps an endpoint name (or '*' for any endpoint without its own limit) to a number of requests per second
+        self.rates      = rates
+        self.buckets    = {}
+        self.lock       = threading.Lock()
+
+    @classmethod
+    def fromSpecs(cls, specs):
+        rates = {'*': cls.parseRate(cls.DEFAULT)}
+        for spec in specs:
+            endpoint, separator, rate = spec.rpartition('=')
+            endpoint = endpoint.strip() if separator else '*'
+            if endpoint != '*' and endpoint not in cls.ENDPOINTS:
+                raise ValueError("Unknown endpoint in rate limit '" + spec + "', expected one of " + ", ".join(cls.ENDPOINTS))
+            rates[endpoint] = cls.parseRate(rate)
+        return cls(rates)
+
+    @classmethod
+    def parseRate(cls, rate):
+        match = re.match(r'^\s*(\d+(?:\.\d+)?)\s*/\s*([a-z]+)\s*$', rate.lower())
+        if not match or match.group(2) not in cls.PERIODS:
+            raise ValueError("Rate limit '" + rate + "' should look like 2/s or 30/min")
+        return float(match.group(1)) / cls.PERIODS[match.group(2)]
+
+    def acquire(self, endpoint):
+        wait = self.reserve(endpoint)
+        if wait > 0:
+            sleep(wait)
+
+    def reserve(self, endpoint):
+        #Takes a token for the endpoint without waiting, and returns the number of seconds the caller has to wait before using it.
+        #AsyncFodClient waits that long with asyncio.sleep, so a rate limit never blocks the event loop
+        perSecond = self.rates.get(endpoint, self.rates.get('*'))
+        if not perSecond:
+            return 0
+        with self.lock:
+            bucket = self.buckets.get(endpoint)
+            if bucket is None:
+                #A bucket holds at most one second worth of requests (and never less than one), so short bursts are allowed but not long ones
+                bucket = self.buckets[endpoint] = TokenBucket(perSecond, max(perSecond, 1.0))
+        return bucket.reserve()
+
+class TokenBucket(object):
+    def __init__(self, perSecond, capacity):
+        self.perSecond  = perSecond
+        self.capacity   = capacity
+        self.tokens     = capacity
+        self.updated    = time.monotonic()
+        self.lock       = threading.Lock()
+
+    def take(self):
+        wait = self.reserve()
+        if wait > 0:
+            sleep(wait)
+
+    def reserve(self):
+        #Takes a token and returns the seconds until it is really there. The count may go below zero while callers wait for tokens that are
+        #still to come, so callers are served in the order they asked
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.perSecond)
+            self.updated = now
+            self.tokens -= 1
+            return max(0.0, -self.tokens / self.perSecond)
+
+class RetryPolicy(object):
+    #When and how soon a failed request is sent again: after a 429 (too many requests), a 500, 502, 503 or 504, or a connection error or
+    #timeout. The wait grows exponentially from baseDelay up to maxDelay with full jitter, so workers that failed together don't all come back
+    #together, and a longer Retry-After from the API is waited out in full. Creating an application or release (POST) is only sent again when
+    #FoD can't have acted on it, i.e. after a 429 or 503 or a connection that was never made, so a retry never creates anything twice
+    RETRY_STATUSES  = set([429, 500, 502, 503, 504])
+    UNSENT_STATUSES = set([429, 503])
+    #requests and httpx exceptions raised before the request could reach the API
+    UNSENT_ERRORS   = set(['ConnectTimeout', 'ConnectError'])
+
+    def __init__(self, attempts=RETRY_ATTEMPTS, baseDelay=RETRY_BASE_DELAY, maxDelay=RETRY_MAX_DELAY):
+        self.attempts   = max(attempts, 1)
+        self.baseDelay  = baseDelay
+        self.maxDelay   = maxDelay
+
+    def reason(self, method, endpoint, response=None, error=None):
+        #Why the request should be sent again (the status code, or the exception's name), or None when it shouldn't be
+        resendable = method.upper() != 'POST' or endpoint == 'token'
+        if error is not None:
+            errorName = type(error).__name__
+            return errorName if resendable or errorName in self.UNSENT_ERRORS else None
+        if response.status_code in self.RETRY_STATUSES and (resendable or response.status_code in self.UNSENT_STATUSES):
+            return str(response.status_code)
+        return None
+
+    def delay(self, attempt, response=None):
+        #Seconds to wait after the given attempt failed, before the next one
+        delay = random.uniform(0, min(self.maxDelay, self.baseDelay * 2 ** (attempt - 1)))
+        retryAfter = self.retryAfter(response)
+        return delay if retryAfter is None else max(delay, retryAfter)
+
+    @staticmethod
+    def retryAfter(response):
+        #Retry-After is either a number of seconds or an HTTP date
+        value = (response.headers.get('Retry-After') or "").strip() if response is not None else ""
+        if value == "":
+            return None
+        if re.match(r'^\d+(\.\d+)?$', value):
+            return float(value)
+        try:
+            retryAt = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retryAt.tzinfo is None:
+            retryAt = retryAt.replace(tzinfo=datetime.timezone.utc)
+        return max(0.0, (retryAt - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+
+class CircuitBreaker(object):
+    #Stops every worker sending requests to an endpoint that is down, instead of each of them using up its retries (and its rows) on it.
+    #After failureThreshold failed requests in a row the circuit opens and every request to the endpoint waits resetSeconds. Then one request
+    #is let through to try it: if that works the circuit closes and the import carries on, if not it stays open for resetSeconds more.
+    #Waiting doesn't use up a request's attempts, so an outage pauses the import rather than failing its rows. A threshold of 0 turns it off
+    def __init__(self, endpoint, failureThreshold=CIRCUIT_FAILURE_THRESHOLD, resetSeconds=CIRCUIT_RESET_SECONDS):
+        self.endpoint           = endpoint
+        self.failureThreshold   = failureThreshold
+        self.resetSeconds       = resetSeconds
+        self.failures           = 0
+        self.openedAt           = None
+        self.probing            = False
+        self.lock               = threading.Lock()
+
+    def reserve(self):
+        #Returns 0 when a request can be sent now, or the seconds to wait before asking again, so it can be waited on with sleep or asyncio.sleep
+        with self.lock:
+            if self.openedAt is None:
+                return 0
+            remaining = self.openedAt + self.resetSeconds - time.monotonic()
+            if remaining > 0:
+                return remaining
+            if self.probing:
+                #Another request is trying the endpoint
+                return min(1.0, self.resetSeconds)
+            self.probing = True
+            return 0
+
+    def finished(self, response):
+        #A response of any kind but a server error means the endpoint is up, even when it turned the request down
+        if response.status_code >= 500:
+            self.failed()
+        else:
+            self.succeeded()
+
+    def succeeded(self):
+        with self.lock:
+            self.failures = 0
+            self.probing = False
+            if self.openedAt is None:
+                return
+            self.openedAt = None
+        consoleLogger.warning("The FoD API's " + self.endpoint + " endpoint is answering again, carrying on with the import")
+
+    def failed(self):
+        with self.lock:
+            self.failures += 1
+            if self.probing:
+                self.probing = False
+            elif self.openedAt is not None or self.failureThreshold <= 0 or self.failures < self.failureThreshold:
+                return
+            self.openedAt = time.monotonic()
+        metrics.count('fodimport_circuit_opened_total', endpoint=self.endpoint)
+        consoleLogger.warning("The FoD API's " + self.endpoint + " endpoint has failed " + str(self.failures) + " times in a row, pausing requests to it for " +
+                              str(self.resetSeconds) + "s")
+
+class CircuitBreakers(object):
+    #A CircuitBreaker for each endpoint, created the first time the endpoint is used. All the workers sharing a client share its breakers
+    def __init__(self, failureThreshold=CIRCUIT_FAILURE_THRESHOLD, resetSeconds=CIRCUIT_RESET_SECONDS):
+        self.failureThreshold   = failureThreshold
+        self.resetSeconds       = resetSeconds
+        self.breakers           = {}
+        self.lock               = threading.Lock()
+
+    def forEndpoint(self, endpoint):
+        with self.lock:
+            breaker = self.breakers.get(endpoint)
+            if breaker is None:
+                breaker = self.breakers[endpoint] = CircuitBreaker(endpoint, self.failureThreshold, self.resetSeconds)
+            return breaker
+
+class FodClient(object):
+    #A single HTTP client shared by every call to the FoD API. It holds one requests Session, so connections (and their TLS handshakes) are
+    #kept alive and reused instead of opened for each call, and it is the one place that sets the API base URL, the bearer token, timeouts
+    #and the rate limit for each endpoint. Failed requests are sent again as its RetryPolicy says, behind a CircuitBreaker for each endpoint
+    DEFAULT_URL = 'https://api.ams.fortify.com'
+    #Exceptions of a request that didn't get a response, which may be worth sending again
+    TRANSPORT_ERRORS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+    #Longer and more specific paths first, so /applications/{id}/releases is counted as a release lookup and not an application call
+    ENDPOINT_PATTERNS = [
+        ('token',       re.compile(r'^/oauth/token')),
+        ('scan-setup',  re.compile(r'^/api/v3/releases/[^/]+/dynamic-scans')),
+        ('releases',    re.compile(r'^/api/v3/(applications/[^/]+/)?releases')),
+        ('applications', re.compile(r'^/api/v3/applications')),
+        ('users',       re.compile(r'^/api/v3/users')),
+        ('attributes',  re.compile(r'^/api/v3/attributes')),
+    ]
+
+    def __init__(self, baseUrl=DEFAULT_URL, limiter=None, poolSize=10, timeout=60, retry=None, breakers=None):
+        self.baseUrl    = baseUrl.rstrip('/')
+        self.limiter    = limiter if limiter is not None else RateLimiter.fromSpecs([])
+        self.timeout    = timeout
+        self.retry      = retry if retry is not None else RetryPolicy()
+        self.breakers   = breakers if breakers is not None else CircuitBreakers()
+        self.session    = requests.Session()
+        #pool_block makes a worker wait for a free connection rather than open (and later throw away) an extra one
+        self.adapter    = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=poolSize, pool_block=True)
+        self.session.mount('https://', self.adapter)
+        self.session.mount('http://', self.adapter)
+        self.session.headers.update({'Accept': "application/json"})
+        self.tokens     = None
+
+    def setBearerToken(self, bearerToken):
+        self.session.headers['authorization'] = "Bearer " + bearerToken
+
+    def useTokenManager(self, tokens):
+        #From now on every request asks the token manager for the current token, instead of using a fixed one
+        self.tokens = tokens
+
+    def endpointFor(self, path):
+        for endpoint, pattern in self.ENDPOINT_PATTERNS:
+            if pattern.match(path):
+                return endpoint
+        return '*'
+
+    def request(self, method, path, **kwargs):
+        #path is relative to the API base URL, e.g. /api/v3/users. Any extra arguments are passed through to requests.
+        #A token the API turns down (revoked, or expired earlier than it said) is replaced and the request sent once more. Other failures are
+        #sent again as the retry policy says, and once it gives up the last response is returned, or the last exception raised
+        endpoint        = self.endpointFor(path)
+        breaker         = self.breakers.forEndpoint(endpoint)
+        attempt         = 1
+        tokenReplaced   = False
+        while True:
+            bearerToken = None
+            if self.tokens is not None and endpoint != 'token':
+                bearerToken = self.tokens.token()
+                if bearerToken is None:
+                    raise ValueError("Could not get a bearer token from the FoD API")
+                kwargs['headers'] = dict(kwargs.get('headers') or {}, authorization="Bearer " + bearerToken)
+            wait = breaker.reserve()
+            while wait > 0:
+                sleep(wait)
+                wait = breaker.reserve()
+            try:
+                response = self.send(endpoint, method, path, **kwargs)
+            except Exception as error:
+                breaker.failed()
+                reason = self.retry.reason(method, endpoint, error=error) if isinstance(error, self.TRANSPORT_ERRORS) else None
+                if reason is None or attempt >= self.retry.attempts:
+                    raise
+                delay = self.retry.delay(attempt)
+            else:
+                breaker.finished(response)
+                if response.status_code == 401 and bearerToken is not None and not tokenReplaced:
+                    metrics.count('fodimport_retries_total', endpoint=endpoint, reason='401')
+                    self.tokens.invalidate(bearerToken)
+                    tokenReplaced = True
+                    continue
+                reason = self.retry.reason(method, endpoint, response=response)
+                if reason is None or attempt >= self.retry.attempts:
+                    return response
+                delay = self.retry.delay(attempt, response)
+            logRetry(method, path, endpoint, reason, attempt, self.retry.attempts, delay)
+            sleep(delay)
+            attempt += 1
+
+    def send(self, endpoint, method, path, **kwargs):
+        wait = self.limiter.reserve(endpoint)
+        if wait > 0:
+            metrics.count('fodimport_rate_limit_wait_seconds_total', wait, endpoint=endpoint)
+            sleep(wait)
+        kwargs.setdefault('timeout', self.timeout)
+        started = time.monotonic()
+        response = self.session.request(method.upper(), self.baseUrl + path, **kwargs)
+        recordRequest(endpoint, method, response, time.monotonic() - started, kwargs.get('data'))
+        return response
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def connectionSummary(self):
+        #urllib3 keeps a count of connections opened and requests sent for each pool, which shows how well connections were reused
+        connections = 0
+        requestsSent = 0
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            connections += pool.num_connections
+            requestsSent += pool.num_requests
+        return "Sent " + str(requestsSent) + " API requests over " + str(connections) + " connections"
+
+def logRetry(method, path, endpoint, reason, attempt, attempts, delay):
+    metrics.count('fodimport_retries_total', endpoint=endpoint, reason=reason)
+    logger.info(method.upper() + " " + path + " failed (" + reason + ") on attempt " + str(attempt) + " of " + str(attempts) + ", sending it again in " +
+                str(round(delay, 1)) + "s")
+
+def GetToken(client, apiKey, apiSecret):
+    #GetToken is the method used to authenticate to the FoD API, and extract the bearer token from the response
+    authorizationPayload, headers = tokenRequest(apiKey, apiSecret)
+    response = client.request("POST", '/oauth/token', data=authorizationPayload, headers=headers)
+    return tokenFromResponse(response)
+
+def tokenRequest(apiKey, apiSecret):
+    authorizationPayload = "scope=api-tenant&grant_type=client_credentials&client_id=" + apiKey + "&client_secret=" + apiSecret
+    headers = {
+        'content-type': "application/x-www-form-urlencoded",
+        'cache-control': "no-cache"
+    }
+    return authorizationPayload, headers
+
+def tokenFromResponse(response):
+    responseObject = json.loads(response.text)
+    bearer = responseObject.get("access_token", "no token")
+    
+    if bearer != "no token":
+        return responseObject['access_token']
+    else:
+        logger.error("Authentication failed: " + str(response.text))
+    
+    return None
+
+class AuthenticationError(Exception):
+    #Raised when the FoD API turns the key and secret down, so an import stops instead of ending as if there was nothing to import
+    pass
+
+class TokenManager(object):
+    #Keeps a valid bearer token for a client. The token is replaced TOKEN_REFRESH_MARGIN seconds before the expires_in the API gave with it,
+    #and only one worker asks for the new token while the others wait for it. Tokens are kept in the local cache (readable by the current
+    #user only), so a run started soon after another, or alongside it, uses the token that is already there instead of authenticating again.
+    #token() is for FodClient and tokenAsync() for AsyncFodClient, each with its own kind of lock
+    def __init__(self, client, apiKey, apiSecret, cache=None):
+        self.client         = client
+        self.apiKey         = apiKey
+        self.apiSecret      = apiSecret
+        self.cache          = cache if cache is not None else LocalCache(None)
+        self.lock           = threading.Lock()
+        self.asyncLock      = None
+        self.bearerToken    = None
+        self.refreshAt      = 0
+        self.rejected       = set()
+
+    def current(self):
+        #The token in use, when it isn't due to be replaced yet
+        if self.bearerToken is not None and time.time() < self.refreshAt:
+            return self.bearerToken
+        return None
+
+    def token(self):
+        bearerToken = self.current()
+        if bearerToken is not None:
+            return bearerToken
+        with self.lock:
+            #Another worker may have replaced the token while this one waited for the lock
+            if self.current() is None and not self.useCached():
+                authorizationPayload, headers = tokenRequest(self.apiKey, self.apiSecret)
+                self.received(self.client.request("POST", '/oauth/token', data=authorizationPayload, headers=headers))
+            return self.current()
+
+    async def tokenAsync(self):
+        import asyncio
+        bearerToken = self.current()
+        if bearerToken is not None:
+            return bearerToken
+        if self.asyncLock is None:
+            self.asyncLock = asyncio.Lock()
+        async with self.asyncLock:
+            if self.current() is None and not self.useCached():
+                authorizationPayload, headers = tokenRequest(self.apiKey, self.apiSecret)
+                self.received(await self.client.request("POST", '/oauth/token', data=authorizationPayload, headers=headers))
+            return self.current()
+
+    def invalidate(self, bearerToken):
+        #Called when the API turns a token down, so the next call to token() gets a new one rather than the same one from the cache
+        with self.lock:
+            self.rejected.add(bearerToken)
+            if self.bearerToken == bearerToken:
+                self.bearerToken = None
+
+    def useCached(self):
+        cached = self.cache.read('token', ignoreTtl=True)
+        if not cached or cached.get('accessToken') in self.rejected or time.time() >= cached.get('refreshAt', 0):
+            return False
+        self.bearerToken, self.refreshAt = cached['accessToken'], cached['refreshAt']
+        logger.info("Using the cached bearer token, valid for another " + str(int((self.refreshAt - time.time()) / 60)) + " minutes")
+        return True
+
+    def received(self, response):
+        try:
+            responseObject = json.loads(response.text)
+        except ValueError:
+            responseObject = {}
+        if not responseObject.get('access_token'):
+            logger.error("Authentication failed: " + str(response.text))
+            return
+        lifetime = float(responseObject.get('expires_in') or DEFAULT_TOKEN_LIFETIME)
+        self.bearerToken = responseObject['access_token']
+        self.refreshAt = time.time() + lifetime - min(TOKEN_REFRESH_MARGIN, lifetime / 5)
+        self.cache.write('token', {'accessToken': self.bearerToken, 'refreshAt': self.refreshAt}, private=True)
+        logger.info("Authenticated, the bearer token will be replaced in " + str(int((self.refreshAt - time.time()) / 60)) + " minutes")
+
+class LocalCache(object):
+    #Keeps lookup data that rarely changes (such as custom attribute definitions) in JSON files between runs. Files are named after a hash of the
+    #API URL and key, so different tenants never share entries, and an entry older than ttlHours is ignored. A directory of None turns caching off
+    def __init__(self, directory, ttlHours=24, scope=""):
+        self.directory  = directory if ttlHours > 0 else None
+        self.ttlSeconds = ttlHours * 3600
+        self.scope      = hashlib.sha256(scope.encode('utf-8')).hexdigest()[:16]
+
+    def path(self, name):
+        return os.path.join(self.directory, name + '-' + self.scope + '.json')
+
+    def read(self, name, ignoreTtl=False):
+        if self.directory is None:
+            return None
+        try:
+            with open(self.path(name)) as cacheFile:
+                entry = json.load(cacheFile)
+        except (IOError, OSError, ValueError):
+            return None
+        if not ignoreTtl and time.time() - entry.get('savedAt', 0) > self.ttlSeconds:
+            return None
+        return entry.get('data')
+
+    def write(self, name, data, private=False):
+        #private entries (such as the bearer token) are created readable and writable by the current user only
+        if self.directory is None:
+            return
+        try:
+            if not os.path.exists(self.directory):
+                os.makedirs(self.directory)
+            #Written to a temporary file and then renamed, so a run that is killed part way never leaves a half written cache behind.
+            #The temporary name is unique to the process, as parallel runs can write the same entry at the same time
+            temporaryPath = self.path(name) + '.' + str(os.getpid()) + '.tmp'
+            if private:
+                with os.fdopen(os.open(temporaryPath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w') as cacheFile:
+                    json.dump({'savedAt': time.time(), 'data': data}, cacheFile)
+                os.chmod(temporaryPath, 0o600)
+            else:
+                with open(temporaryPath, 'w') as cacheFile:
+                    json.dump({'savedAt': time.time(), 'data': data}, cacheFile)
+            os.replace(temporaryPath, self.path(name))
+        except (IOError, OSError) as error:
+            logger.warning("Could not write the " + name + " cache: " + str(error))
+
+class AsyncFodClient(object):
+    #The asyncio counterpart of FodClient, for running the import inside an event loop (e.g. from a service) without blocking it.
+    #Requests are sent with httpx when it is installed, over HTTP/2 when h2 is installed too, so concurrent requests share a few multiplexed
+    #connections. Without httpx each request is sent by a FodClient on the event loop's thread pool instead. At most maxConcurrency
+    #requests are in flight at once, and the rate limiter is waited on with asyncio.sleep
+    DEFAULT_URL         = FodClient.DEFAULT_URL
+    ENDPOINT_PATTERNS   = FodClient.ENDPOINT_PATTERNS
+    endpointFor         = FodClient.endpointFor
+
+    def __init__(self, baseUrl=DEFAULT_URL, limiter=None, maxConcurrency=10, timeout=60, http2=True, retry=None, breakers=None):
+        self.baseUrl        = baseUrl.rstrip('/')
+        self.limiter        = limiter if limiter is not None else RateLimiter.fromSpecs([])
+        self.maxConcurrency = maxConcurrency
+        self.retry          = retry if retry is not None else RetryPolicy()
+        self.breakers       = breakers if breakers is not None else CircuitBreakers()
+        self.transportErrors = FodClient.TRANSPORT_ERRORS
+        self.slots          = None
+        self.requestsSent   = 0
+        self.httpVersions   = set()
+        self.tokens         = None
+        try:
+            import httpx
+        except ImportError:
+            httpx = None
+        if httpx is None:
+            self.http       = None
+            #The limit is already waited for here, so the FodClient doing the sending is given no limit of its own
+            self.syncClient = FodClient(baseUrl, RateLimiter({}), maxConcurrency, timeout)
+            return
+        if http2 and importlib.util.find_spec('h2') is None:
+            #httpx only needs h2 for HTTP/2, and looking for it is enough to know whether it is there
+            http2 = False
+        self.syncClient     = None
+        self.transportErrors = FodClient.TRANSPORT_ERRORS + (httpx.TransportError,)
+        self.http           = httpx.AsyncClient(http2=http2, timeout=timeout, headers={'Accept': "application/json"},
+                                                limits=httpx.Limits(max_connections=maxConcurrency, max_keepalive_connections=maxConcurrency))
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *excInfo):
+        await self.aclose()
+
+    async def aclose(self):
+        if self.http is not None:
+            await self.http.aclose()
+
+    def setBearerToken(self, bearerToken):
+        if self.http is None:
+            self.syncClient.setBearerToken(bearerToken)
+        else:
+            self.http.headers['authorization'] = "Bearer " + bearerToken
+
+    def useTokenManager(self, tokens):
+        self.tokens = tokens
+
+    async def request(self, method, path, data=None, params=None, headers=None):
+        #Takes the same arguments as FodClient.request, and returns an httpx response (or a requests response without httpx). Both have
+        #text and status_code, which is all the shared response readers use. As with FodClient, a turned down token is replaced once and
+        #other failures are sent again as the retry policy says, with the waits (and an open circuit) waited out with asyncio.sleep.
+        #asyncio is imported in the coroutines that use it, so the requests client and --validate start without it
+        import asyncio
+        endpoint        = self.endpointFor(path)
+        breaker         = self.breakers.forEndpoint(endpoint)
+        attempt         = 1
+        tokenReplaced   = False
+        while True:
+            bearerToken = None
+            sendHeaders = headers
+            if self.tokens is not None and endpoint != 'token':
+                bearerToken = await self.tokens.tokenAsync()
+                if bearerToken is None:
+                    raise ValueError("Could not get a bearer token from the FoD API")
+                sendHeaders = dict(headers or {}, authorization="Bearer " + bearerToken)
+            wait = breaker.reserve()
+            while wait > 0:
+                await asyncio.sleep(wait)
+                wait = breaker.reserve()
+            try:
+                response = await self.send(endpoint, method, path, data, params, sendHeaders)
+            except Exception as error:
+                breaker.failed()
+                reason = self.retry.reason(method, endpoint, error=error) if isinstance(error, self.transportErrors) else None
+                if reason is None or attempt >= self.retry.attempts:
+                    raise
+                delay = self.retry.delay(attempt)
+            else:
+                breaker.finished(response)
+                if response.status_code == 401 and bearerToken is not None and not tokenReplaced:
+                    metrics.count('fodimport_retries_total', endpoint=endpoint, reason='401')
+                    self.tokens.invalidate(bearerToken)
+                    tokenReplaced = True
+                    continue
+                reason = self.retry.reason(method, endpoint, response=response)
+                if reason is None or attempt >= self.retry.attempts:
+                    return response
+                delay = self.retry.delay(attempt, response)
+            logRetry(method, path, endpoint, reason, attempt, self.retry.attempts, delay)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def send(self, endpoint, method, path, data, params, headers):
+        import asyncio
+        if self.slots is None:
+            #Created on first use, so the semaphore belongs to the loop the client is used on
+            self.slots = asyncio.Semaphore(self.maxConcurrency)
+        wait = self.limiter.reserve(endpoint)
+        if wait > 0:
+            metrics.count('fodimport_rate_limit_wait_seconds_total', wait, endpoint=endpoint)
+            await asyncio.sleep(wait)
+        async with self.slots:
+            if self.http is None:
+                loop = asyncio.get_event_loop()
+                response = await loop.run_in_executor(None, functools.partial(self.syncClient.send, endpoint, method, path, data=data, params=params, headers=headers))
+            else:
+                started = time.monotonic()
+                response = await self.http.request(method.upper(), self.baseUrl + path, content=data, params=params, headers=headers)
+                recordRequest(endpoint, method, response, time.monotonic() - started, data)
+                self.httpVersions.add(response.http_version)
+        self.requestsSent += 1
+        return response
+
+    async def get(self, path, **kwargs):
+        return await self.request("GET", path, **kwargs)
+
+    def connectionSummary(self):
+        if self.http is None:
+            return self.syncClient.connectionSummary()
+        return "Sent " + str(self.requestsSent) + " API requests over " + (", ".join(sorted(self.httpVersions)) or "no connections")
+
+async def GetTokenAsync(client, apiKey, apiSecret):
+    authorizationPayload, headers = tokenRequest(apiKey, apiSecret)
+    response = await client.request("POST", '/oauth/token', data=authorizationPayload, headers=headers)
+    return tokenFromResponse(response)
@@ -0,0 +1,27 @@
+#Tuning values shared by the modules of the package, kept apart so the command line can show them as defaults without importing the rest
+
+#Number of pages of a listing (users, applications, releases) that are fetched at the same time, when there are fewer workers than this
+PAGE_WORKERS = 4
+#Users are listed in the order of their IDs, so those added since the user cache was saved come after the users it already has
+USER_ORDER = {'orderBy': 'userId', 'orderByDirection': 'ASC'}
+#Number of user names looked up in a single filtered request when only the owners named in the file are resolved
+OWNER_BATCH_SIZE = 10
+#New applications whose release is looked up in one /releases request, and how many seconds the release stage waits for the batch to fill
+RELEASE_BATCH_SIZE = 25
+RELEASE_BATCH_WAIT = 0.2
+#Rows the async import reads from the file at a time, on a thread of the loop's executor so the parsing doesn't block the event loop
+ROW_READ_CHUNK = 100
+#Number of distinct site availability cells whose blockout JSON is kept, most rows share one of a few schedules
+AVAILABILITY_CACHE_SIZE = 256
+#Upper bounds (in seconds) of the buckets of every latency histogram, as exported to Prometheus
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0]
+#Seconds before a bearer token expires that it is replaced (at most a fifth of its lifetime), and the lifetime assumed when the API doesn't say
+TOKEN_REFRESH_MARGIN = 300
+DEFAULT_TOKEN_LIFETIME = 3600
+#Attempts at a request that fails for a reason that may pass, and the first and longest waits (in seconds) between them
+RETRY_ATTEMPTS = 5
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 60.0
+#Failed requests in a row after which an endpoint's circuit opens, and the seconds every request to it then waits before one tries again
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_RESET_SECONDS = 30.0
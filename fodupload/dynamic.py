@@ -0,0 +1,184 @@
+#The configure-dynamic command, which fills out the dynamic scan setup of releases that are already in FoD from the dynamic scan columns
+#of an import file, without creating or changing applications or releases
+import os
+import csv
+import json
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from .constants import PAGE_WORKERS
+from .logs import consoleLogger, logger, rowLog
+from .metrics import metrics
+from .rows import DynamicScanSettings, RowReader, normalizeHeader
+from .client import FodClient, LocalCache, TokenManager
+from .api import ApplicationIndex, getAllPagesConcurrently, populateDynamicForm
+from .reconcile import fetchScanSetup, scanSetupDifferences
+
+def ConfigureDynamicScans(uploadFile, apiKey, apiSecret, client=None, cache=None, releaseSource='lookup', journal=None, workers=PAGE_WORKERS,
+                          force=False, dryRun=False, reportPath=None):
+    #The configure-dynamic command: finds the release of every row (releaseSource is 'journal', 'lookup' or the path of a CSV file, see
+    #releaseIdsFor), then workers threads each fetch a release's scan setup, compare it with the row's and send the row's setup when they
+    #differ, all within the scan-setup rate limit. With force every release is sent its setup without fetching it first, and with dryRun
+    #nothing is sent. Rows that were imported are recorded in the journal. Returns the number of rows with each status, or None when
+    #authentication failed
+    if client is None:
+        client = FodClient(poolSize=workers + 2)
+    if cache is None:
+        cache = LocalCache(None)
+
+    rows            = list(RowReader(uploadFile, requireDynamic=True))
+    tokens          = TokenManager(client, apiKey, apiSecret, cache)
+    if tokens.token() is None:
+        return None
+    client.useTokenManager(tokens)
+    journalEntries  = journal.entries() if journal is not None else {}
+    releaseIds      = releaseIdsFor(rows, releaseSource, client, journalEntries, workers)
+
+    results = [DynamicSetupResult(row, releaseIds.get(row.rowNumber)) for row in rows]
+    withRelease = [result for result in results if result.releaseId is not None]
+    if withRelease:
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(withRelease)))) as executor:
+            for result in executor.map(lambda result: result.configure(client, force, dryRun), withRelease):
+                entry = journalEntries.get(result.row.rowNumber)
+                if journal is not None and result.dynamicStatus() and entry is not None and entry['applicationName'] == result.row.applicationName:
+                    journal.record(result.row, releaseId=result.releaseId, dynamicStatus=result.dynamicStatus())
+
+    counts = OrderedDict((status, 0) for status in DynamicSetupResult.STATUSES)
+    for result in results:
+        counts[result.status] += 1
+        if result.status not in ('configured', 'unchanged'):
+            consoleLogger.info("Row " + str(result.row.rowNumber) + " (" + result.row.applicationName + "): " + result.status +
+                               (", " + "; ".join(result.details) if result.details else ""), extra=rowLog(result.row, 'dynamic', status=result.status))
+    if reportPath:
+        writeConfigureReport(reportPath, results)
+
+    consoleLogger.info("Dynamic scan setup of " + str(len(results)) + " rows of " + uploadFile + ": " +
+                       ", ".join(str(count) + " " + status for status, count in counts.items() if count) + (", see " + reportPath if reportPath else ""))
+    return counts
+
+class DynamicSetupResult(object):
+    #What configure-dynamic did for one row: configured (its setup was sent), unchanged (FoD already has it), pending (it would have been
+    #sent, with dryRun), missing (no release ID was found for it) or failed (FoD turned it down)
+    STATUSES = ['configured', 'unchanged', 'pending', 'missing', 'failed']
+    __slots__ = ['row', 'releaseId', 'status', 'details']
+
+    def __init__(self, row, releaseId):
+        self.row        = row
+        self.releaseId  = releaseId
+        self.status     = 'missing' if releaseId is None else None
+        self.details    = ["No release ID found"] if releaseId is None else []
+
+    def configure(self, client, force, dryRun):
+        #Runs on a worker thread: one GET of the release's setup and, when it differs, one PUT of the row's. A row whose dynamic scan columns
+        #can't be parsed (e.g. the Site Availability) fails on its own, and the other rows carry on
+        try:
+            return self.configureSetup(client, force, dryRun)
+        except ValueError as error:
+            self.status = 'failed'
+            self.details.append("Dynamic scan columns: " + str(error))
+            logger.warning("Row " + str(self.row.rowNumber) + ": dynamic scan setup not sent: " + str(error), extra=rowLog(self.row, 'dynamic', status='failed'))
+            return self
+
+    def configureSetup(self, client, force, dryRun):
+        if not force:
+            scanSetup = fetchScanSetup(client, self.releaseId)
+            if isinstance(scanSetup, Exception):
+                #The PUT replaces the whole setup, so sending it is still right when there is no telling whether it is needed
+                self.details.append("Could not fetch the current setup: " + repr(scanSetup))
+            else:
+                differences = scanSetupDifferences(self.row, scanSetup)
+                if differences == []:
+                    self.status = 'unchanged'
+                    return self
+                self.details.append("Not in FoD" if differences is None else "Differs in " + ", ".join(differences))
+        if dryRun:
+            self.status = 'pending'
+            return self
+        self.status = 'configured' if populateDynamicForm(client, self.releaseId, DynamicScanSettings(self.row)) else 'failed'
+        metrics.count('fodimport_dynamic_forms_total', status='done' if self.status == 'configured' else 'failed')
+        logger.info("Row " + str(self.row.rowNumber) + ": dynamic scan setup of release " + str(self.releaseId) + " " + self.status,
+                    extra=rowLog(self.row, 'dynamic', status=self.status))
+        return self
+
+    def dynamicStatus(self):
+        #The journal's dynamicStatus for the row once this has run, or None when it says nothing new
+        if self.status in ('configured', 'unchanged'):
+            return 'done'
+        return 'failed' if self.status == 'failed' else None
+
+def releaseIdsFor(rows, releaseSource, client, journalEntries, workers):
+    #The release ID of each row, by row number. releaseSource is 'journal' for the IDs the import recorded, 'lookup' for the release named
+    #in the row as FoD lists it now, or the path of a CSV file with the IDs (see releaseIdsFromCsv)
+    if releaseSource == 'journal':
+        return releaseIdsFromJournal(rows, journalEntries)
+    if releaseSource == 'lookup':
+        return releaseIdsFromLookup(rows, client, workers)
+    return releaseIdsFromCsv(rows, releaseSource)
+
+def releaseIdsFromJournal(rows, journalEntries):
+    #An entry the journal holds for another application (the file has changed since) says nothing about the row
+    releaseIds = {}
+    for row in rows:
+        entry = journalEntries.get(row.rowNumber)
+        if entry is not None and entry['applicationName'] == row.applicationName and entry['releaseId'] is not None:
+            releaseIds[row.rowNumber] = entry['releaseId']
+    return releaseIds
+
+def releaseIdsFromLookup(rows, client, workers):
+    #Lists the tenant's applications and releases with two concurrent paged listings, as reconcile does, and matches the rows by name
+    applicationList, applicationCount = getAllPagesConcurrently(client, '/api/v3/applications', workers=workers)
+    releaseList, releaseCount = getAllPagesConcurrently(client, '/api/v3/releases', workers=workers)
+    logger.info("Found " + str(applicationCount) + " applications and " + str(releaseCount) + " releases in FoD")
+    applications = ApplicationIndex(applicationList, releaseList).applications
+    releaseIds = {}
+    for row in rows:
+        application = applications.get(row.applicationName.lower())
+        releaseId = application['releases'].get(row.releaseName.lower()) if application is not None else None
+        if releaseId is not None:
+            releaseIds[row.rowNumber] = releaseId
+    return releaseIds
+
+def releaseIdsFromCsv(rows, path):
+    #A CSV file with a Release ID column and either Application Name (and Release Name, for applications with more than one release in
+    #the file) or Row columns to say which row each ID is for. The reconcile and configure-dynamic reports are such files
+    with open(path, newline='', encoding='utf-8-sig') as releaseFile:
+        reader = csv.reader(releaseFile)
+        columns = dict((normalizeHeader(header), index) for index, header in enumerate(next(reader, None) or []))
+        if 'releaseid' not in columns or ('applicationname' not in columns and 'row' not in columns):
+            raise ValueError(path + " should have a Release ID column, and an Application Name or Row column")
+        byName, byRow = {}, {}
+        for line in reader:
+            releaseId, applicationName, releaseName, rowNumber = [csvValue(line, columns, column) for column in ('releaseid', 'applicationname', 'releasename', 'row')]
+            if not releaseId.isdigit():
+                continue
+            if applicationName:
+                byName[(applicationName.lower(), releaseName.lower())] = int(releaseId)
+            if rowNumber.isdigit():
+                byRow[int(rowNumber)] = int(releaseId)
+
+    releaseIds = {}
+    for row in rows:
+        applicationName = row.applicationName.lower()
+        releaseId = byName.get((applicationName, row.releaseName.lower()), byName.get((applicationName, ""), byRow.get(row.rowNumber)))
+        if releaseId is not None:
+            releaseIds[row.rowNumber] = releaseId
+    return releaseIds
+
+def csvValue(line, columns, column):
+    index = columns.get(column)
+    return line[index].strip() if index is not None and index < len(line) else ""
+
+def writeConfigureReport(reportPath, results):
+    directory = os.path.dirname(reportPath)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    with open(reportPath, 'w', newline='', encoding='utf-8') as reportFile:
+        if reportPath.lower().endswith('.json'):
+            json.dump([OrderedDict([('row', result.row.rowNumber), ('applicationName', result.row.applicationName), ('releaseName', result.row.releaseName),
+                                    ('status', result.status), ('releaseId', result.releaseId), ('details', result.details)]) for result in results],
+                      reportFile, indent=2)
+            return
+        writer = csv.writer(reportFile)
+        writer.writerow(['Row', 'Application Name', 'Release Name', 'Status', 'Release ID', 'Details'])
+        for result in results:
+            writer.writerow([result.row.rowNumber, result.row.applicationName, result.row.releaseName, result.status, result.releaseId or "",
+                             "; ".join(result.details)])
@@ -0,0 +1,571 @@
+#The import itself: AddApplications runs each row through the stages of an ImportPipeline on threads, AddApplicationsAsync runs the
+#same steps as tasks on an event loop
+import logging
+import time
+import threading
+import queue
+import functools
+import itertools
+from collections import OrderedDict
+from .constants import PAGE_WORKERS, RELEASE_BATCH_SIZE, RELEASE_BATCH_WAIT, ROW_READ_CHUNK
+from .logs import logger, progressLogger, rowLog
+from .metrics import metrics
+from .rows import DynamicScanSettings, RowReader, collectOwners
+from .client import AsyncFodClient, AuthenticationError, FodClient, LocalCache, TokenManager
+from .journal import DeadLetterFile, ImportJournal, RowSync, reportRemoved
+from .api import ApplicationIndex, AttributeCatalog, createApplication, createApplicationAsync, createRelease, createReleaseAsync, loadAttributesAsync, lookupReleases, lookupReleasesAsync, populateDynamicForm, populateDynamicFormAsync, resolveOwners, resolveOwnersAsync, setCustomAttributeValue, updateApplication, updateApplicationAsync, updateRelease, updateReleaseAsync, warnApplicationType
+from .validate import RowValidator
+
+def AddApplications(uploadFile, apiKey, apiSecret, workers=1, client=None, cache=None, ownerLookupThreshold=100, journal=None, stageWorkers=None, queueSize=None, fillDynamicForm=False,
+                    shard=None, deadLetter=None):
+    #The AddApplications method is used for onboarding applications in to the Fortify on Demand environment, from an Excel spreadsheet
+    #This method takes 3 arguments, the file with the data for upload, and the key and secret pair furnished for the FoD API
+    #Rows flow through the stages of an ImportPipeline, each with its own workers, and the rate limiter decides how fast requests go out
+    #instead of a fixed sleep after every row. All requests go through the one client, so connections to the API are kept open and reused.
+    #Each step of each row is recorded in the journal as soon as it succeeds, so a resumed import only repeats the steps that had not finished.
+    #fillDynamicForm (-d) also fills out the dynamic scan form of each row's release. With a shard, (index, count), only that share of the
+    #rows is imported (see inShard). Rows that fail after reaching the API are written to the deadLetter file
+
+    if client is None:
+        client = FodClient(poolSize=workers + 2)
+    if cache is None:
+        cache = LocalCache(None)
+    if journal is None:
+        journal = ImportJournal(':memory:', uploadFile)
+    if stageWorkers is None:
+        stageWorkers = parseStageWorkers([], workers)
+    if deadLetter is None:
+        deadLetter = DeadLetterFile(None)
+
+    #Rows are read one at a time as they are needed, and the header row is checked before anything is sent to the API
+    appData         = RowReader(uploadFile, requireDynamic=fillDynamicForm, shard=shard)
+    #The token manager replaces the bearer token before it expires, so imports that run for hours keep working
+    tokens          = TokenManager(client, apiKey, apiSecret, cache)
+    bearerToken     = tokens.token()
+    if bearerToken is None:
+        #TokenManager has already logged what the API said
+        raise AuthenticationError("Could not authenticate with the FoD API, so no rows were imported")
+
+    client.useTokenManager(tokens)
+    allUsers    = resolveOwners(client, collectOwners(uploadFile, shard), cache, workers, ownerLookupThreshold)
+    #Attribute definitions are fetched the first time a row needs one, and then every row is resolved from memory
+    catalog     = AttributeCatalog(client, cache)
+    #The tenant's applications and releases are listed once, so rows that already exist in FoD are recognised without a request each
+    applications = ApplicationIndex.load(client, max(workers, PAGE_WORKERS))
+    pipeline    = ImportPipeline(client, allUsers, catalog, applications, journal, RowProgress(None if shard else appData.totalRows), fillDynamicForm,
+                                 stageWorkers, queueSize, deadLetter)
+    pipeline.run(appData)
+    if journal.syncName is not None:
+        reportRemoved(journal.removedFromSync(shard))
+
+    logger.info(pipeline.summary())
+    logger.info(client.connectionSummary())
+    logger.info(journal.summary())
+
+def parseStageWorkers(specs, workers):
+    #Reads --stage-workers values such as "create=4,dynamic=2" in to a worker count per stage. Stages that aren't named get the --workers
+    #count, except the release stage, where one worker is enough because it looks releases up in batches
+    stageWorkers = dict((stageName, workers) for stageName in ImportPipeline.STAGES)
+    stageWorkers['release'] = 1
+    for spec in specs:
+        for part in spec.split(','):
+            stageName, separator, count = part.strip().partition('=')
+            if stageName not in stageWorkers or not separator or not count.strip().isdigit() or int(count) < 1:
+                raise ValueError("Stage workers '" + part + "' should look like create=4, with a stage of " + ", ".join(ImportPipeline.STAGES))
+            stageWorkers[stageName] = int(count)
+    return stageWorkers
+
+class ImportTask(object):
+    #A row on its way through the import pipeline, with what has been learned about it so far
+    def __init__(self, row, rowProgress):
+        self.row            = row
+        self.rowProgress    = rowProgress
+        self.applicationId  = rowProgress.get('applicationId')
+        self.releaseId      = rowProgress.get('releaseId')
+        self.ownerId        = None
+        self.attributeArray = []
+        #The row's release was in FoD before this run, so its dynamic scan form is left as it is (see ImportPipeline.afterRelease)
+        self.releaseExisted = False
+        self.stage          = 'parse'
+        self.startedAt      = time.monotonic()
+        self.sync           = None
+        self.dynamicStatus  = None
+
+class PipelineStage(object):
+    #One step of the import pipeline: a bounded queue and the worker threads that take rows off it. When the queue is full, whoever is
+    #handing rows to this stage waits, so a slow stage holds back the stages in front of it instead of letting rows pile up in memory.
+    #With a batchSize above one, a worker takes up to that many rows at a time, waiting at most maxWait seconds for the batch to fill
+    STOP = object()
+
+    def __init__(self, name, handler, workers, queueSize=None, batchSize=1, maxWait=0):
+        self.name       = name
+        self.handler    = handler
+        self.batchSize  = batchSize
+        self.maxWait    = maxWait
+        self.queue      = queue.Queue(queueSize or max(workers * 2, batchSize))
+        self.threads    = [threading.Thread(target=self.work, name=name + '-' + str(number)) for number in range(workers)]
+        self.lock       = threading.Lock()
+        self.handled    = 0
+        self.busySeconds = 0.0
+
+    def start(self):
+        for thread in self.threads:
+            thread.daemon = True
+            thread.start()
+
+    def put(self, task):
+        self.queue.put(task)
+
+    def finish(self):
+        #Called once nothing more will be put on the queue. Returns when every row already on it has been handled
+        for thread in self.threads:
+            self.queue.put(self.STOP)
+        for thread in self.threads:
+            thread.join()
+
+    def work(self):
+        while True:
+            tasks = self.take()
+            if tasks is None:
+                return
+            started = time.monotonic()
+            self.handler(tasks if self.batchSize > 1 else tasks[0])
+            busySeconds = time.monotonic() - started
+            metrics.observe('fodimport_stage_seconds', busySeconds, stage=self.name)
+            if logger.isEnabledFor(logging.DEBUG):
+                for task in tasks:
+                    logger.debug("Row " + str(task.row.rowNumber) + ": " + self.name + " stage finished", extra=rowLog(task.row, self.name, busySeconds))
+            with self.lock:
+                self.handled += len(tasks)
+                self.busySeconds += busySeconds
+
+    def take(self):
+        #Returns the next batch of tasks, or None when the stage is stopping. A STOP that arrives while a batch is being filled is put back
+        #for the next take, so the batch is handled before the worker stops. Nothing but STOPs can follow it, so its place doesn't matter
+        task = self.queue.get()
+        if task is self.STOP:
+            return None
+        tasks = [task]
+        deadline = time.monotonic() + self.maxWait
+        while len(tasks) < self.batchSize:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                task = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if task is self.STOP:
+                self.queue.put(task)
+                break
+            tasks.append(task)
+        return tasks
+
+class ImportPipeline(object):
+    #The import as a chain of stages connected by bounded queues, so a slow step (usually filling out dynamic scan forms) no longer holds up
+    #the creation of the next applications:
+    #  parse    - runs on the thread reading the file, checks the journal and that the row has its required values
+    #  resolve  - looks the row up in the index of existing applications, and for rows that need writing finds the owner and attribute IDs
+    #  create   - creates the application, or adds the missing release or business criticality to an existing one
+    #  release  - looks up the releases of new applications, RELEASE_BATCH_SIZE applications per request
+    #  dynamic  - fills out the dynamic scan form (-d)
+    #A row only visits the stages it needs and always in this order, and every stage has its own workers and queue
+    STAGES = ['resolve', 'create', 'release', 'dynamic']
+
+    def __init__(self, client, allUsers, catalog, applications, journal, progress, fillDynamicForm, stageWorkers, queueSize=None, deadLetter=None):
+        self.client             = client
+        self.allUsers           = allUsers
+        self.catalog            = catalog
+        self.applications       = applications
+        self.journal            = journal
+        self.progress           = progress
+        self.fillDynamicForm    = fillDynamicForm
+        self.deadLetter         = deadLetter if deadLetter is not None else DeadLetterFile(None)
+        self.validator          = RowValidator(allUsers, catalog, fillDynamicForm, applications)
+        self.stages             = OrderedDict()
+        self.stages['resolve']  = PipelineStage('resolve', self.guarded(self.resolveIds), stageWorkers['resolve'], queueSize)
+        self.stages['create']   = PipelineStage('create', self.guarded(self.createOrUpdate), stageWorkers['create'], queueSize)
+        self.stages['release']  = PipelineStage('release', self.resolveReleases, stageWorkers['release'], queueSize, RELEASE_BATCH_SIZE, RELEASE_BATCH_WAIT)
+        self.stages['dynamic']  = PipelineStage('dynamic', self.guarded(self.configureDynamicScan), stageWorkers['dynamic'], queueSize)
+
+    def run(self, rows):
+        for stage in self.stages.values():
+            stage.start()
+        try:
+            for row in rows:
+                task = ImportTask(row, self.journal.progressFor(row))
+                try:
+                    self.parse(task)
+                except Exception as error:
+                    self.failed(task, error)
+        finally:
+            #Rows only move to later stages, so once a stage has finished nothing more can arrive at the next one
+            for stage in self.stages.values():
+                stage.finish()
+
+    def guarded(self, handler):
+        def handle(task):
+            try:
+                handler(task)
+            except Exception as error:
+                self.failed(task, error)
+        return handle
+
+    def forward(self, task, stageName):
+        task.stage = stageName
+        self.stages[stageName].put(task)
+
+    def afterRelease(self, task):
+        if self.fillDynamicForm and task.rowProgress.get('dynamicStatus') != 'done' and dynamicFormWanted(task.sync, task.releaseExisted):
+            self.forward(task, 'dynamic')
+        else:
+            self.done(task)
+
+    def afterCreate(self, task):
+        if task.releaseId is None:
+            self.forward(task, 'release')
+        else:
+            self.afterRelease(task)
+
+    def parse(self, task):
+        #Rows with values FoD would turn down are dropped here, before they use up any of the rate limit. They are still in the file, so
+        #--sync looks them up first and doesn't report them as removed
+        if self.journal.syncName is not None:
+            task.sync = RowSync(task.row, self.journal.syncedFor(task.row))
+        self.validator.check(task.row)
+        if task.sync is not None:
+            if task.sync.unchanged() and task.applicationId is None:
+                logger.info("Row " + str(task.row.rowNumber) + ": unchanged since the last sync " + task.row.applicationName, extra=rowLog(task.row, 'parse'))
+                task.applicationId, task.releaseId = task.sync.previous['applicationId'], task.sync.previous['releaseId']
+                self.applications.warnUnsynced(task.row)
+        if task.applicationId is None:
+            self.forward(task, 'resolve')
+        elif task.releaseId is None:
+            self.forward(task, 'release')
+        else:
+            self.afterRelease(task)
+
+    def resolveIds(self, task):
+        #A first look at the application index, without holding its lock. Rows that already match FoD skip straight past the create stage;
+        #the create stage checks again before it writes anything, in case another row has created the application since
+        row = task.row
+        action, application, changes = self.applications.classify(row, task.sync is not None and task.sync.applicationChanged(), self.ownerIdFor(row))
+        if application is not None:
+            warnApplicationType(row, application)
+        if action == 'unchanged':
+            logger.info("Row " + str(row.rowNumber) + ": unchanged " + row.get('applicationName'), extra=rowLog(row, 'resolve'))
+            task.releaseExisted = True
+            task.applicationId = application['applicationId']
+            task.releaseId = application['releases'].get(row.get('releaseName').lower())
+            self.journal.record(row, applicationId=task.applicationId, releaseId=task.releaseId, lastError=None)
+            self.afterCreate(task)
+            return
+        if action == 'create':
+            task.ownerId = str(self.allUsers[row.get('releaseOwner').lower()])
+        #Any column that is not part of the template is the name of a custom attribute, as with the Business Units column in the template
+        task.attributeArray = setCustomAttributeValue(self.catalog, row.attributes)
+        self.forward(task, 'create')
+
+    def createOrUpdate(self, task):
+        row = task.row
+        #Rows for the same application are handled one at a time, so two releases of a new application don't both try to create it
+        with self.applications.lockFor(row.get('applicationName')):
+            action, application, changes = self.applications.classify(row, task.sync is not None and task.sync.applicationChanged(), self.ownerIdFor(row))
+            logger.info("Row " + str(row.rowNumber) + ": " + action + " " + row.get('applicationName') + (" (" + ", ".join(changes) + ")" if changes else ""),
+                        extra=rowLog(row, 'create'))
+            if action == 'create':
+                if task.ownerId is None:
+                    task.ownerId = str(self.allUsers[row.get('releaseOwner').lower()])
+                task.applicationId, task.releaseId = createApplication(self.client, row, task.ownerId, task.attributeArray)
+                self.applications.addApplication(row, task.applicationId, task.releaseId, task.attributeArray)
+            else:
+                task.applicationId = application['applicationId']
+                task.releaseExisted = 'release' not in changes
+                if 'businessCriticality' in changes or 'attributes' in changes:
+                    updateApplication(self.client, row, application, task.attributeArray)
+                if 'releaseDetails' in changes:
+                    releaseId, release = self.applications.releaseFor(row, application)
+                    updateRelease(self.client, row, releaseId, release, self.ownerIdFor(row))
+                if 'release' in changes:
+                    self.applications.addRelease(row, createRelease(self.client, row, task.applicationId))
+                task.releaseId = application['releases'].get(row.get('releaseName').lower())
+        self.journal.record(row, applicationId=task.applicationId, releaseId=task.releaseId, lastError=None)
+        self.afterCreate(task)
+
+    def ownerIdFor(self, row):
+        #The user ID of the row's release owner, or None when FoD has no such user (the validator reports it)
+        return self.allUsers.get(row.get('releaseOwner').lower())
+
+    def resolveReleases(self, tasks):
+        try:
+            found = lookupReleases(self.client, [task.applicationId for task in tasks])
+        except Exception as error:
+            for task in tasks:
+                self.failed(task, error)
+            return
+        for task in tasks:
+            task.releaseId = found.get(str(task.applicationId))
+            if task.releaseId is None:
+                self.failed(task, KeyError("No release found for application " + str(task.applicationId)))
+                continue
+            self.applications.addRelease(task.row, task.releaseId)
+            self.journal.record(task.row, releaseId=task.releaseId, lastError=None)
+            self.afterRelease(task)
+
+    def configureDynamicScan(self, task):
+        task.dynamicStatus = 'done' if populateDynamicForm(self.client, task.releaseId, DynamicScanSettings(task.row)) else 'failed'
+        metrics.count('fodimport_dynamic_forms_total', status=task.dynamicStatus)
+        self.journal.record(task.row, dynamicStatus=task.dynamicStatus, lastError=None)
+        if task.dynamicStatus == 'failed':
+            self.deadLetter.add(task.row, "The dynamic scan form was not filled out")
+        self.done(task)
+
+    def done(self, task, outcome='done'):
+        if task.sync is not None and outcome == 'done':
+            self.journal.recordSynced(task.row, task.sync, task.applicationId, task.releaseId, task.dynamicStatus, self.fillDynamicForm)
+        metrics.count('fodimport_rows_total', outcome=outcome)
+        logger.info("Row " + str(task.row.rowNumber) + ": " + outcome, extra=rowLog(task.row, task.stage, time.monotonic() - task.startedAt, status=outcome))
+        progressLogger.info(self.progress.advance())
+
+    def failed(self, task, error):
+        logger.error("Row " + str(task.row.rowNumber) + ": " + repr(error), extra=rowLog(task.row, task.stage))
+        try:
+            if task.stage != 'parse':
+                self.deadLetter.add(task.row, repr(error))
+            self.journal.record(task.row, lastError=repr(error))
+        finally:
+            self.done(task, 'failed')
+
+    def summary(self):
+        #How many rows each stage handled and how long its workers were busy, to help choose --stage-workers
+        return "Pipeline stages: " + ", ".join(stage.name + " " + str(stage.handled) + " rows in " + str(round(stage.busySeconds, 1)) + "s busy (" +
+                                               str(len(stage.threads)) + " workers)" for stage in self.stages.values())
+
+class RowProgress(object):
+    #Keeps the running "Added x% of applications" count correct when several workers finish rows at the same time.
+    #CSV and JSON lines files are not counted up front, so for those only the number of rows done so far is shown
+    def __init__(self, totalRows):
+        self.totalRows  = totalRows
+        self.doneRows   = 0
+        self.lock       = threading.Lock()
+
+    def advance(self):
+        with self.lock:
+            self.doneRows += 1
+            if self.totalRows:
+                return "Added " + str(round((self.doneRows/self.totalRows)*100)) + " % of applications"
+            return "Added " + str(self.doneRows) + " applications"
+
+async def AddApplicationsAsync(uploadFile, apiKey, apiSecret, workers=1, client=None, cache=None, ownerLookupThreshold=100, journal=None, fillDynamicForm=False,
+                              shard=None, deadLetter=None):
+    #The asyncio counterpart of AddApplications: the same import, journal and caches, with every request awaited on the event loop instead of
+    #sent from worker threads. Up to workers rows are imported at once. A client that isn't passed in is created and closed here.
+    #asyncio is imported by the async code that uses it, not by this module, so the threaded import starts without it
+    import asyncio
+    ownClient = client is None
+    if ownClient:
+        client = AsyncFodClient(maxConcurrency=workers + 2)
+    if cache is None:
+        cache = LocalCache(None)
+    if journal is None:
+        journal = ImportJournal(':memory:', uploadFile)
+    if deadLetter is None:
+        deadLetter = DeadLetterFile(None)
+    loop = asyncio.get_event_loop()
+
+    try:
+        #Reading the whole file for its owners is the slowest part that doesn't touch the API, so it is kept off the event loop
+        appData         = await loop.run_in_executor(None, functools.partial(RowReader, uploadFile, requireDynamic=fillDynamicForm, shard=shard))
+        ownerNames      = await loop.run_in_executor(None, collectOwners, uploadFile, shard)
+        tokens          = TokenManager(client, apiKey, apiSecret, cache)
+        bearerToken     = await tokens.tokenAsync()
+        if bearerToken is None:
+            #TokenManager has already logged what the API said
+            raise AuthenticationError("Could not authenticate with the FoD API, so no rows were imported")
+
+        client.useTokenManager(tokens)
+        allUsers, catalog, applications = await asyncio.gather(resolveOwnersAsync(client, ownerNames, cache, ownerLookupThreshold),
+                                                               loadAttributesAsync(client, cache),
+                                                               ApplicationIndex.loadAsync(client))
+        importer    = AsyncImport(client, allUsers, catalog, applications, journal, RowProgress(None if shard else appData.totalRows), fillDynamicForm,
+                                  deadLetter)
+        await importer.run(appData, workers)
+        if journal.syncName is not None:
+            reportRemoved(journal.removedFromSync(shard))
+
+        logger.info(client.connectionSummary())
+        logger.info(journal.summary())
+    finally:
+        if ownClient:
+            await client.aclose()
+
+class AsyncImport(object):
+    #The asyncio counterpart of ImportPipeline. Each row is one task that goes through the same steps in the same order (create or update,
+    #release lookup, dynamic scan form), recording each in the journal, and at most workers rows are in progress at once
+    def __init__(self, client, allUsers, catalog, applications, journal, progress, fillDynamicForm, deadLetter=None):
+        self.client             = client
+        self.allUsers           = allUsers
+        self.catalog            = catalog
+        self.applications       = applications
+        self.journal            = journal
+        self.progress           = progress
+        self.fillDynamicForm    = fillDynamicForm
+        self.deadLetter         = deadLetter if deadLetter is not None else DeadLetterFile(None)
+        self.validator          = RowValidator(allUsers, catalog, fillDynamicForm, applications)
+        self.releases           = None
+        self.nameLocks          = {}
+
+    async def run(self, rows, workers):
+        #A row waiting for its release keeps its place among the workers, so the batch is sent as soon as every row in progress is waiting.
+        #Rows are read ROW_READ_CHUNK at a time on the loop's executor, as parsing a spreadsheet would otherwise hold up every request in flight
+        import asyncio
+        loop = asyncio.get_event_loop()
+        self.releases = AsyncReleaseLookup(self.client, min(RELEASE_BATCH_SIZE, max(workers, 1)))
+        slots = asyncio.Semaphore(max(workers, 1))
+        running = set()
+        rows = iter(rows)
+        while True:
+            chunk = await loop.run_in_executor(None, lambda: list(itertools.islice(rows, ROW_READ_CHUNK)))
+            if not chunk:
+                break
+            for row in chunk:
+                await slots.acquire()
+                task = asyncio.ensure_future(self.importRow(row))
+                running.add(task)
+                task.add_done_callback(running.discard)
+                task.add_done_callback(lambda finished: slots.release())
+        if running:
+            await asyncio.gather(*running)
+
+    async def importRow(self, row):
+        startedAt       = time.monotonic()
+        stage           = 'parse'
+        rowProgress     = self.journal.progressFor(row)
+        applicationId   = rowProgress.get('applicationId')
+        releaseId       = rowProgress.get('releaseId')
+        releaseExisted  = False
+        sync            = None
+        dynamicStatus   = None
+        try:
+            if self.journal.syncName is not None:
+                sync = RowSync(row, self.journal.syncedFor(row))
+            self.validator.check(row)
+            if sync is not None:
+                if sync.unchanged() and applicationId is None:
+                    logger.info("Row " + str(row.rowNumber) + ": unchanged since the last sync " + row.applicationName, extra=rowLog(row, 'parse'))
+                    applicationId, releaseId = sync.previous['applicationId'], sync.previous['releaseId']
+                    self.applications.warnUnsynced(row)
+            if applicationId is None:
+                stage = 'create'
+                applicationId, releaseId, releaseExisted = await self.createOrUpdate(row, sync is not None and sync.applicationChanged())
+                self.journal.record(row, applicationId=applicationId, releaseId=releaseId, lastError=None)
+            if releaseId is None:
+                stage = 'release'
+                releaseId = await self.releases.resolve(applicationId)
+                self.applications.addRelease(row, releaseId)
+                self.journal.record(row, releaseId=releaseId, lastError=None)
+            if self.fillDynamicForm and rowProgress.get('dynamicStatus') != 'done' and dynamicFormWanted(sync, releaseExisted):
+                stage = 'dynamic'
+                dynamicStatus = 'done' if await populateDynamicFormAsync(self.client, releaseId, DynamicScanSettings(row)) else 'failed'
+                metrics.count('fodimport_dynamic_forms_total', status=dynamicStatus)
+                self.journal.record(row, dynamicStatus=dynamicStatus, lastError=None)
+                if dynamicStatus == 'failed':
+                    self.deadLetter.add(row, "The dynamic scan form was not filled out")
+            if sync is not None:
+                self.journal.recordSynced(row, sync, applicationId, releaseId, dynamicStatus, self.fillDynamicForm)
+            outcome = 'done'
+        except Exception as error:
+            outcome = 'failed'
+            logger.error("Row " + str(row.rowNumber) + ": " + repr(error), extra=rowLog(row, stage))
+            if stage != 'parse':
+                self.deadLetter.add(row, repr(error))
+            self.journal.record(row, lastError=repr(error))
+        finally:
+            metrics.count('fodimport_rows_total', outcome=outcome)
+            logger.info("Row " + str(row.rowNumber) + ": " + outcome, extra=rowLog(row, stage, time.monotonic() - startedAt, status=outcome))
+            progressLogger.info(self.progress.advance())
+
+    async def createOrUpdate(self, row, columnsChanged=False):
+        #Returns (applicationId, releaseId, releaseExisted) for the row, creating or updating the application as ImportPipeline's create stage does.
+        #Rows for the same application wait for each other, so two releases of a new application don't both try to create it
+        import asyncio
+        nameLock = self.nameLocks.setdefault(row.get('applicationName').lower(), asyncio.Lock())
+        async with nameLock:
+            ownerId = self.allUsers.get(row.get('releaseOwner').lower())
+            action, application, changes = self.applications.classify(row, columnsChanged, ownerId)
+            if application is not None:
+                warnApplicationType(row, application)
+            logger.info("Row " + str(row.rowNumber) + ": " + action + " " + row.get('applicationName') + (" (" + ", ".join(changes) + ")" if changes else ""),
+                        extra=rowLog(row, 'create'))
+            if action == 'unchanged':
+                return application['applicationId'], application['releases'].get(row.get('releaseName').lower()), True
+            #Any column that is not part of the template is the name of a custom attribute, as with the Business Units column in the template
+            attributeArray = setCustomAttributeValue(self.catalog, row.attributes)
+            if action == 'create':
+                ownerId = str(self.allUsers[row.get('releaseOwner').lower()])
+                applicationId, releaseId = await createApplicationAsync(self.client, row, ownerId, attributeArray)
+                self.applications.addApplication(row, applicationId, releaseId, attributeArray)
+                return applicationId, releaseId, False
+            if 'businessCriticality' in changes or 'attributes' in changes:
+                await updateApplicationAsync(self.client, row, application, attributeArray)
+            if 'releaseDetails' in changes:
+                releaseId, release = self.applications.releaseFor(row, application)
+                await updateReleaseAsync(self.client, row, releaseId, release, ownerId)
+            if 'release' in changes:
+                self.applications.addRelease(row, await createReleaseAsync(self.client, row, application['applicationId']))
+            return application['applicationId'], application['releases'].get(row.get('releaseName').lower()), 'release' not in changes
+
+def dynamicFormWanted(sync, releaseExisted):
+    #With --sync the dynamic scan form is filled out when its columns changed since the last sync. Otherwise only releases this run
+    #created get one, so re-running an imported file sends nothing for the rows already in FoD. configure-dynamic updates the form
+    #of releases that already exist
+    if sync is not None:
+        return sync.dynamicChanged()
+    return not releaseExisted
+
+class AsyncReleaseLookup(object):
+    #The asyncio counterpart of the release stage: applications waiting for their release ID are collected for up to RELEASE_BATCH_WAIT
+    #seconds, and looked up batchSize at a time with lookupReleasesAsync
+    def __init__(self, client, batchSize=RELEASE_BATCH_SIZE):
+        self.client     = client
+        self.batchSize  = batchSize
+        self.pending    = {}
+        self.timer      = None
+        #The lookups in flight. The event loop only keeps a weak reference to a task, so they are held here until they finish
+        self.lookups    = set()
+
+    async def resolve(self, applicationId):
+        import asyncio
+        loop = asyncio.get_event_loop()
+        future = self.pending.get(str(applicationId))
+        if future is None:
+            future = self.pending[str(applicationId)] = loop.create_future()
+        if len(self.pending) >= self.batchSize:
+            self.flush()
+        elif self.timer is None:
+            self.timer = loop.call_later(RELEASE_BATCH_WAIT, self.flush)
+        return await future
+
+    def flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        batch, self.pending = self.pending, {}
+        if batch:
+            import asyncio
+            lookup = asyncio.ensure_future(self.lookup(batch))
+            self.lookups.add(lookup)
+            lookup.add_done_callback(self.lookups.discard)
+
+    async def lookup(self, batch):
+        try:
+            found = await lookupReleasesAsync(self.client, list(batch))
+        except Exception as error:
+            for future in batch.values():
+                future.set_exception(error)
+            return
+        for applicationId, future in batch.items():
+            if applicationId in found:
+                future.set_result(found[applicationId])
+            else:
+                future.set_exception(KeyError("No release found for application " + applicationId))
@@ -0,0 +1,196 @@
+#What is kept between runs about the rows of an import: the SQLite journal of each row's progress and --sync hashes, and the dead-letter
+#file of rows to send again
+import os
+import hashlib
+import sqlite3
+import json
+import time
+import re
+import threading
+from collections import OrderedDict
+from .logs import consoleLogger, logger
+from .rows import DYNAMIC_FIELDS, TEMPLATE_COLUMNS, shardOf
+
+class ImportJournal(object):
+    #A SQLite record of how far each row of an import file got: the application ID once it is created, the release ID once it is found,
+    #and whether the dynamic scan form was filled out. Every step is committed as soon as it is recorded, so the journal survives the import
+    #being killed. Rows are identified by file and row number, and an entry is only used while the row still has the same application name
+    COLUMNS = ['applicationId', 'releaseId', 'dynamicStatus', 'lastError']
+
+    def __init__(self, path, uploadFile, resume=False, syncName=None):
+        self.fileKey    = os.path.abspath(uploadFile)
+        self.resume     = resume
+        self.syncName   = syncName
+        self.syncSeen   = set()
+        self.lock       = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self.lock:
+            #WAL keeps each commit cheap, which matters because every step of every row is committed
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS rows (fileKey TEXT NOT NULL, rowNumber INTEGER NOT NULL, applicationName TEXT, "
+                                    "applicationId INTEGER, releaseId INTEGER, dynamicStatus TEXT, lastError TEXT, updatedAt REAL, "
+                                    "PRIMARY KEY (fileKey, rowNumber))")
+            #What --sync sent for each application and release at the last successful run, by sync name rather than file, as the file is
+            #usually generated afresh each time. Only hashes of the columns are kept
+            self.connection.execute("CREATE TABLE IF NOT EXISTS synced (syncName TEXT NOT NULL, applicationKey TEXT NOT NULL, releaseKey TEXT NOT NULL, "
+                                    "applicationName TEXT, releaseName TEXT, applicationHash TEXT, dynamicHash TEXT, applicationId INTEGER, "
+                                    "releaseId INTEGER, syncedAt REAL, PRIMARY KEY (syncName, applicationKey, releaseKey))")
+            self.connection.commit()
+
+    def progressFor(self, row):
+        #What a previous run recorded for this row, as a dict of the journal columns. Without --resume nothing is taken from earlier runs
+        if not self.resume:
+            return {}
+        with self.lock:
+            found = self.connection.execute("SELECT applicationName, " + ", ".join(self.COLUMNS) + " FROM rows WHERE fileKey = ? AND rowNumber = ?",
+                                            (self.fileKey, row.rowNumber)).fetchone()
+        if found is None or found[0] != row.get('applicationName'):
+            return {}
+        return dict((column, value) for column, value in zip(self.COLUMNS, found[1:]) if value is not None)
+
+    def record(self, row, **values):
+        assignments = ", ".join(column + " = ?" for column in values)
+        with self.lock:
+            #A row that now holds a different application starts a fresh entry, rather than inheriting the old application's IDs
+            self.connection.execute("DELETE FROM rows WHERE fileKey = ? AND rowNumber = ? AND applicationName IS NOT ?",
+                                    (self.fileKey, row.rowNumber, row.get('applicationName')))
+            self.connection.execute("INSERT OR IGNORE INTO rows (fileKey, rowNumber, applicationName) VALUES (?, ?, ?)",
+                                    (self.fileKey, row.rowNumber, row.get('applicationName')))
+            self.connection.execute("UPDATE rows SET " + assignments + ", updatedAt = ? WHERE fileKey = ? AND rowNumber = ?",
+                                    list(values.values()) + [time.time(), self.fileKey, row.rowNumber])
+            self.connection.commit()
+
+    def syncedFor(self, row):
+        #The synced entry of the row's application and release as a dict, or None when the last sync didn't have it. Every row asked
+        #about counts as still being in the file for removedFromSync
+        key = (row.applicationName.lower(), row.releaseName.lower())
+        with self.lock:
+            self.syncSeen.add(key)
+            found = self.connection.execute("SELECT applicationHash, dynamicHash, applicationId, releaseId FROM synced WHERE syncName = ? AND "
+                                            "applicationKey = ? AND releaseKey = ?", (self.syncName,) + key).fetchone()
+        if found is None:
+            return None
+        return dict(zip(['applicationHash', 'dynamicHash', 'applicationId', 'releaseId'], found))
+
+    def recordSynced(self, row, sync, applicationId, releaseId, dynamicStatus, fillDynamicForm):
+        with self.lock:
+            self.connection.execute("INSERT OR REPLACE INTO synced (syncName, applicationKey, releaseKey, applicationName, releaseName, applicationHash, "
+                                    "dynamicHash, applicationId, releaseId, syncedAt) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                    (self.syncName, row.applicationName.lower(), row.releaseName.lower(), row.applicationName, row.releaseName,
+                                     sync.applicationHash, sync.dynamicHashAfter(dynamicStatus, fillDynamicForm), applicationId, releaseId, time.time()))
+            self.connection.commit()
+
+    def removedFromSync(self, shard=None):
+        #Forgets, and returns as (applicationName, releaseName), the synced entries of this sync that no row of this run asked about.
+        #With a shard, only that share of the entries is looked at, as the other processes see the rest of the file
+        with self.lock:
+            entries = self.connection.execute("SELECT applicationKey, releaseKey, applicationName, releaseName FROM synced WHERE syncName = ?",
+                                              (self.syncName,)).fetchall()
+            removed = [entry for entry in entries if (entry[0], entry[1]) not in self.syncSeen and (shard is None or shardOf(entry[2], shard[1]) == shard[0])]
+            self.connection.executemany("DELETE FROM synced WHERE syncName = ? AND applicationKey = ? AND releaseKey = ?",
+                                        [(self.syncName, entry[0], entry[1]) for entry in removed])
+            self.connection.commit()
+        return [(entry[2], entry[3]) for entry in removed]
+
+    def entries(self):
+        #Everything recorded for the file, by row number: a dict of applicationName and the journal columns
+        with self.lock:
+            found = self.connection.execute("SELECT rowNumber, applicationName, " + ", ".join(self.COLUMNS) + " FROM rows WHERE fileKey = ?",
+                                            (self.fileKey,)).fetchall()
+        return dict((values[0], dict(zip(['applicationName'] + self.COLUMNS, values[1:]))) for values in found)
+
+    def summary(self):
+        with self.lock:
+            counts = self.connection.execute("SELECT COUNT(applicationId), COUNT(releaseId), SUM(dynamicStatus = 'done'), SUM(dynamicStatus = 'failed') "
+                                             "FROM rows WHERE fileKey = ?", (self.fileKey,)).fetchone()
+        return ("Journal for " + self.fileKey + ": " + str(counts[0]) + " applications, " + str(counts[1]) + " releases, "
+                + str(counts[2] or 0) + " dynamic forms filled out, " + str(counts[3] or 0) + " dynamic forms failed")
+
+class RowSync(object):
+    #What --sync knows about a row: content hashes of its columns now, and the entry the last successful sync recorded for its application
+    #and release (previous, None for a row that is new since)
+    __slots__ = ['applicationHash', 'dynamicHash', 'previous']
+
+    def __init__(self, row, previous):
+        #Choice columns are compared without case and every value without surrounding spaces, as FoD would see them. Only columns an
+        #update can send are hashed: the Application Type can't be changed once the application exists, so it is warned about instead
+        applicationValues = [row.businessCriticality.lower(), row.fodSdlcStatus().lower(), row.releaseOwner.lower()]
+        applicationValues.extend(sorted(name.lower() + '=' + value.strip() for name, value in row.attributes.items() if value.strip()))
+        self.applicationHash    = contentHash(applicationValues)
+        self.dynamicHash        = contentHash([re.sub(r'\s+', ' ', row.get(field).strip()) for field in DYNAMIC_FIELDS])
+        self.previous           = previous
+
+    def unchanged(self):
+        #Nothing but perhaps the dynamic scan columns has changed, and the release's ID is known
+        return self.previous is not None and self.previous['applicationHash'] == self.applicationHash and self.previous['releaseId'] is not None
+
+    def applicationChanged(self):
+        return self.previous is not None and self.previous['applicationHash'] != self.applicationHash
+
+    def dynamicChanged(self):
+        return self.previous is None or self.previous['dynamicHash'] != self.dynamicHash
+
+    def dynamicHashAfter(self, dynamicStatus, fillDynamicForm):
+        #The dynamic hash to record once the row is done: the new one when the form was filled out, or didn't need to be; none when it
+        #failed, so the next sync tries again; and the old one when this run didn't fill out forms (no -d)
+        if dynamicStatus == 'failed':
+            return None
+        if dynamicStatus == 'done' or fillDynamicForm:
+            return self.dynamicHash
+        return self.previous['dynamicHash'] if self.previous else None
+
+def contentHash(values):
+    return hashlib.sha256('\x1f'.join(values).encode('utf-8')).hexdigest()
+
+def reportRemoved(removed):
+    #The rows a --sync run found gone from the file. FoD is left as it is; deleting applications is for a person to decide
+    if removed:
+        consoleLogger.warning(str(len(removed)) + " application releases are no longer in the file since the last sync, and were left in FoD: " +
+                              ", ".join(applicationName + " (" + releaseName + ")" for applicationName, releaseName in removed))
+    else:
+        logger.info("No application releases have gone from the file since the last sync")
+
+class DeadLetterFile(object):
+    #Rows that failed after reaching the API (their requests ran out of retries, FoD turned them down, or their dynamic scan form wasn't
+    #filled out), written as JSON lines keyed by column header, so once the problem has passed they can be imported on their own:
+    #   UploadApps.py log/FodDeadLetter.jsonl key secret -d
+    #Rows that failed validation are left out, as they would fail the same way again. The _row and _error keys say which row of the import
+    #file it was and why it failed; RowReader ignores headers starting with _. The --credentials worker processes all append to the one file
+    def __init__(self, path):
+        self.path   = path
+        self.lock   = threading.Lock()
+
+    def start(self):
+        #Empties the file of an earlier run's rows, before the import starts
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+        return self
+
+    def add(self, row, error):
+        if not self.path:
+            return
+        record = OrderedDict((header, row.get(field)) for field, header in TEMPLATE_COLUMNS)
+        record.update(row.attributes)
+        record['_row']      = row.rowNumber
+        record['_error']    = error
+        line = json.dumps(record) + '\n'
+        with self.lock:
+            directory = os.path.dirname(self.path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory, exist_ok=True)
+            #The authentication columns can hold passwords, so as with the cached bearer token only the current user can read the file
+            with os.fdopen(os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600), 'a', encoding='utf-8') as deadLetterFile:
+                deadLetterFile.write(line)
+
+    def report(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        with open(self.path, encoding='utf-8') as deadLetterFile:
+            rowCount = sum(1 for line in deadLetterFile if line.strip())
+        if rowCount:
+            consoleLogger.warning(str(rowCount) + " rows failed after reaching the API and were written to " + self.path +
+                                  ". Import that file once the problem has passed to send just those rows again")
@@ -0,0 +1,98 @@
+#The import's loggers, the redaction of secrets from everything they write, and setupLogging, which the command line calls to send the log
+#to a rotating file of JSON lines and progress to the console
+import os
+import sys
+import json
+import logging
+import datetime
+import re
+import queue
+from collections import OrderedDict
+
+#This instantiates a logger that will be used to track any applications and dynamic forms that don't correctly populate in FoD.
+#Its log file is only set up by setupLogging when the script is run, so importing this module (e.g. to call AddApplicationsAsync
+#from a service) creates no files and leaves the logging configuration to the caller
+logger      = logging.getLogger('FoDImport')
+#Messages for whoever is running the import, such as validation problems, shown on the console as well as logged. Progress messages are
+#only shown on the console. Neither is shown with --quiet
+consoleLogger   = logging.getLogger('FoDImport.console')
+progressLogger  = logging.getLogger('FoDImport.progress')
+
+#Fields a log record can be given with extra=, which are written as keys of their own in the JSON log lines
+LOG_FIELDS      = ['row', 'application', 'stage', 'status', 'duration']
+#Passwords, secrets, tokens and authorization headers, as JSON fields, form fields or Python reprs. Their values are never written to the log
+SECRET_PATTERN  = re.compile(r"""(["']?\b\w*(?:password|secret|token|authorization)\w*\\*["']?\s*[:=]\s*)(?:(\\*)(["'])(.*?)(?<!\\)\2\3|[^\s,&}]+)""", re.IGNORECASE)
+BEARER_PATTERN  = re.compile(r'\b[Bb]earer\s+[\w\-.~+/]{8,}=*')
+
+def redact(text):
+    #Returns text with the values of anything that looks like a credential replaced by ***
+    def hideValue(match):
+        #Quoted values keep their quotes, and their backslashes when the JSON was itself inside a JSON string
+        quote = (match.group(2) + match.group(3)) if match.group(3) else ''
+        return match.group(1) + quote + '***' + quote
+    return SECRET_PATTERN.sub(hideValue, BEARER_PATTERN.sub('Bearer ***', text))
+
+def rowLog(row, stage, duration=None, **fields):
+    #The extra= fields of a log record about a row of the import file
+    fields.update({'row': row.rowNumber, 'application': row.get('applicationName'), 'stage': stage})
+    if duration is not None:
+        fields['duration'] = round(duration, 3)
+    return fields
+
+class RedactSecrets(logging.Filter):
+    #Runs on the log listener's thread, so the import threads don't pay for the regular expressions. A record is only redacted once,
+    #however many handlers it goes to
+    def filter(self, record):
+        if not getattr(record, 'redacted', False):
+            record.msg = redact(record.getMessage())
+            record.args = None
+            record.redacted = True
+        return True
+
+class JsonLineFormatter(logging.Formatter):
+    #One JSON object per record: time, level, message and whichever of LOG_FIELDS the record has
+    def format(self, record):
+        line = OrderedDict([('time', datetime.datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds')),
+                            ('level', record.levelname), ('message', record.getMessage())])
+        for field in LOG_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                line[field] = value
+        return json.dumps(line)
+
+def setupLogging(quiet=False, level=logging.INFO, maxBytes=10 * 1024 * 1024, backupCount=5, fileName='FodImport.log'):
+    #The threads doing the import only put log records on a queue. A QueueListener thread redacts them and writes them to
+    #log/FodImport.log, one JSON object per line, rotated when it reaches maxBytes with backupCount old files kept, and to the console as
+    #plain text: warnings, errors and the messages for the user, or with quiet only warnings and errors. Returns the listener, which has to
+    #be stopped at the end so the records still on the queue are written. Each --credentials worker process logs to a file of its own.
+    #logging.handlers is only imported here, as UploadApps.py --help never gets this far
+    import logging.handlers
+    if not os.path.exists('log'):
+        os.makedirs('log')
+
+    fileHandler = logging.handlers.RotatingFileHandler(os.path.join('log', fileName), maxBytes=maxBytes, backupCount=backupCount, encoding='utf-8')
+    fileHandler.setFormatter(JsonLineFormatter())
+    fileHandler.setLevel(level)
+    fileHandler.addFilter(lambda record: record.name != progressLogger.name)
+
+    consoleNames    = set() if quiet else set([consoleLogger.name, progressLogger.name])
+    consoleHandler  = logging.StreamHandler(sys.stdout)
+    consoleHandler.setFormatter(logging.Formatter('%(message)s'))
+    consoleHandler.addFilter(lambda record: record.levelno >= logging.WARNING or record.name in consoleNames)
+
+    redactSecrets = RedactSecrets()
+    for handler in (fileHandler, consoleHandler):
+        handler.addFilter(redactSecrets)
+
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    records = queue.Queue()
+    logger.addHandler(logging.handlers.QueueHandler(records))
+    #The level is the log file's. The console still gets progress and problems at INFO whatever it is (only --quiet hides them), and DEBUG
+    #records, with their request payloads, are only made when the file wants them
+    logger.setLevel(min(level, logging.INFO))
+    logger.propagate = False
+
+    listener = logging.handlers.QueueListener(records, fileHandler, consoleHandler, respect_handler_level=True)
+    listener.start()
+    return listener
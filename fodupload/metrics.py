@@ -0,0 +1,212 @@
+#Request, stage and row metrics of a run, kept in memory by the metrics registry and written out as JSON and as a Prometheus textfile
+import os
+import json
+import datetime
+import time
+import threading
+import functools
+import inspect
+from collections import OrderedDict
+from .constants import LATENCY_BUCKETS
+from .logs import logger
+
+class Metrics(object):
+    #Counters, gauges and latency histograms for the import, each kept per combination of labels (endpoint, status, stage and so on).
+    #Like the logger there is one for the whole module, metrics, and everything records in to it from any thread. MetricsExporter
+    #writes it out as JSON and in the Prometheus textfile format
+    HELP = OrderedDict([
+        ('fodimport_requests_total',                ('counter', "API requests sent, by endpoint, method and status code")),
+        ('fodimport_request_seconds',               ('histogram', "Seconds from sending an API request to having its response, by endpoint")),
+        ('fodimport_request_bytes_total',           ('counter', "Bytes of API request and response bodies, by endpoint and direction")),
+        ('fodimport_rate_limit_wait_seconds_total', ('counter', "Seconds requests waited for the rate limiter, by endpoint")),
+        ('fodimport_retries_total',                 ('counter', "API requests sent again, by endpoint and reason")),
+        ('fodimport_circuit_opened_total',          ('counter', "Times requests to an endpoint were paused because it kept failing, by endpoint")),
+        ('fodimport_call_seconds',                  ('histogram', "Seconds spent in getUsers, resolveOwners, getReleaseId, lookupReleases and populateDynamicForm, by function")),
+        ('fodimport_stage_seconds',                 ('histogram', "Seconds an import pipeline stage spent on each row or batch of rows, by stage")),
+        ('fodimport_rows_total',                    ('counter', "Import rows finished, by outcome (done or failed)")),
+        ('fodimport_dynamic_forms_total',           ('counter', "Dynamic scan forms sent, by status (done or failed)")),
+        ('fodimport_run_seconds',                   ('gauge', "Seconds since the import started")),
+        ('fodimport_rows_per_second',               ('gauge', "Rows finished per second since the import started")),
+    ])
+
+    def __init__(self):
+        self.lock       = threading.Lock()
+        self.counters   = {}
+        self.gauges     = {}
+        self.histograms = {}
+
+    def count(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def setGauge(self, name, value, **labels):
+        with self.lock:
+            self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = {'buckets': [0] * len(LATENCY_BUCKETS), 'count': 0, 'sum': 0.0}
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    histogram['buckets'][index] += 1
+                    break
+            histogram['count'] += 1
+            histogram['sum'] += seconds
+
+    def total(self, name, **labels):
+        #The sum of a counter over every combination of labels, or only those with the given label values
+        wanted = set(labels.items())
+        with self.lock:
+            return sum(value for (counterName, counterLabels), value in self.counters.items() if counterName == name and wanted <= set(counterLabels))
+
+    def state(self):
+        #The counters and histograms as plain (picklable) dicts, for merge() in another process
+        with self.lock:
+            return {'counters': dict(self.counters),
+                    'histograms': dict((key, {'buckets': list(histogram['buckets']), 'count': histogram['count'], 'sum': histogram['sum']})
+                                       for key, histogram in self.histograms.items())}
+
+    def merge(self, state):
+        #Adds the counters and histograms of another Metrics' state() to these, as --credentials does with each worker process's metrics
+        with self.lock:
+            for key, value in state['counters'].items():
+                self.counters[key] = self.counters.get(key, 0) + value
+            for key, other in state['histograms'].items():
+                histogram = self.histograms.get(key)
+                if histogram is None:
+                    histogram = self.histograms[key] = {'buckets': [0] * len(LATENCY_BUCKETS), 'count': 0, 'sum': 0.0}
+                histogram['buckets'] = [count + otherCount for count, otherCount in zip(histogram['buckets'], other['buckets'])]
+                histogram['count'] += other['count']
+                histogram['sum'] += other['sum']
+
+    def snapshot(self):
+        #Everything recorded so far, for the JSON summary: {name: [{'labels': {...}, 'value': ...}]}, with count, sum, mean and cumulative
+        #bucket counts in place of a value for histograms
+        with self.lock:
+            values = {}
+            for (name, labels), value in list(self.counters.items()) + list(self.gauges.items()):
+                values.setdefault(name, []).append({'labels': dict(labels), 'value': value})
+            for (name, labels), histogram in self.histograms.items():
+                cumulative = 0
+                buckets = OrderedDict()
+                for bound, bucketCount in zip(LATENCY_BUCKETS, histogram['buckets']):
+                    cumulative += bucketCount
+                    buckets[str(bound)] = cumulative
+                values.setdefault(name, []).append({'labels': dict(labels), 'count': histogram['count'], 'sum': round(histogram['sum'], 6),
+                                                    'mean': round(histogram['sum'] / histogram['count'], 6) if histogram['count'] else 0,
+                                                    'buckets': buckets})
+        return values
+
+    def prometheusText(self):
+        lines = []
+        snapshot = self.snapshot()
+        for name in sorted(snapshot, key=lambda name: (list(self.HELP).index(name) if name in self.HELP else len(self.HELP), name)):
+            metricType, helpText = self.HELP.get(name, ('untyped', name))
+            lines.append("# HELP " + name + " " + helpText)
+            lines.append("# TYPE " + name + " " + metricType)
+            for sample in snapshot[name]:
+                if 'buckets' not in sample:
+                    lines.append(name + prometheusLabels(sample['labels']) + " " + repr(float(sample['value'])))
+                    continue
+                for bound, cumulative in sample['buckets'].items():
+                    lines.append(name + "_bucket" + prometheusLabels(sample['labels'], le=bound) + " " + str(cumulative))
+                lines.append(name + "_bucket" + prometheusLabels(sample['labels'], le="+Inf") + " " + str(sample['count']))
+                lines.append(name + "_sum" + prometheusLabels(sample['labels']) + " " + repr(float(sample['sum'])))
+                lines.append(name + "_count" + prometheusLabels(sample['labels']) + " " + str(sample['count']))
+        return "\n".join(lines) + "\n"
+
+def prometheusLabels(labels, **extra):
+    labels = dict(labels, **extra)
+    if not labels:
+        return ""
+    return "{" + ",".join(key + '="' + str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"' for key, value in sorted(labels.items())) + "}"
+
+metrics = Metrics()
+
+def timed(function):
+    #Records the time spent in each call of the decorated function (or coroutine) in the fodimport_call_seconds histogram. inspect rather
+    #than asyncio tells the two apart, as asyncio takes longer to import than the rest of --validate's startup and is only needed by --async
+    if inspect.iscoroutinefunction(function):
+        @functools.wraps(function)
+        async def timedCoroutine(*args, **kwargs):
+            started = time.monotonic()
+            try:
+                return await function(*args, **kwargs)
+            finally:
+                metrics.observe('fodimport_call_seconds', time.monotonic() - started, function=function.__name__)
+        return timedCoroutine
+
+    @functools.wraps(function)
+    def timedCall(*args, **kwargs):
+        started = time.monotonic()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            metrics.observe('fodimport_call_seconds', time.monotonic() - started, function=function.__name__)
+    return timedCall
+
+class MetricsExporter(object):
+    #Writes the metrics to a JSON summary and a Prometheus textfile (for node_exporter's textfile collector) every interval seconds while
+    #the import runs, and once more when it is stopped. Either path may be None. Files are replaced atomically, so a collector never reads
+    #half a file. The run gauges are worked out from when the exporter was started
+    def __init__(self, jsonPath=None, textfilePath=None, interval=30, registry=None):
+        self.jsonPath       = jsonPath
+        self.textfilePath   = textfilePath
+        self.interval       = interval
+        self.registry       = registry if registry is not None else metrics
+        self.stopped        = threading.Event()
+        self.thread         = None
+        self.startedAt      = time.monotonic()
+        self.startRows      = self.registry.total('fodimport_rows_total')
+
+    def start(self):
+        self.startedAt = time.monotonic()
+        self.startRows = self.registry.total('fodimport_rows_total')
+        if self.interval and self.interval > 0:
+            self.thread = threading.Thread(target=self.run, name='metrics')
+            self.thread.daemon = True
+            self.thread.start()
+        return self
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.write()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+        self.write()
+
+    def write(self):
+        runSeconds = time.monotonic() - self.startedAt
+        self.registry.setGauge('fodimport_run_seconds', round(runSeconds, 3))
+        self.registry.setGauge('fodimport_rows_per_second', round((self.registry.total('fodimport_rows_total') - self.startRows) / runSeconds, 3) if runSeconds else 0)
+        try:
+            if self.jsonPath:
+                writeAtomically(self.jsonPath, json.dumps({'generatedAt': datetime.datetime.now().isoformat(), 'metrics': self.registry.snapshot()}, indent=2))
+            if self.textfilePath:
+                writeAtomically(self.textfilePath, self.registry.prometheusText())
+        except (IOError, OSError) as error:
+            logger.warning("Could not write metrics: " + str(error))
+
+def writeAtomically(path, text):
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    temporaryPath = path + '.' + str(os.getpid()) + '.tmp'
+    with open(temporaryPath, 'w') as outputFile:
+        outputFile.write(text)
+    os.replace(temporaryPath, path)
+
+def recordRequest(endpoint, method, response, seconds, data):
+    #The request metrics for one response, from FodClient or AsyncFodClient
+    metrics.count('fodimport_requests_total', endpoint=endpoint, method=method.upper(), status=response.status_code)
+    metrics.observe('fodimport_request_seconds', seconds, endpoint=endpoint)
+    if data:
+        metrics.count('fodimport_request_bytes_total', len(data.encode('utf-8') if isinstance(data, str) else data), endpoint=endpoint, direction='sent')
+    metrics.count('fodimport_request_bytes_total', len(response.content), endpoint=endpoint, direction='received')
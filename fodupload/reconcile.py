@@ -0,0 +1,196 @@
+#The reconcile command, which reports how the rows of an import file compare with what is in FoD now
+import os
+import csv
+import json
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from .constants import PAGE_WORKERS
+from .logs import consoleLogger, logger, rowLog
+from .rows import DynamicScanSettings, RowReader
+from .client import FodClient, LocalCache, TokenManager
+from .api import ApplicationIndex, AttributeCatalog, getAllPagesConcurrently
+
+def ReconcileApplications(uploadFile, apiKey, apiSecret, client=None, cache=None, journal=None, checkDynamic=False, workers=PAGE_WORKERS, reportPath=None):
+    #The reconcile command: checks every row of an import file against what is in FoD now, and writes a report with a line for each row,
+    #matched, missing (its application, release or dynamic scan setup isn't in FoD) or mismatched (it is, with other values than the row's).
+    #The tenant's applications and releases are fetched with two concurrent paged listings, as ApplicationIndex does, and with checkDynamic
+    #the scan setups of the rows' releases are fetched by workers threads. Nothing is changed in FoD. Returns the number of rows with each
+    #status, or None when authentication failed
+    if client is None:
+        client = FodClient(poolSize=workers + 2)
+    if cache is None:
+        cache = LocalCache(None)
+
+    appData         = RowReader(uploadFile, requireDynamic=checkDynamic)
+    tokens          = TokenManager(client, apiKey, apiSecret, cache)
+    if tokens.token() is None:
+        return None
+    client.useTokenManager(tokens)
+    catalog         = AttributeCatalog(client, cache)
+    applicationList, applicationCount = getAllPagesConcurrently(client, '/api/v3/applications', workers=workers)
+    releaseList, releaseCount = getAllPagesConcurrently(client, '/api/v3/releases', workers=workers)
+    logger.info("Found " + str(applicationCount) + " applications and " + str(releaseCount) + " releases in FoD")
+    applications    = ApplicationIndex(applicationList, releaseList)
+    releases        = dict((release['releaseId'], release) for release in releaseList)
+    journalEntries  = journal.entries() if journal is not None else {}
+
+    results = [ReconcileResult(row, journalEntries.get(row.rowNumber)) for row in appData]
+    for result in results:
+        result.compareApplication(applications, releases, catalog)
+    if checkDynamic:
+        withRelease = [result for result in results if result.releaseId is not None]
+        if withRelease:
+            with ThreadPoolExecutor(max_workers=max(1, min(workers, len(withRelease)))) as executor:
+                for result, scanSetup in zip(withRelease, executor.map(lambda result: fetchScanSetup(client, result.releaseId), withRelease)):
+                    result.compareScanSetup(scanSetup)
+
+    counts = OrderedDict((status, 0) for status in ReconcileResult.STATUSES)
+    for result in results:
+        counts[result.status()] += 1
+        if result.status() != 'matched':
+            consoleLogger.info("Row " + str(result.row.rowNumber) + " (" + result.row.applicationName + "): " + result.status() + ", " + "; ".join(result.details),
+                               extra=rowLog(result.row, 'reconcile', status=result.status()))
+    if reportPath:
+        writeReconcileReport(reportPath, results)
+
+    consoleLogger.info("Reconciled " + str(len(results)) + " rows of " + uploadFile + ": " + ", ".join(str(count) + " " + status for status, count in counts.items()) +
+                       (", see " + reportPath if reportPath else ""))
+    return counts
+
+class ReconcileResult(object):
+    #What reconcile found for one row. details has a line for everything missing or different, and the row's status is the worst of them
+    STATUSES = ['matched', 'missing', 'mismatched', 'error']
+    __slots__ = ['row', 'journalEntry', 'applicationId', 'releaseId', 'missing', 'mismatched', 'errors']
+
+    def __init__(self, row, journalEntry):
+        self.row            = row
+        #An entry the journal holds for another application (the file has changed since) says nothing about this row
+        self.journalEntry   = journalEntry if journalEntry is not None and journalEntry['applicationName'] == row.applicationName else None
+        self.applicationId  = None
+        self.releaseId      = None
+        self.missing        = []
+        self.mismatched     = []
+        self.errors         = []
+
+    @property
+    def details(self):
+        return self.missing + self.mismatched + self.errors
+
+    def status(self):
+        if self.missing:
+            return 'missing'
+        if self.mismatched:
+            return 'mismatched'
+        return 'error' if self.errors else 'matched'
+
+    def journalStatus(self):
+        if self.journalEntry is None:
+            return "not imported"
+        if self.journalEntry['lastError']:
+            return "failed: " + self.journalEntry['lastError']
+        if self.journalEntry['dynamicStatus'] == 'failed':
+            return "dynamic scan form failed"
+        return "imported"
+
+    def compareApplication(self, applications, releases, catalog):
+        row = self.row
+        application = applications.applications.get(row.applicationName.lower())
+        if application is None:
+            self.missing.append("Application not in FoD")
+            return
+        self.applicationId = application['applicationId']
+        self.releaseId = application['releases'].get(row.releaseName.lower())
+        if self.releaseId is None:
+            self.missing.append("Release " + row.releaseName + " not in FoD")
+        if self.journalEntry is not None:
+            self.compareValue("Application ID in the journal", self.journalEntry['applicationId'], self.applicationId)
+            if self.releaseId is not None:
+                self.compareValue("Release ID in the journal", self.journalEntry['releaseId'], self.releaseId)
+        self.compareValue("Business Criticality", row.businessCriticality, application.get('businessCriticalityType'))
+        self.compareValue("Application Type", row.fodApplicationType(), application.get('applicationType'))
+        release = releases.get(self.releaseId)
+        if release is not None:
+            self.compareValue("SDLC Status", row.fodSdlcStatus(), release.get('sdlcStatusType'))
+        if 'attributes' in application:
+            self.compareAttributes(application['attributes'] or [], catalog)
+
+    def compareAttributes(self, fodAttributes, catalog):
+        #FoD may list a picklist attribute's value by its ID or by its name, so either is taken as a match
+        fodValues = dict((attribute.get('id'), attribute.get('value')) for attribute in fodAttributes)
+        for attributeName, givenValue in self.row.attributes.items():
+            if givenValue == "":
+                continue
+            try:
+                attributeId = catalog.attributeId(attributeName)
+                expected = catalog.valueFor(attributeName, givenValue)
+            except KeyError as error:
+                self.errors.append(str(error).strip('"'))
+                continue
+            fodValue = fodValues.get(attributeId)
+            if str(fodValue).strip().lower() not in (str(expected).strip().lower(), givenValue.strip().lower()):
+                self.mismatched.append(attributeName + ": file has " + givenValue + ", FoD has " + ("nothing" if fodValue is None else str(fodValue)))
+
+    def compareScanSetup(self, scanSetup):
+        #scanSetup is the release's setup as the API returns it, None when it has none, or the exception fetching it raised
+        if isinstance(scanSetup, Exception):
+            self.errors.append("Could not fetch the dynamic scan setup: " + repr(scanSetup))
+            return
+        try:
+            differences = scanSetupDifferences(self.row, scanSetup)
+        except ValueError as error:
+            #A dynamic scan column that can't be parsed (e.g. the Site Availability) is this row's problem, not the whole report's
+            self.errors.append("Dynamic scan columns: " + str(error))
+            return
+        if differences is None:
+            self.missing.append("Dynamic scan setup not in FoD")
+            return
+        if differences:
+            self.mismatched.append("Dynamic scan setup differs in " + ", ".join(differences))
+
+    def compareValue(self, name, expected, found):
+        if found is None and expected is None:
+            return
+        if comparable(expected) != comparable(found):
+            self.mismatched.append(name + ": " + ("file" if "journal" not in name else "journal") + " has " + str(expected) + ", FoD has " + str(found))
+
+def comparable(value):
+    #Values as reconcile compares them: ignoring case and surrounding spaces, and lists and objects by their contents
+    if isinstance(value, (list, tuple, dict)):
+        return json.dumps(value, sort_keys=True).lower()
+    return str(value).strip().lower() if value is not None else ""
+
+def scanSetupDifferences(row, scanSetup):
+    #The fields of the row's dynamic scan setup that FoD has other values for, or None when the release has no setup in FoD. Only the
+    #fields FoD returns are compared, which leaves out the passwords
+    if not scanSetup or not scanSetup.get('dynamicSiteURL'):
+        return None
+    return [field for field, value in DynamicScanSettings(row).fields().items()
+            if field in scanSetup and 'Password' not in field and comparable(scanSetup[field]) != comparable(value)]
+
+def fetchScanSetup(client, releaseId):
+    #Returns the release's dynamic scan setup, None when it has none, or the exception raised fetching it, so one failure doesn't stop the rest
+    try:
+        response = client.get('/api/v3/releases/' + str(releaseId) + '/dynamic-scans/scan-setup')
+        if response.status_code == 404:
+            return None
+        if response.status_code >= 400:
+            raise ValueError("HTTP " + str(response.status_code) + ": " + response.text)
+        return json.loads(response.text)
+    except Exception as error:
+        return error
+
+def writeReconcileReport(reportPath, results):
+    directory = os.path.dirname(reportPath)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    with open(reportPath, 'w', newline='', encoding='utf-8') as reportFile:
+        if reportPath.lower().endswith('.json'):
+            json.dump([OrderedDict([('row', result.row.rowNumber), ('applicationName', result.row.applicationName), ('releaseName', result.row.releaseName),
+                                    ('status', result.status()), ('applicationId', result.applicationId), ('releaseId', result.releaseId),
+                                    ('journal', result.journalStatus()), ('details', result.details)]) for result in results], reportFile, indent=2)
+            return
+        writer = csv.writer(reportFile)
+        writer.writerow(['Row', 'Application Name', 'Release Name', 'Status', 'Application ID', 'Release ID', 'Journal', 'Details'])
+        for result in results:
+            writer.writerow([result.row.rowNumber, result.row.applicationName, result.row.releaseName, result.status(), result.applicationId or "",
+                             result.releaseId or "", result.journalStatus(), "; ".join(result.details)])
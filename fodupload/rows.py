@@ -0,0 +1,346 @@
+#The import template's columns, and the rows of an import file as read by RowReader, with the dynamic scan settings each row describes
+import os
+import csv
+import json
+import datetime
+import re
+import functools
+import zlib
+from collections import OrderedDict
+from .constants import AVAILABILITY_CACHE_SIZE
+
+#The columns of the import template. Headers are matched on their letters and digits only, ignoring case and anything in brackets, so
+#"SDLC Status (Development, QA/Test, Production)", "SDLC Status" and "sdlcStatus" all name the same column
+TEMPLATE_COLUMNS = [
+    ('applicationName',                             'Application Name'),
+    ('businessCriticality',                         'Business Criticality (High, Medium, Low)'),
+    ('applicationType',                             'Application Type (Web/Thick Client)'),
+    ('releaseName',                                 'Release Name'),
+    ('sdlcStatus',                                  'SDLC Status (Development, QA/Test, Production)'),
+    ('releaseOwner',                                'Release Owner (FOD Username)'),
+    ('dynamicSiteUrl',                              'Dynamic Site URL'),
+    ('assessmentType',                              'Assessment Type (Dynamic, Dynamic+)'),
+    ('timeZone',                                    'Time Zone'),
+    ('environmentFacing',                           'Environment Facing (Internal, External)'),
+    ('exclusions',                                  'Exclusions'),
+    ('repeatFrequency',                             'Repeat Frequency (Do not repeat, Monthly)'),
+    ('siteAvailability',                            'Site Availability (ALL DAY, restrictions)'),
+    ('authenticationMode',                          'Authentication Mode (Default is None)'),
+    ('primaryUsername',                             'Primary Username'),
+    ('primaryPassword',                             'Primary Password'),
+    ('secondaryUsername',                           'Secondary Username'),
+    ('secondaryPassword',                           'Secondary Password'),
+    ('subscription',                                'Subscription'),
+    ('restrictScanToDirectoryAndSubdirectories',    'Restrict scan to directory and subdirectories'),
+]
+REQUIRED_FIELDS = ['applicationName', 'businessCriticality', 'applicationType', 'releaseName', 'sdlcStatus', 'releaseOwner']
+#The values FoD accepts for the template's choice columns, as RowValidator compares them (without case)
+BUSINESS_CRITICALITIES  = ['High', 'Medium', 'Low']
+APPLICATION_TYPES       = ['Web_Thick_Client', 'Mobile', 'Microservice']
+SDLC_STATUSES           = ['Development', 'QA', 'Production']
+ASSESSMENT_TYPES        = ['Dynamic', 'Dynamic+']
+ENVIRONMENT_FACINGS     = ['Internal', 'External']
+REPEAT_FREQUENCIES      = ['Do not repeat', 'Monthly']
+#Subscription and restrict scan are yes/no columns, read as DynamicScanSettings reads them
+FLAG_VALUES             = ['1', '0', 'True', 'False']
+#The dynamic scan columns, which -d needs the import file to have
+DYNAMIC_FIELDS  = [field for field, header in TEMPLATE_COLUMNS[6:]]
+
+class ImportFileError(Exception):
+    #Raised when the import file cannot be used, e.g. an unknown file type or a missing or duplicated column header
+    pass
+
+class ImportRow(object):
+    #One row of the import file, with an attribute for each template column named by its field (row.applicationName), "" when the file
+    #doesn't have the column. attributes holds every other column by its header, which is the name of the custom attribute it sets.
+    #Slots rather than a dict per row, as a large import has many thousands of these in the pipeline's queues and the journal's hands
+    __slots__ = ['rowNumber', 'attributes'] + [field for field, header in TEMPLATE_COLUMNS]
+
+    def __init__(self, rowNumber, fields=None, attributes=None):
+        self.rowNumber  = rowNumber
+        self.attributes = attributes if attributes is not None else OrderedDict()
+        for field, header in TEMPLATE_COLUMNS:
+            setattr(self, field, "")
+        for field, value in (fields or {}).items():
+            setattr(self, field, value)
+
+    def get(self, field):
+        return getattr(self, field)
+
+    def fodApplicationType(self):
+        #The application type as the API takes it, e.g. "Web/Thick Client" is sent as Web_Thick_Client
+        return self.applicationType.replace(" ", "_").replace("/", "_")
+
+    def fodSdlcStatus(self):
+        #The SDLC status as the API takes it, e.g. "QA/Test" is sent as QA
+        return self.sdlcStatus.replace('/Test', '')
+
+class DynamicScanSettings(object):
+    #The dynamic scan setup of a release as the API takes it, read from a row's dynamic scan columns. Blank columns get the defaults the
+    #template describes: available all day, no repeat, restricted to the site's directory and a single scan entitlement
+    __slots__ = ['siteUrl', 'assessmentTypeId', 'timeZone', 'environmentFacing', 'exclusions', 'repeatSchedule', 'blockout', 'authenticationType',
+                 'primaryUserName', 'primaryUserPassword', 'secondaryUserName', 'secondaryUserPassword', 'restrictToDirectory', 'entitlementFrequency']
+
+    def __init__(self, row):
+        self.siteUrl                = row.dynamicSiteUrl
+        self.assessmentTypeId       = 268 if row.assessmentType.lower() == 'dynamic' else 269
+        self.timeZone               = row.timeZone
+        self.environmentFacing      = row.environmentFacing
+        self.exclusions             = setExclusions(row.exclusions)
+        self.repeatSchedule         = 'NoRepeat' if row.repeatFrequency.lower() in ('do not repeat', '') else 'Monthly'
+        #The format of the site availability is specific, and generateSiteAvailability uses that to parse it in to the format that is required by the API
+        self.blockout               = generateSiteAvailability(row.siteAvailability)
+        self.authenticationType     = row.authenticationMode or 'NoAuthentication'
+        self.primaryUserName        = row.primaryUsername
+        self.primaryUserPassword    = row.primaryPassword
+        self.secondaryUserName      = row.secondaryUsername
+        self.secondaryUserPassword  = row.secondaryPassword
+        self.restrictToDirectory    = row.restrictScanToDirectoryAndSubdirectories.lower() in ('true', '1', '')
+        self.entitlementFrequency   = 'Subscription' if row.subscription.lower() in ('true', '1') else 'SingleScan'
+
+    def fields(self):
+        #Every field of the setup, the blockout as a list again, for comparing with the setup FoD returns
+        return OrderedDict(self.payload(), blockout=json.loads(self.blockout))
+
+    def payload(self):
+        #The setup as the API takes it, except the blockout, which is already JSON text that dynamicFormRequest splices in
+        payload = OrderedDict([('geoLocationId', 1), ('multiFactorAuth', False), ('dynamicScanEnvironmentFacingType', self.environmentFacing),
+                               ('exclusionsList', self.exclusions), ('dynamicScanAuthenticationType', self.authenticationType)])
+        if self.authenticationType != 'NoAuthentication':
+            payload['primaryUserName']          = self.primaryUserName
+            payload['primaryUserPassword']      = self.primaryUserPassword
+            payload['secondaryUserName']        = self.secondaryUserName
+            payload['secondaryUserPassword']    = self.secondaryUserPassword
+        payload['dynamicSiteURL']                       = self.siteUrl
+        payload['timeZone']                             = self.timeZone
+        payload['repeatScheduleType']                   = self.repeatSchedule
+        payload['assessmentTypeId']                     = self.assessmentTypeId
+        payload['restrictToDirectoryAndSubdirectories'] = self.restrictToDirectory
+        payload['entitlementFrequencyType']             = self.entitlementFrequency
+        return payload
+
+class RowReader(object):
+    #Reads the rows of an import file one at a time, so only the current rows are held in memory however large the file is.
+    #.xlsx files are opened in openpyxl's read only (streaming) mode, .xls files are read with xlrd, and .csv and .jsonl files are read a line at a time.
+    #rowNumber is the line of the file the row came from, so for spreadsheets and CSV files the first application is on row 2
+    def __init__(self, path, sheetName='Sheet1', requireDynamic=False, shard=None):
+        self.path           = path
+        self.sheetName      = sheetName
+        self.shard          = shard
+        self.extension      = os.path.splitext(path)[1].lower()
+        self.required       = REQUIRED_FIELDS + (DYNAMIC_FIELDS if requireDynamic else [])
+        self.totalRows      = None
+        if self.extension not in ('.xlsx', '.xlsm', '.xls', '.csv', '.jsonl', '.ndjson'):
+            raise ImportFileError("Unsupported import file type '" + self.extension + "', use .xlsx, .xls, .csv or .jsonl")
+        #Reading the first row up front means a file with bad headers is rejected before any request is made
+        self.rows           = self.readRows()
+        self.firstRow       = next(self.rows, None)
+
+    def __iter__(self):
+        if self.firstRow is not None:
+            yield self.firstRow
+            self.firstRow = None
+            for row in self.rows:
+                yield row
+
+    def readRows(self):
+        if self.extension in ('.jsonl', '.ndjson'):
+            rows = self.readJsonLines()
+            return rows if self.shard is None else (row for row in rows if inShard(row, self.shard))
+        if self.extension == '.csv':
+            rawRows = self.readCsv()
+        elif self.extension == '.xls':
+            rawRows = self.readXls()
+        else:
+            rawRows = self.readXlsx()
+        rows = self.mapRows(rawRows)
+        if self.shard is not None:
+            rows = (row for row in rows if inShard(row, self.shard))
+        return rows
+
+    def mapRows(self, rawRows):
+        headers = next(rawRows, None)
+        if headers is None:
+            raise ImportFileError(self.path + " is empty")
+        columns = self.mapHeaders([cellText(header) for header in headers])
+        #The header is line 1, so the first application is on line 2
+        for rowNumber, values in enumerate(rawRows, 2):
+            values = [cellText(value) for value in values]
+            if not any(values):
+                continue
+            yield self.buildRow(rowNumber, columns, values)
+
+    def mapHeaders(self, headers):
+        #Returns (column index, field name, attribute name) for each non-empty header, with exactly one of field name or attribute name set.
+        #Headers starting with _ are notes rather than columns (such as _error in a DeadLetterFile) and are skipped
+        knownFields = dict((normalizeHeader(field), field) for field, header in TEMPLATE_COLUMNS)
+        knownFields.update((normalizeHeader(header), field) for field, header in TEMPLATE_COLUMNS)
+        columns = []
+        seen    = set()
+        for index, header in enumerate(headers):
+            if header == "" or header.startswith('_'):
+                continue
+            field = knownFields.get(normalizeHeader(header))
+            key = field or header
+            if key in seen:
+                raise ImportFileError("Column '" + header + "' appears more than once in " + self.path)
+            seen.add(key)
+            columns.append((index, field, None if field else header))
+        missing = [field for field in self.required if field not in seen]
+        if missing:
+            raise ImportFileError(self.path + " is missing the column(s): " + ", ".join(dict(TEMPLATE_COLUMNS)[field] for field in missing))
+        return columns
+
+    def buildRow(self, rowNumber, columns, values):
+        row = ImportRow(rowNumber)
+        for index, field, attributeName in columns:
+            value = values[index] if index < len(values) else ""
+            if field:
+                setattr(row, field, value)
+            else:
+                row.attributes[attributeName] = value
+        return row
+
+    def readXlsx(self):
+        import openpyxl
+        workbook = openpyxl.load_workbook(self.path, read_only=True, data_only=True)
+        try:
+            sheet = workbook[self.sheetName] if self.sheetName in workbook.sheetnames else workbook.worksheets[0]
+            #max_row comes from the sheet's dimension record and may be missing, in which case progress is shown as a count
+            if sheet.max_row:
+                self.totalRows = sheet.max_row - 1
+            for values in sheet.iter_rows(values_only=True):
+                yield values
+        finally:
+            workbook.close()
+
+    def readXls(self):
+        import xlrd
+        workbook = xlrd.open_workbook(self.path, on_demand=True)
+        try:
+            sheet = workbook.sheet_by_name(self.sheetName) if self.sheetName in workbook.sheet_names() else workbook.sheet_by_index(0)
+            self.totalRows = sheet.nrows - 1
+            for i in range(sheet.nrows):
+                yield sheet.row_values(i)
+        finally:
+            workbook.release_resources()
+
+    def readCsv(self):
+        with open(self.path, newline='', encoding='utf-8-sig') as csvFile:
+            for values in csv.reader(csvFile):
+                yield values
+
+    def readJsonLines(self):
+        #Each line is one JSON object keyed by column header. The keys can differ between lines, so the header check is repeated whenever they change
+        columnsByKeys = {}
+        with open(self.path, encoding='utf-8') as jsonFile:
+            for rowNumber, line in enumerate(jsonFile, 1):
+                line = line.strip()
+                if line == "":
+                    continue
+                try:
+                    record = json.loads(line, object_pairs_hook=OrderedDict)
+                except ValueError as error:
+                    raise ImportFileError("Line " + str(rowNumber) + " of " + self.path + " is not valid JSON: " + str(error))
+                keys = tuple(record.keys())
+                if keys not in columnsByKeys:
+                    columnsByKeys[keys] = self.mapHeaders(list(keys))
+                yield self.buildRow(rowNumber, columnsByKeys[keys], [cellText(value) for value in record.values()])
+
+def inShard(row, shard):
+    #shard is (index, count). Rows are shared out by application name rather than row number, so all the releases of an application are
+    #imported by the same process and two processes never both try to create it
+    return shardOf(row.applicationName, shard[1]) == shard[0]
+
+def shardOf(applicationName, shardCount):
+    return zlib.crc32(applicationName.lower().encode('utf-8')) % shardCount
+
+def normalizeHeader(header):
+    return re.sub(r'[^a-z0-9]', '', re.sub(r'\(.*?\)', '', header.lower()))
+
+def cellText(value):
+    #Every value is passed on as text. Spreadsheets give numbers as floats (1.0) and booleans as True/False, so those are written the way they were typed
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "True" if value else "False"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(value).strip()
+
+def collectOwners(uploadFile, shard=None):
+    #Reads the release owner column of the whole file (or of one shard of it) and returns the distinct owners, keyed lower case, with the name as it was written
+    ownerNames = {}
+    for row in RowReader(uploadFile, shard=shard):
+        ownerName = row.get('releaseOwner')
+        if ownerName != "":
+            ownerNames.setdefault(ownerName.lower(), ownerName)
+    return ownerNames
+    
+DAYS = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
+#The week as a 168 bit mask, bit day*24 + hour is set when the site is available in that hour
+ALL_WEEK = (1 << (7 * 24)) - 1
+
+def generateSiteAvailability(availabilityCell):
+    #Turns the site availability cell in to the blockout JSON the API expects. "ALL DAY" (or an empty cell) is available every hour, otherwise
+    #the cell lists the hours the site is available per day, e.g. "Monday:0800-1700;Tuesday:0900-1200,1300-1700;". Cells are compared
+    #without spaces or case, so the blockout for a schedule is only built the first time it is seen, and rows with the same schedule share it
+    return blockout(re.sub(r'\s+', '', availabilityCell).lower())
+
+@functools.lru_cache(maxsize=AVAILABILITY_CACHE_SIZE)
+def blockout(normalizedCell):
+    availability = parseSiteAvailability(normalizedCell)
+    #Serialized as toJson does, and only once for each schedule
+    return json.dumps([{'day': day, 'hourBlocks': [{'hour': hour, 'checked': bool(availability >> (dayIndex * 24 + hour) & 1)} for hour in range(24)]}
+                       for dayIndex, day in enumerate(DAYS)], separators=(',', ':'))
+
+def parseSiteAvailability(normalizedCell):
+    #Reads a normalised availability cell in one pass and returns it as a week mask. Each entry is Day:START-END with any number of comma
+    #separated windows, and times are military time (0800, 08:00 or 8). The API only takes whole hours, so a window that starts or ends part
+    #way through an hour leaves that hour unavailable. A cell that can't be read raises ValueError
+    if normalizedCell in ('', 'allday'):
+        return ALL_WEEK
+    availability = 0
+    for entry in normalizedCell.split(';'):
+        if entry == '':
+            continue
+        dayName, separator, windows = entry.partition(':')
+        dayIndex = dayNumber(dayName)
+        if not separator or dayIndex is None:
+            raise ValueError("Site availability entry '" + entry + "' should look like Monday:0800-1700")
+        for window in windows.split(','):
+            startText, separator, endText = window.partition('-')
+            if not separator:
+                raise ValueError("Site availability window '" + window + "' should look like 0800-1700")
+            #As before, a missing start time means midnight
+            startHour = -(-clockMinutes(startText or '0000') // 60)
+            endHour = clockMinutes(endText) // 60
+            if endHour < startHour:
+                raise ValueError("Site availability window '" + window + "' ends before it starts")
+            availability |= ((1 << (endHour - startHour)) - 1) << (dayIndex * 24 + startHour)
+    return availability
+
+def dayNumber(dayName):
+    #Index in DAYS of a lower case day name or its first three letters
+    for dayIndex, day in enumerate(DAYS):
+        if len(dayName) >= 3 and day.lower().startswith(dayName):
+            return dayIndex
+    return None
+
+def clockMinutes(clockText):
+    #Minutes after midnight of a military time such as 0830, 08:30, 830 or 8, up to 2400
+    digits = clockText.replace(':', '')
+    if not digits.isdigit() or len(digits) > 4:
+        raise ValueError("'" + clockText + "' is not a military time such as 0800")
+    hours, minutes = (int(digits[:-2] or 0), int(digits[-2:])) if len(digits) > 2 else (int(digits), 0)
+    if minutes > 59 or hours * 60 + minutes > 24 * 60:
+        raise ValueError("'" + clockText + "' is not a military time such as 0800")
+    return hours * 60 + minutes
+
+def setExclusions(exclusionValues):
+    #Eclusions are provided in the format of a list of semi-colon separated strings by the user. This then splits that list to create an array
+    #of objects [{"value":"Exclusion String 1"}, {"value":"Exclusion String 2"}...{"value":"Exclusion String n"}] as is expected by the API.
+    #An empty cell (or a trailing semi-colon) adds nothing
+    return [{'value': exclusion} for exclusion in exclusionValues.split(';') if exclusion != ""]
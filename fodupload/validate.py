@@ -0,0 +1,121 @@
+#Checking rows against the template's allowed values, the tenant's users and custom attributes, before or instead of importing them
+import os
+import csv
+import re
+from .logs import consoleLogger, rowLog
+from .rows import APPLICATION_TYPES, ASSESSMENT_TYPES, BUSINESS_CRITICALITIES, ENVIRONMENT_FACINGS, FLAG_VALUES, REPEAT_FREQUENCIES, REQUIRED_FIELDS, RowReader, SDLC_STATUSES, TEMPLATE_COLUMNS, collectOwners, parseSiteAvailability
+from .client import FodClient, LocalCache, TokenManager
+from .api import AttributeCatalog, resolveOwners
+
+def ValidateApplications(uploadFile, apiKey, apiSecret, client=None, cache=None, ownerLookupThreshold=100, fillDynamicForm=False, reportPath=None):
+    #The --validate pass: checks every row of the file and writes a CSV report with a line for each problem found, without creating or
+    #changing anything in FoD. Owners and custom attributes come from the local cache when it has them, so a second pass over a corrected
+    #file usually sends no more than the token request. Returns the number of rows with problems, or None when authentication failed
+    if client is None:
+        client = FodClient()
+    if cache is None:
+        cache = LocalCache(None)
+
+    appData         = RowReader(uploadFile, requireDynamic=fillDynamicForm)
+    tokens          = TokenManager(client, apiKey, apiSecret, cache)
+    if tokens.token() is None:
+        return None
+    client.useTokenManager(tokens)
+    allUsers        = resolveOwners(client, collectOwners(uploadFile), cache, 1, ownerLookupThreshold)
+    validator       = RowValidator(allUsers, AttributeCatalog(client, cache), fillDynamicForm)
+
+    checkedRows     = 0
+    invalidRows     = 0
+    report          = []
+    for row in appData:
+        checkedRows += 1
+        problems = validator.problems(row)
+        if problems:
+            invalidRows += 1
+            for problem in problems:
+                consoleLogger.info("Row " + str(row.rowNumber) + " (" + row.get('applicationName') + "): " + problem, extra=rowLog(row, 'validate'))
+                report.append([row.rowNumber, row.get('applicationName'), problem])
+
+    if reportPath:
+        directory = os.path.dirname(reportPath)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        with open(reportPath, 'w', newline='', encoding='utf-8') as reportFile:
+            writer = csv.writer(reportFile)
+            writer.writerow(['Row', 'Application Name', 'Problem'])
+            writer.writerows(report)
+
+    summary = "Checked " + str(checkedRows) + " rows of " + uploadFile + ": " + str(invalidRows) + " with problems" + (", see " + reportPath if reportPath and invalidRows else "")
+    consoleLogger.info(summary)
+    return invalidRows
+
+class RowValidator(object):
+    #Checks a row against the values the template allows, the users found in FoD and the tenant's custom attributes, without sending
+    #anything to the API. problems() returns a message for each thing wrong with the row, and check() raises them as one ValueError.
+    #When an index of existing applications is given, the owner of an application FoD already has is not checked, as it isn't used
+    def __init__(self, allUsers, catalog, fillDynamicForm=False, applications=None):
+        self.allUsers           = allUsers
+        self.catalog            = catalog
+        self.fillDynamicForm    = fillDynamicForm
+        self.applications       = applications
+
+    def check(self, row):
+        problems = self.problems(row)
+        if problems:
+            raise ValueError("; ".join(problems))
+
+    def problems(self, row):
+        problems = ["No value for " + dict(TEMPLATE_COLUMNS)[field] for field in REQUIRED_FIELDS if row.get(field) == ""]
+        problems.extend(self.choiceProblem(row, 'businessCriticality', BUSINESS_CRITICALITIES))
+        #Checked as they will be sent, e.g. "Web/Thick Client" is sent as Web_Thick_Client and "QA/Test" as QA
+        problems.extend(self.choiceProblem(row, 'applicationType', APPLICATION_TYPES, row.fodApplicationType()))
+        problems.extend(self.choiceProblem(row, 'sdlcStatus', SDLC_STATUSES, row.fodSdlcStatus()))
+
+        ownerName = row.get('releaseOwner')
+        if ownerName != "" and ownerName.lower() not in self.allUsers and not self.applicationExists(row):
+            problems.append("Release owner '" + ownerName + "' is not a FoD user")
+
+        for attributeName, givenAttributeValue in row.attributes.items():
+            if givenAttributeValue == "":
+                continue
+            try:
+                self.catalog.attributeId(attributeName)
+                self.catalog.valueFor(attributeName, givenAttributeValue)
+            except KeyError as error:
+                problems.append(error.args[0])
+
+        if self.fillDynamicForm:
+            problems.extend(self.dynamicProblems(row))
+        return problems
+
+    def dynamicProblems(self, row):
+        problems = []
+        siteUrl = row.get('dynamicSiteUrl')
+        if not re.match(r'^https?://[^/\s]+', siteUrl, re.IGNORECASE):
+            problems.append("Dynamic site URL '" + siteUrl + "' should start with http:// or https://")
+        problems.extend(self.choiceProblem(row, 'assessmentType', ASSESSMENT_TYPES))
+        problems.extend(self.choiceProblem(row, 'environmentFacing', ENVIRONMENT_FACINGS))
+        problems.extend(self.choiceProblem(row, 'repeatFrequency', REPEAT_FREQUENCIES, allowEmpty=True))
+        problems.extend(self.choiceProblem(row, 'subscription', FLAG_VALUES, allowEmpty=True))
+        problems.extend(self.choiceProblem(row, 'restrictScanToDirectoryAndSubdirectories', FLAG_VALUES, allowEmpty=True))
+        try:
+            parseSiteAvailability(re.sub(r'\s+', '', row.get('siteAvailability')).lower())
+        except ValueError as error:
+            problems.append(str(error))
+        authMode = row.get('authenticationMode')
+        if authMode not in ('', 'NoAuthentication') and (row.get('primaryUsername') == "" or row.get('primaryPassword') == ""):
+            problems.append("Authentication mode " + authMode + " needs a primary username and password")
+        return problems
+
+    def choiceProblem(self, row, field, allowed, value=None, allowEmpty=False):
+        #A message when the field's value (or the value that will be sent for it) is not one of allowed, compared without case.
+        #Empty required values are already reported as missing
+        value = row.get(field) if value is None else value
+        if value == "" and (allowEmpty or field in REQUIRED_FIELDS):
+            return []
+        if value.lower() in [choice.lower() for choice in allowed]:
+            return []
+        return [dict(TEMPLATE_COLUMNS)[field] + " '" + row.get(field) + "' should be one of " + ", ".join(choice for choice in allowed if choice)]
+
+    def applicationExists(self, row):
+        return self.applications is not None and self.applications.classify(row)[0] != 'create'
@@ -0,0 +1,25 @@
+#The tests import the fodupload package from the root of the repository, and the mock FoD API from bench, wherever pytest is run from
+import os
+import sys
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_DIR, 'bench'))
+sys.path.insert(0, REPO_DIR)
+
+from mockfod import startMockFod
+
+@pytest.fixture
+def mockFod():
+    #The mock FoD API, on a free port for each test
+    server = startMockFod()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def workDirectory(tmp_path, monkeypatch):
+    #The import writes its log, journal and cache under the current directory
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
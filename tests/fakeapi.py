@@ -0,0 +1,156 @@
+#A stand-in for FodClient in the tests: it answers from listings and routes held in memory, pages listings as the API does, and records
+#every request it was sent
+import json
+import re
+import threading
+
+PAGE_LIMIT = 50
+
+class FakeResponse(object):
+    def __init__(self, statusCode, body, headers=None):
+        self.status_code    = statusCode
+        self.text           = body if isinstance(body, str) else json.dumps(body)
+        self.headers        = headers or {}
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    def json(self):
+        return json.loads(self.text)
+
+class FakeClient(object):
+    def __init__(self, listings=None, routes=None):
+        #listings maps a path to the items it lists, routes maps (method, path pattern) to a function of (match, kwargs) that returns
+        #(status, body)
+        self.listings   = listings or {}
+        self.routes     = routes or {}
+        self.calls      = []
+        self.lock       = threading.Lock()
+
+    def request(self, method, path, **kwargs):
+        method = method.upper()
+        with self.lock:
+            self.calls.append((method, path, dict(kwargs.get('params') or {})))
+        for (routeMethod, pattern), route in self.routes.items():
+            match = re.match('^' + pattern + '$', path)
+            if match and routeMethod == method:
+                status, body = route(match, kwargs)
+                return FakeResponse(status, body)
+        if method == 'GET' and path in self.listings:
+            return FakeResponse(200, self.page(self.listings[path], kwargs.get('params') or {}))
+        return FakeResponse(404, {'errors': [{'message': 'No route for ' + method + ' ' + path}]})
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def page(self, items, params):
+        #filters=field:value|value+field:value and orderBy=field (orderByDirection ASC or DESC), then offset paging with at most PAGE_LIMIT
+        #items a page. Without orderBy items are listed in the order they are held in
+        for condition in str(params.get('filters') or '').split('+'):
+            if condition:
+                field, separator, values = condition.partition(':')
+                wanted = set(value.lower() for value in values.split('|'))
+                items = [item for item in items if str(item.get(field)).lower() in wanted]
+        if params.get('orderBy'):
+            items = sorted(items, key=lambda item: item[params['orderBy']], reverse=params.get('orderByDirection') == 'DESC')
+        offset = int(params.get('offset') or 0)
+        limit = min(int(params.get('limit') or PAGE_LIMIT), PAGE_LIMIT)
+        return {'items': items[offset:offset + limit], 'totalCount': len(items)}
+
+    def count(self, method, path):
+        return len([call for call in self.calls if call[0] == method and call[1] == path])
+
+    def setBearerToken(self, bearerToken):
+        self.bearerToken = bearerToken
+
+    def useTokenManager(self, tokens):
+        self.tokens = tokens
+
+    def connectionSummary(self):
+        return "Sent " + str(len(self.calls)) + " API requests"
+
+def fieldOf(payload, field):
+    #The value of a field in a JSON payload, read without parsing the whole payload
+    found = re.search('"' + field + '":\\s*"([^"]*)"', payload)
+    return found.group(1) if found else None
+
+class FakeTenant(FakeClient):
+    #A FakeClient that answers as a small FoD tenant: 60 users (User0 to User59), a Business Units picklist attribute, and the applications
+    #and releases created through it. Applications and releases named in failNames are turned down
+    def __init__(self):
+        self.applications   = []
+        self.releases       = []
+        self.scanSetups     = {}
+        self.failNames      = set()
+        FakeClient.__init__(self,
+                            {'/api/v3/users': [{'userId': 1000 + number, 'userName': 'User' + str(number)} for number in range(60)],
+                             '/api/v3/attributes': [{'id': 7, 'name': 'Business Units', 'picklistValues': [{'id': 71, 'name': 'Retail'}, {'id': 72, 'name': 'Bank'}]}],
+                             '/api/v3/applications': self.applications,
+                             '/api/v3/releases': self.releases},
+                            {('POST', '/oauth/token'): self.token,
+                             ('POST', '/api/v3/applications'): self.createApplication,
+                             ('PUT', '/api/v3/applications/(\\d+)'): self.updateApplication,
+                             ('GET', '/api/v3/applications/(\\d+)/releases'): self.applicationReleases,
+                             ('POST', '/api/v3/releases'): self.createRelease,
+                             ('PUT', '/api/v3/releases/(\\d+)/dynamic-scans/scan-setup'): self.scanSetup})
+
+    def token(self, match, kwargs):
+        return 200, {'access_token': 'token', 'token_type': 'bearer', 'expires_in': 3600}
+
+    def createApplication(self, match, kwargs):
+        applicationName = fieldOf(kwargs['data'], 'applicationName')
+        if applicationName in self.failNames:
+            return 422, {'success': False, 'errors': [{'message': 'Application ' + applicationName + ' was turned down'}]}
+        application = {'applicationId': 100 + len(self.applications), 'applicationName': applicationName,
+                       'businessCriticalityType': fieldOf(kwargs['data'], 'businessCriticalityType')}
+        self.applications.append(application)
+        self.releases.append({'releaseId': 500 + len(self.releases), 'applicationId': application['applicationId'],
+                              'releaseName': fieldOf(kwargs['data'], 'releaseName')})
+        return 201, {'applicationId': application['applicationId'], 'success': True}
+
+    def updateApplication(self, match, kwargs):
+        for application in self.applications:
+            if application['applicationId'] == int(match.group(1)):
+                application.update(json.loads(kwargs['data']))
+                return 200, {'success': True}
+        return 404, {'errors': [{'message': 'No application ' + match.group(1)}]}
+
+    def createRelease(self, match, kwargs):
+        payload = json.loads(kwargs['data'])
+        if payload['releaseName'] in self.failNames:
+            return 422, {'success': False, 'errors': [{'message': 'Release ' + payload['releaseName'] + ' was turned down'}]}
+        release = {'releaseId': 500 + len(self.releases), 'applicationId': payload['applicationId'], 'releaseName': payload['releaseName']}
+        self.releases.append(release)
+        return 201, {'releaseId': release['releaseId'], 'success': True}
+
+    def applicationReleases(self, match, kwargs):
+        items = [release for release in self.releases if release['applicationId'] == int(match.group(1))]
+        return 200, {'items': items, 'totalCount': len(items)}
+
+    def scanSetup(self, match, kwargs):
+        self.scanSetups[int(match.group(1))] = kwargs['data']
+        return 200, {'success': True}
+
+class AsyncFakeClient(object):
+    #Stands in for AsyncFodClient in front of a FakeClient (or FakeTenant), so the async import can be run without a server
+    def __init__(self, fake):
+        self.fake = fake
+
+    async def request(self, method, path, **kwargs):
+        return self.fake.request(method, path, **kwargs)
+
+    async def get(self, path, **kwargs):
+        return self.fake.request('GET', path, **kwargs)
+
+    def setBearerToken(self, bearerToken):
+        self.fake.setBearerToken(bearerToken)
+
+    def useTokenManager(self, tokens):
+        self.fake.useTokenManager(tokens)
+
+    def connectionSummary(self):
+        return self.fake.connectionSummary()
+
+    async def aclose(self):
+        pass
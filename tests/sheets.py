@@ -0,0 +1,20 @@
+#Import files for the tests: rows of the import template, written as CSV
+import csv
+
+from fodupload import TEMPLATE_COLUMNS
+
+HEADERS = [header for field, header in TEMPLATE_COLUMNS] + ['Business Units']
+#Where each field of the template is in a row, e.g. COLUMN['releaseName']
+COLUMN = dict((field, index) for index, (field, header) in enumerate(TEMPLATE_COLUMNS))
+
+def templateRow(number):
+    return (['App ' + str(number), 'High', 'Web/Thick Client', 'R1', 'QA/Test', 'User' + str(number), 'https://app' + str(number) + '.example.com',
+             'Dynamic', 'Eastern Standard Time', 'External', '/logout;/admin', 'Do not repeat', 'ALL DAY', 'NoAuthentication', '', '', '', '',
+             'True', 'True', 'Bank'])
+
+def writeCsv(path, headers, rows):
+    with open(str(path), 'w', newline='', encoding='utf-8') as csvFile:
+        writer = csv.writer(csvFile)
+        writer.writerow(headers)
+        writer.writerows(rows)
+    return str(path)
@@ -0,0 +1,56 @@
+import asyncio
+import threading
+
+import pytest
+
+from fakeapi import AsyncFakeClient, FakeClient, FakeTenant
+from fodupload import (AddApplicationsAsync, ApplicationIndex, AsyncImport, AsyncReleaseLookup, ImportJournal, ImportRow, LocalCache, RowProgress,
+                       TEMPLATE_COLUMNS)
+from sheets import HEADERS, templateRow, writeCsv
+
+def releaseLookups(client):
+    return [call[2]['filters'] for call in client.calls if call[1] == '/api/v3/releases' and 'filters' in call[2]]
+
+def testAsyncImportSendsWhatTheThreadedImportSends(tmp_path):
+    rows = [templateRow(number) for number in range(30)]
+    rows[7][5] = 'Nobody'
+    path = writeCsv(tmp_path / 'apps.csv', HEADERS, rows)
+    tenant = FakeTenant()
+    asyncio.run(AddApplicationsAsync(path, 'key', 'secret', 10, AsyncFakeClient(tenant), LocalCache(None), 100,
+                                     ImportJournal(str(tmp_path / 'journal.db'), path), fillDynamicForm=True))
+    assert len(tenant.applications) == 29 and len(tenant.scanSetups) == 29
+    #Releases are looked up ten applications (the rows in progress) at a time
+    assert 3 <= len(releaseLookups(tenant)) <= 6
+    assert ImportJournal(str(tmp_path / 'journal.db'), path).summary().endswith(": 29 applications, 29 releases, 29 dynamic forms filled out, 0 dynamic forms failed")
+
+    #Run again, only the tenant is listed (and the row with an unknown owner fails again before it is sent)
+    tenant.calls = []
+    asyncio.run(AddApplicationsAsync(path, 'key', 'secret', 10, AsyncFakeClient(tenant), LocalCache(None), 100,
+                                     ImportJournal(str(tmp_path / 'journal.db'), path), fillDynamicForm=True))
+    assert [call[1] for call in tenant.calls if call[0] != 'GET'] == ['/oauth/token']
+
+def testRowsAreReadOffTheEventLoop():
+    readOn = []
+    def rows():
+        for number in range(250):
+            readOn.append(threading.current_thread())
+            yield ImportRow(number + 2, dict(zip([field for field, header in TEMPLATE_COLUMNS], templateRow(number))), {})
+    importer = AsyncImport(AsyncFakeClient(FakeTenant()), {}, None, ApplicationIndex([], []), ImportJournal(':memory:', 'apps.csv'), RowProgress(250), False)
+    #Every row fails on its unknown owner, what matters here is where the rows were read
+    importer.applications.classify = lambda row: ('unchanged', {'applicationId': 1, 'releases': {'r1': 2}}, [])
+    asyncio.run(importer.run(rows(), 5))
+    assert len(readOn) == 250 and threading.main_thread() not in readOn
+
+def testReleaseLookupsAreBatchedAndKeptUntilTheyFinish():
+    client = FakeClient({'/api/v3/releases': [{'releaseId': 5000 + number, 'applicationId': number, 'releaseName': 'R1'} for number in range(12)]})
+    async def resolveAll():
+        releases = AsyncReleaseLookup(AsyncFakeClient(client), batchSize=5)
+        found = await asyncio.gather(*[releases.resolve(applicationId) for applicationId in range(12)])
+        with pytest.raises(KeyError, match="No release found for application 99"):
+            await releases.resolve(99)
+        return found, releases
+    found, releases = asyncio.run(resolveAll())
+    assert found == [5000 + number for number in range(12)]
+    #Two full batches and the remaining two after RELEASE_BATCH_WAIT, then the unknown application on its own
+    assert [len(lookup.split('|')) for lookup in releaseLookups(client)] == [5, 5, 2, 1]
+    assert releases.lookups == set()
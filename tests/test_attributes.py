@@ -0,0 +1,39 @@
+from collections import OrderedDict
+
+import pytest
+
+from fakeapi import FakeClient
+from fodupload import AttributeCatalog, LocalCache, setCustomAttributeValue
+
+def attributeDefinitions(count):
+    #Business Units is a picklist, the others take any text
+    definitions = [{'id': 7, 'name': 'Business Units', 'attributeType': 'Application', 'attributeDataType': 'Picklist',
+                    'picklistValues': [{'id': 71, 'name': 'Retail'}, {'id': 72, 'name': 'Bank'}]}]
+    definitions += [{'id': 100 + number, 'name': 'Note ' + str(number), 'attributeDataType': 'Text', 'picklistValues': None} for number in range(count - 1)]
+    return definitions
+
+def testCatalogListsTheAttributesOnceAndLooksThemUpInMemory():
+    client = FakeClient({'/api/v3/attributes': attributeDefinitions(60)})
+    catalog = AttributeCatalog(client, LocalCache(None))
+    for row in range(20):
+        attributes = setCustomAttributeValue(catalog, OrderedDict([('business units', ' bank '), ('Note 55', 'Some text'), ('Note 3', '')]))
+        assert attributes == [{'id': 7, 'value': 72}, {'id': 155, 'value': 'Some text'}]
+    #60 definitions are two pages, fetched once for all 20 rows
+    assert client.count('GET', '/api/v3/attributes') == 2
+
+def testCatalogTurnsDownUnknownAttributesAndValues():
+    catalog = AttributeCatalog(FakeClient({'/api/v3/attributes': attributeDefinitions(2)}), LocalCache(None))
+    with pytest.raises(KeyError, match="No custom attribute named 'Region'"):
+        setCustomAttributeValue(catalog, {'Region': 'EMEA'})
+    with pytest.raises(KeyError, match="'Insurance' is not one of the values of custom attribute 'Business Units'"):
+        setCustomAttributeValue(catalog, {'Business Units': 'Insurance'})
+
+def testCatalogIsCachedBetweenRuns(tmp_path):
+    client = FakeClient({'/api/v3/attributes': attributeDefinitions(3)})
+    AttributeCatalog(client, LocalCache(str(tmp_path), 24, 'https://api.example.com key')).attributeId('Note 1')
+    AttributeCatalog(client, LocalCache(str(tmp_path), 24, 'https://api.example.com key')).attributeId('Note 1')
+    assert client.count('GET', '/api/v3/attributes') == 1
+    #Another tenant (URL and key) has a cache of its own, and a TTL of 0 turns the cache off
+    AttributeCatalog(client, LocalCache(str(tmp_path), 24, 'https://api.example.com other-key')).attributeId('Note 1')
+    AttributeCatalog(client, LocalCache(str(tmp_path), 0, 'https://api.example.com key')).attributeId('Note 1')
+    assert client.count('GET', '/api/v3/attributes') == 3
@@ -0,0 +1,51 @@
+import pytest
+
+from fakeapi import FakeTenant
+from fodupload import AddApplications, ApplicationIndex, ImportJournal, ImportRow, LocalCache, TEMPLATE_COLUMNS, createApplication, createRelease
+from sheets import COLUMN, HEADERS, templateRow, writeCsv
+
+def importRow(applicationName, releaseName, businessCriticality):
+    return ImportRow(2, {'applicationName': applicationName, 'releaseName': releaseName, 'businessCriticality': businessCriticality}, {})
+
+def runImport(tenant, path, tmp_path, dynamic=False):
+    AddApplications(path, 'key', 'secret', 1, tenant, LocalCache(None), 100, ImportJournal(str(tmp_path / 'journal.db'), path), fillDynamicForm=dynamic)
+
+def testRowsAreClassifiedAgainstTheIndex():
+    index = ApplicationIndex([{'applicationId': 1, 'applicationName': 'Web Shop', 'businessCriticalityType': 'High'}],
+                             [{'releaseId': 10, 'applicationId': 1, 'releaseName': 'R1'}, {'releaseId': 11, 'applicationId': 2, 'releaseName': 'R1'}])
+    assert index.classify(importRow('New app', 'R1', 'High'))[0] == 'create'
+    assert index.classify(importRow('web shop', 'r1', 'high'))[::2] == ('unchanged', [])
+    assert index.classify(importRow('Web Shop', 'R2', 'Low'))[::2] == ('update', ['release', 'businessCriticality'])
+    #A new application is known to the index as soon as it is created, with the attributes it was created with
+    index.addApplication(importRow('New app', 'R1', 'High'), 2, attributeArray=[{'id': 7, 'value': 72}])
+    action, application, changes = index.classify(importRow('New app', 'R1', 'High'))
+    assert action != 'create' and application['attributes'] == [{'id': 7, 'value': 72}]
+
+def testRerunningAnImportedFileOnlyListsTheTenant(tmp_path):
+    path = writeCsv(tmp_path / 'apps.csv', HEADERS, [templateRow(number) for number in range(4)])
+    tenant = FakeTenant()
+    runImport(tenant, path, tmp_path, True)
+    assert len(tenant.applications) == 4 and len(tenant.scanSetups) == 4
+
+    #The second run needs no request per row, and leaves the dynamic scan forms of the existing releases alone
+    tenant.calls = []
+    tenant.scanSetups = {}
+    rows = [templateRow(number) for number in range(5)]
+    rows[1][COLUMN['releaseName']] = 'R2'
+    rows[2][COLUMN['businessCriticality']] = 'Low'
+    writeCsv(tmp_path / 'apps.csv', HEADERS, rows)
+    runImport(tenant, path, tmp_path, True)
+    #Row 1 adds release R2 (release 504) and row 4 is a new application (release 505), only those get a dynamic scan form
+    writes = sorted((method, path) for method, path, params in tenant.calls if method != 'GET')
+    assert writes == [('POST', '/api/v3/applications'), ('POST', '/api/v3/releases'), ('POST', '/oauth/token'), ('PUT', '/api/v3/applications/102'),
+                      ('PUT', '/api/v3/releases/504/dynamic-scans/scan-setup'), ('PUT', '/api/v3/releases/505/dynamic-scans/scan-setup')]
+    assert tenant.applications[2]['businessCriticalityType'] == 'Low'
+
+def testTurnedDownCreateRequestsFailTheRow():
+    tenant = FakeTenant()
+    tenant.failNames = set(['App 0', 'R9'])
+    row = ImportRow(2, dict(zip([field for field, header in TEMPLATE_COLUMNS], templateRow(0))), {})
+    with pytest.raises(ValueError, match="Creating application App 0 failed: .*Application App 0 was turned down"):
+        createApplication(tenant, row, '1000', [])
+    with pytest.raises(ValueError, match="Creating release R9 of application App 0 failed: .*Release R9 was turned down"):
+        createRelease(tenant, importRow('App 0', 'R9', 'High'), 100)
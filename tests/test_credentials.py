@@ -0,0 +1,53 @@
+import os
+
+import pytest
+
+from fodupload import ImportJournal, Metrics, RowReader, collectOwners, inShard, main, readCredentials
+from sheets import COLUMN, HEADERS, templateRow, writeCsv
+
+def testReadCredentials(tmp_path):
+    path = tmp_path / 'keys.csv'
+    path.write_text("key,secret\n# the second tenant admin\nkey-one, secret-one\n\nkey-two,secret-two\n")
+    assert readCredentials(str(path)) == [('key-one', 'secret-one'), ('key-two', 'secret-two')]
+
+@pytest.mark.parametrize('text, message', [("key-one\n", "Line 1 of .* should be key,secret"), ("key,secret\n#none yet\n", "has no credentials in it")])
+def testUnreadableCredentialsRaiseValueError(tmp_path, text, message):
+    path = tmp_path / 'keys.csv'
+    path.write_text(text)
+    with pytest.raises(ValueError, match=message):
+        readCredentials(str(path))
+
+def testEveryApplicationIsInOneShard(tmp_path):
+    rows = [templateRow(number) for number in range(40)]
+    #The second release of App 3, under a name in another case
+    rows.append(templateRow(3))
+    rows[-1][COLUMN['applicationName']] = 'APP 3'
+    rows[-1][COLUMN['releaseName']] = 'R2'
+    path = writeCsv(tmp_path / 'apps.csv', HEADERS, rows)
+    shards = [[row.rowNumber for row in RowReader(path, shard=(index, 3))] for index in range(3)]
+    assert sorted(sum(shards, [])) == list(range(2, 43))
+    assert all(shards)
+    assert len([shard for shard in shards if 5 in shard and 42 in shard]) == 1
+    assert set(sum([list(collectOwners(path, (index, 3))) for index in range(3)], [])) == set(collectOwners(path))
+    assert inShard(next(iter(RowReader(path))), (0, 1))
+
+def testMetricsOfWorkerProcessesAreAddedTogether():
+    shard = Metrics()
+    shard.count('fodimport_rows_total', 3, outcome='done')
+    shard.observe('fodimport_request_seconds', 0.02, endpoint='applications')
+    total = Metrics()
+    total.count('fodimport_rows_total', 2, outcome='done')
+    total.merge(shard.state())
+    total.merge(shard.state())
+    assert total.total('fodimport_rows_total', outcome='done') == 8
+    assert total.snapshot()['fodimport_request_seconds'][0]['count'] == 2
+
+def testImportIsSharedBetweenKeys(mockFod, workDirectory):
+    sheetPath = writeCsv(workDirectory / 'apps.csv', HEADERS, [templateRow(number) for number in range(12)])
+    (workDirectory / 'keys.csv').write_text("key-one,secret-one\nkey-two,secret-two\n")
+    main([sheetPath, '--credentials', str(workDirectory / 'keys.csv'), '--api-url', mockFod.url, '--rate', '100000/s', '--cache-ttl', '0', '-d', '-q'])
+    #A token for each key, and every row imported once
+    assert mockFod.state.calls['POST /oauth/token'] == 2
+    assert mockFod.state.calls['POST /api/v3/applications'] == 12 and len(mockFod.state.scanSetups) == 12
+    assert os.path.exists(os.path.join('log', 'FodImport-shard1.log')) and os.path.exists(os.path.join('log', 'FodImport-shard2.log'))
+    assert ImportJournal(os.path.join('log', 'FodImport.db'), sheetPath).summary().endswith(": 12 applications, 12 releases, 12 dynamic forms filled out, 0 dynamic forms failed")
@@ -0,0 +1,65 @@
+#The configure-dynamic command against the mock FoD API, after an import of the same file
+import json
+
+import pytest
+
+from fodupload import main
+from sheets import COLUMN, HEADERS, templateRow, writeCsv
+
+SCAN_SETUP = '/api/v3/releases/{id}/dynamic-scans/scan-setup'
+
+def importRows(server, rows, workDirectory, *options):
+    sheetPath = writeCsv(workDirectory / 'apps.csv', HEADERS, rows)
+    main([sheetPath, 'test-key', 'test-secret', '--api-url', server.url, '--rate', '100000/s', '--cache-ttl', '0', '-q'] + list(options))
+    return sheetPath
+
+def configureDynamic(server, sheetPath, workDirectory, *options):
+    #Runs configure-dynamic and returns its exit code and JSON report, by application name
+    reportPath = str(workDirectory / 'configure.json')
+    with pytest.raises(SystemExit) as stopped:
+        main(['configure-dynamic', sheetPath, 'test-key', 'test-secret', '--api-url', server.url, '--rate', '100000/s', '--cache-ttl', '0', '-q',
+              '--report', reportPath] + list(options))
+    with open(reportPath, encoding='utf-8') as reportFile:
+        return stopped.value.code, dict((line['applicationName'], line) for line in json.load(reportFile))
+
+def testFormsAreFilledOutForReleasesImportedWithoutThem(mockFod, workDirectory):
+    sheetPath = importRows(mockFod, [templateRow(number) for number in range(4)], workDirectory)
+    assert mockFod.state.scanSetups == {}
+    code, report = configureDynamic(mockFod, sheetPath, workDirectory)
+    assert code == 0
+    assert [line['status'] for line in report.values()] == ['configured'] * 4
+    assert len(mockFod.state.scanSetups) == 4 and mockFod.state.calls['PUT ' + SCAN_SETUP] == 4
+    #Nothing is created or changed
+    assert mockFod.state.calls['POST /api/v3/applications'] == 4 and 'PUT /api/v3/applications/{id}' not in mockFod.state.calls
+
+def testOnlySetupsThatDifferAreSent(mockFod, workDirectory):
+    sheetPath = importRows(mockFod, [templateRow(number) for number in range(3)], workDirectory, '-d')
+    releaseId = [releaseId for releaseId, release in mockFod.state.releases.items() if release['applicationName'] == 'App 1'][0]
+    mockFod.state.scanSetups[releaseId]['timeZone'] = 'UTC'
+    sent = mockFod.state.calls['PUT ' + SCAN_SETUP]
+    code, report = configureDynamic(mockFod, sheetPath, workDirectory)
+    assert code == 0
+    assert report['App 0']['status'] == report['App 2']['status'] == 'unchanged'
+    assert report['App 1']['status'] == 'configured' and report['App 1']['details'] == ["Differs in timeZone"]
+    assert mockFod.state.calls['PUT ' + SCAN_SETUP] == sent + 1 and mockFod.state.scanSetups[releaseId]['timeZone'] != 'UTC'
+
+def testLookupFindsReleasesAndDryRunSendsNothing(mockFod, workDirectory):
+    sheetPath = importRows(mockFod, [templateRow(number) for number in range(2)], workDirectory)
+    #A row that was never imported has no release to find
+    sheetPath = writeCsv(workDirectory / 'apps.csv', HEADERS, [templateRow(number) for number in range(3)])
+    code, report = configureDynamic(mockFod, sheetPath, workDirectory, '--releases', 'lookup', '--dry-run')
+    assert code == 1
+    assert report['App 0']['status'] == report['App 1']['status'] == 'pending' and report['App 0']['details'] == ["Not in FoD"]
+    assert report['App 2']['status'] == 'missing' and report['App 2']['releaseId'] is None
+    assert 'PUT ' + SCAN_SETUP not in mockFod.state.calls
+
+def testUnreadableDynamicColumnsFailOnlyTheirRow(mockFod, workDirectory):
+    rows = [templateRow(number) for number in range(3)]
+    importRows(mockFod, rows, workDirectory)
+    rows[1][COLUMN['siteAvailability']] = 'Someday:0800-1700'
+    sheetPath = writeCsv(workDirectory / 'apps.csv', HEADERS, rows)
+    code, report = configureDynamic(mockFod, sheetPath, workDirectory, '--force')
+    assert code == 1
+    assert report['App 1']['status'] == 'failed' and report['App 1']['details'][0].startswith("Dynamic scan columns: ")
+    assert report['App 0']['status'] == report['App 2']['status'] == 'configured'
+    assert len(mockFod.state.scanSetups) == 2
@@ -0,0 +1,83 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+import pytest
+
+from fodupload import FodClient, GetToken
+
+class RecordingHandler(BaseHTTPRequestHandler):
+    #Answers every request with a small JSON body over a keep-alive connection, and records what was asked and from which client port
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def answer(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length).decode() if length else ''
+        self.server.seen.append((self.command, self.path, self.headers.get('Authorization'), self.client_address[1], body))
+        if self.path == '/oauth/token':
+            reply = {'access_token': 'test-token', 'token_type': 'bearer', 'expires_in': 21600}
+        else:
+            reply = {'items': [], 'totalCount': 0}
+        data = json.dumps(reply).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST = do_PUT = answer
+
+class RecordingServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+@pytest.fixture
+def server():
+    server = RecordingServer(('127.0.0.1', 0), RecordingHandler)
+    server.seen = []
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+class RecordingLimiter(object):
+    def __init__(self):
+        self.endpoints = []
+
+    def reserve(self, endpoint):
+        self.endpoints.append(endpoint)
+        return 0
+
+@pytest.mark.parametrize('path, endpoint', [
+    ('/oauth/token', 'token'),
+    ('/api/v3/users', 'users'),
+    ('/api/v3/attributes', 'attributes'),
+    ('/api/v3/applications', 'applications'),
+    ('/api/v3/applications/1001/releases', 'releases'),
+    ('/api/v3/releases/1002/dynamic-scans/scan-setup', 'scan-setup'),
+    ('/api/v3/releases', 'releases'),
+    ('/api/v3/something-else', '*'),
+])
+def testEndpointFor(path, endpoint):
+    assert FodClient().endpointFor(path) == endpoint
+
+def testRequestsShareOneKeepAliveConnection(server):
+    limiter = RecordingLimiter()
+    client = FodClient('http://127.0.0.1:' + str(server.server_address[1]) + '/', limiter, poolSize=2)
+    bearerToken = GetToken(client, 'test-key', 'test-secret')
+    assert bearerToken == 'test-token'
+    client.setBearerToken(bearerToken)
+    for request in range(5):
+        client.get('/api/v3/users', params={'offset': request * 50})
+
+    assert len(server.seen) == 6
+    assert set(port for method, path, authorization, port, body in server.seen) == set([server.seen[0][3]])
+    assert [authorization for method, path, authorization, port, body in server.seen[1:]] == ['Bearer test-token'] * 5
+    assert 'client_id=test-key' in server.seen[0][4]
+    assert limiter.endpoints == ['token'] + ['users'] * 5
+    assert client.connectionSummary() == "Sent 6 API requests over 1 connections"
@@ -0,0 +1,30 @@
+from fakeapi import FakeTenant
+from fodupload import AddApplications, ImportJournal, ImportRow, LocalCache
+from sheets import HEADERS, templateRow, writeCsv
+
+def testJournalKeepsRowProgressForResume(tmp_path):
+    path = str(tmp_path / 'journal.db')
+    journal = ImportJournal(path, 'apps.csv')
+    journal.record(ImportRow(2, {'applicationName': 'App 0'}, {}), applicationId=100, releaseId=500)
+    journal.record(ImportRow(3, {'applicationName': 'App 1'}, {}), lastError="KeyError('user9')")
+    #Earlier runs are only used with --resume, and only while the row still names the same application
+    assert ImportJournal(path, 'apps.csv').progressFor(ImportRow(2, {'applicationName': 'App 0'}, {})) == {}
+    resumed = ImportJournal(path, 'apps.csv', resume=True)
+    assert resumed.progressFor(ImportRow(2, {'applicationName': 'App 0'}, {})) == {'applicationId': 100, 'releaseId': 500}
+    assert resumed.progressFor(ImportRow(2, {'applicationName': 'Another app'}, {})) == {}
+    assert resumed.progressFor(ImportRow(2, {'applicationName': 'App 0'}, {})) == {'applicationId': 100, 'releaseId': 500}
+    assert resumed.summary().endswith(": 1 applications, 1 releases, 0 dynamic forms filled out, 0 dynamic forms failed")
+
+def testResumeOnlyRepeatsTheRowsThatDidNotFinish(tmp_path):
+    path = writeCsv(tmp_path / 'apps.csv', HEADERS, [templateRow(number) for number in range(6)])
+    tenant = FakeTenant()
+    tenant.failNames = set(['App 2', 'App 4'])
+    AddApplications(path, 'key', 'secret', 2, tenant, LocalCache(None), 100, ImportJournal(str(tmp_path / 'journal.db'), path))
+    assert sorted(application['applicationName'] for application in tenant.applications) == ['App 0', 'App 1', 'App 3', 'App 5']
+
+    tenant.failNames = set()
+    tenant.calls = []
+    AddApplications(path, 'key', 'secret', 2, tenant, LocalCache(None), 100, ImportJournal(str(tmp_path / 'journal.db'), path, resume=True))
+    #Only the two rows that failed are sent again, and every application exists once
+    assert tenant.count('POST', '/api/v3/applications') == 2
+    assert sorted(application['applicationName'] for application in tenant.applications) == ['App ' + str(number) for number in range(6)]
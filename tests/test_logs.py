@@ -0,0 +1,55 @@
+import json
+import logging
+
+import pytest
+
+from fodupload import ImportRow, consoleLogger, logger, redact, rowLog, setupLogging
+
+@pytest.mark.parametrize('text, expected', [
+    ('{"primaryPassword": "hunter2", "primaryUsername": "pu"}', '{"primaryPassword": "***", "primaryUsername": "pu"}'),
+    ("{'secondaryPassword': 'pw', 'hour': 8}", "{'secondaryPassword': '***', 'hour': 8}"),
+    ('scope=api-tenant&grant_type=client_credentials&client_id=key&client_secret=s3cr3t', 'scope=api-tenant&grant_type=client_credentials&client_id=key&client_secret=***'),
+    ('{"access_token": "mock-1001", "expires_in": 21600}', '{"access_token": "***", "expires_in": 21600}'),
+    ('{"body": "{\\"password\\": \\"pw\\", \\"user\\": \\"u\\"}"}', '{"body": "{\\"password\\": \\"***\\", \\"user\\": \\"u\\"}"}'),
+    ('Sent with Bearer abcdefgh12345678', 'Sent with Bearer ***'),
+    ('Row 2: done, 3 releases', 'Row 2: done, 3 releases'),
+])
+def testRedactHidesCredentials(text, expected):
+    assert redact(text) == expected
+
+def testRedactHidesAuthorizationHeaders():
+    redacted = redact("{'Authorization': 'Bearer abcdefgh12345678', 'Accept': 'application/json'}")
+    assert 'abcdefgh12345678' not in redacted
+    assert "'Accept': 'application/json'" in redacted
+
+def logLines(tmp_path):
+    with open(str(tmp_path / 'log' / 'FodImport.log'), encoding='utf-8') as logFile:
+        return [json.loads(line) for line in logFile]
+
+def testLogFileIsRedactedJsonLines(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    listener = setupLogging(True)
+    row = ImportRow(7, {'applicationName': 'App 7'}, {})
+    logger.error("Turned down: %s", '{"primaryPassword": "hunter2"}', extra=rowLog(row, 'dynamic', 0.12345))
+    listener.stop()
+    line = logLines(tmp_path)[-1]
+    assert line['level'] == 'ERROR' and line['message'] == 'Turned down: {"primaryPassword": "***"}'
+    assert (line['row'], line['application'], line['stage'], line['duration']) == (7, 'App 7', 'dynamic', 0.123)
+
+def testLogLevelOnlyAppliesToTheLogFile(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    listener = setupLogging(False, logging.WARNING)
+    logger.info("Only for a file at INFO")
+    logger.warning("For the file and the console")
+    consoleLogger.info("Checked 3 rows: 1 with problems")
+    listener.stop()
+    assert [line['message'] for line in logLines(tmp_path)] == ["For the file and the console"]
+    assert capsys.readouterr().out.splitlines() == ["For the file and the console", "Checked 3 rows: 1 with problems"]
+
+    #--quiet leaves only warnings and errors on the console
+    listener = setupLogging(True, logging.DEBUG)
+    logger.debug("Payload")
+    consoleLogger.info("Summary")
+    listener.stop()
+    assert [line['message'] for line in logLines(tmp_path)][-2:] == ["Payload", "Summary"]
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,77 @@
+import asyncio
+import json
+
+import pytest
+
+from fodupload import main
+from fodupload.metrics import Metrics, MetricsExporter, metrics, timed
+from sheets import HEADERS, templateRow, writeCsv
+
+def sampleValue(registry, name, **labels):
+    for sample in registry.snapshot().get(name, []):
+        if sample['labels'] == labels:
+            return sample.get('value', sample.get('count'))
+    return 0
+
+def testHistogramBucketsAreCumulative():
+    registry = Metrics()
+    for seconds in (0.003, 0.07, 0.08, 100):
+        registry.observe('fodimport_request_seconds', seconds, endpoint='users')
+    sample = registry.snapshot()['fodimport_request_seconds'][0]
+    assert sample['count'] == 4 and sample['sum'] == 100.153
+    assert sample['buckets']['0.005'] == 1 and sample['buckets']['0.1'] == 3 and sample['buckets']['60.0'] == 3
+
+def testPrometheusText():
+    registry = Metrics()
+    registry.count('fodimport_requests_total', endpoint='users', method='GET', status=200)
+    registry.count('fodimport_requests_total', endpoint='users', method='GET', status=200)
+    registry.count('fodimport_retries_total', endpoint='a"b', reason='401')
+    registry.observe('fodimport_stage_seconds', 0.2, stage='create')
+    lines = registry.prometheusText().splitlines()
+    assert lines[:3] == ['# HELP fodimport_requests_total API requests sent, by endpoint, method and status code',
+                         '# TYPE fodimport_requests_total counter',
+                         'fodimport_requests_total{endpoint="users",method="GET",status="200"} 2.0']
+    assert 'fodimport_retries_total{endpoint="a\\"b",reason="401"} 1.0' in lines
+    assert 'fodimport_stage_seconds_bucket{le="0.25",stage="create"} 1' in lines
+    assert 'fodimport_stage_seconds_bucket{le="+Inf",stage="create"} 1' in lines
+    assert 'fodimport_stage_seconds_count{stage="create"} 1' in lines
+
+def testExporterWritesBothFilesWhenStopped(tmp_path):
+    registry = Metrics()
+    exporter = MetricsExporter(str(tmp_path / 'metrics' / 'run.json'), str(tmp_path / 'run.prom'), 0, registry).start()
+    registry.count('fodimport_rows_total', 5, outcome='done')
+    exporter.stop()
+    written = json.loads((tmp_path / 'metrics' / 'run.json').read_text())
+    assert written['metrics']['fodimport_rows_total'] == [{'labels': {'outcome': 'done'}, 'value': 5}]
+    assert written['metrics']['fodimport_rows_per_second'][0]['value'] > 0
+    assert 'fodimport_rows_total{outcome="done"} 5.0' in (tmp_path / 'run.prom').read_text().splitlines()
+
+def testExporterOnlyWarnsWhenItCantWrite(tmp_path):
+    (tmp_path / 'file').write_text('')
+    MetricsExporter(str(tmp_path / 'file' / 'run.json'), None, 0, Metrics()).start().stop()
+
+def testTimedRecordsFunctionsAndCoroutines():
+    @timed
+    def lookUp():
+        return 1
+
+    @timed
+    async def lookUpAsync():
+        return 2
+
+    before = sampleValue(metrics, 'fodimport_call_seconds', function='lookUp'), sampleValue(metrics, 'fodimport_call_seconds', function='lookUpAsync')
+    assert lookUp() == 1 and asyncio.run(lookUpAsync()) == 2
+    assert sampleValue(metrics, 'fodimport_call_seconds', function='lookUp') == before[0] + 1
+    assert sampleValue(metrics, 'fodimport_call_seconds', function='lookUpAsync') == before[1] + 1
+
+@pytest.mark.parametrize('mode', [[], ['--async']])
+def testImportRecordsItsRequestsAndRows(mockFod, workDirectory, mode):
+    sheetPath = writeCsv(workDirectory / 'apps.csv', HEADERS, [templateRow(number) for number in range(4)])
+    before = (sampleValue(metrics, 'fodimport_requests_total', endpoint='applications', method='POST', status=201),
+              sampleValue(metrics, 'fodimport_rows_total', outcome='done'))
+    main([sheetPath, 'key', 'secret', '-d', '--api-url', mockFod.url, '--rate', '100000/s', '--cache-ttl', '0', '--metrics-interval', '0'] + mode)
+    assert sampleValue(metrics, 'fodimport_requests_total', endpoint='applications', method='POST', status=201) == before[0] + 4
+    assert sampleValue(metrics, 'fodimport_rows_total', outcome='done') == before[1] + 4
+    written = json.loads((workDirectory / 'log' / 'FodMetrics.json').read_text())
+    assert 'fodimport_request_seconds' in written['metrics'] and 'fodimport_stage_seconds' in written['metrics']
+    assert (workDirectory / 'log' / 'fodimport.prom').exists()
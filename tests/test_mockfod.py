@@ -0,0 +1,66 @@
+#The uploader run against the mock of the FoD API in bench/mockfod.py, started on a free port for each test
+import os
+import sqlite3
+
+import requests
+
+from fodupload import main
+from mockfod import startMockFod
+from sheets import HEADERS, templateRow, writeCsv
+
+def bearerHeaders(server):
+    token = requests.post(server.url + '/oauth/token', data='grant_type=client_credentials').json()['access_token']
+    return {'authorization': 'Bearer ' + token, 'content-type': 'application/json'}
+
+def runImport(server, sheetPath, *arguments):
+    main([sheetPath, 'test-key', 'test-secret', '--api-url', server.url, '--rate', '100000/s', '--cache-ttl', '0'] + list(arguments))
+    with server.state.lock:
+        return dict(server.state.calls)
+
+def callsSince(before, after, endpoint):
+    return after.get(endpoint, 0) - before.get(endpoint, 0)
+
+def testBodyThatIsNotJsonIsTurnedDown(mockFod):
+    headers = bearerHeaders(mockFod)
+    response = requests.post(mockFod.url + '/api/v3/applications', data='{"applicationName": "App 0",}', headers=headers)
+    assert response.status_code == 400
+    assert mockFod.state.applications == {}
+
+def testListingsArePagedAndFiltered(mockFod):
+    headers = bearerHeaders(mockFod)
+    page = requests.get(mockFod.url + '/api/v3/users', params={'offset': 450, 'limit': 100}, headers=headers).json()
+    assert page['totalCount'] == 500 and len(page['items']) == 50
+    found = requests.get(mockFod.url + '/api/v3/users', params={'filters': 'userName:User3|User7'}, headers=headers).json()
+    assert [user['userId'] for user in found['items']] == [103, 107]
+
+def testExpiredTokenIsTurnedDown():
+    server = startMockFod(tokenTtl=0)
+    try:
+        response = requests.get(server.url + '/api/v3/users', headers=bearerHeaders(server))
+        assert response.status_code == 401
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def testResumeSkipsWhatTheJournalHas(mockFod, workDirectory):
+    sheetPath = writeCsv(workDirectory / 'apps.csv', HEADERS, [templateRow(number) for number in range(6)])
+    calls = runImport(mockFod, sheetPath)
+    assert calls.get('POST /api/v3/applications') == 6
+    assert 'PUT /api/v3/releases/{id}/dynamic-scans/scan-setup' not in calls
+
+    #The same file again with -d: the applications and releases are in the journal, so only the dynamic scan forms are sent
+    resumed = runImport(mockFod, sheetPath, '-d', '--resume')
+    assert callsSince(calls, resumed, 'POST /api/v3/applications') == 0
+    assert callsSince(calls, resumed, 'POST /api/v3/releases') == 0
+    assert callsSince(calls, resumed, 'PUT /api/v3/releases/{id}/dynamic-scans/scan-setup') == 6
+    connection = sqlite3.connect(os.path.join('log', 'FodImport.db'))
+    entries = connection.execute("SELECT applicationId, releaseId, dynamicStatus FROM rows ORDER BY rowNumber").fetchall()
+    connection.close()
+    assert len(entries) == 6
+    assert all(applicationId and releaseId and dynamicStatus == 'done' for applicationId, releaseId, dynamicStatus in entries)
+
+    #And once more, with nothing left to do
+    again = runImport(mockFod, sheetPath, '-d', '--resume')
+    assert callsSince(resumed, again, 'POST /api/v3/applications') == 0
+    assert callsSince(resumed, again, 'PUT /api/v3/releases/{id}/dynamic-scans/scan-setup') == 0
+    assert len(mockFod.state.scanSetups) == 6
@@ -0,0 +1,58 @@
+#The fodupload package: what importing it (and starting the command line) loads, and the names it and UploadApps.py expose
+import subprocess
+import sys
+
+import pytest
+
+import fodupload
+import UploadApps
+from conftest import REPO_DIR
+from sheets import HEADERS, templateRow, writeCsv
+
+def runPython(code, *arguments):
+    #Runs code in a fresh interpreter from the root of the repository, and returns what it printed
+    return subprocess.check_output([sys.executable, '-c', code] + list(arguments), cwd=REPO_DIR).decode().strip()
+
+def testImportingThePackageLoadsNoModules():
+    assert runPython("import sys, fodupload; print(sorted(name for name in sys.modules if name.startswith('fodupload.')))") == "[]"
+
+def testEveryExportedNameCanBeLoaded():
+    for name in fodupload.__all__:
+        assert getattr(fodupload, name) is not None, name
+    assert set(fodupload.__all__) <= set(dir(fodupload))
+    with pytest.raises(AttributeError):
+        fodupload.NoSuchName
+
+def testUploadAppsExposesThePackage():
+    from fodupload.importer import AddApplications
+    from fodupload.client import FodClient
+    assert UploadApps.AddApplications is AddApplications and UploadApps.FodClient is FodClient
+
+def testMetricsIsTheModuleAndUploadAppsMetricsTheRegistry():
+    from fodupload.metrics import Metrics, metrics
+    assert fodupload.metrics.metrics is metrics and isinstance(UploadApps.metrics, Metrics)
+
+def testHelpLoadsNeitherRequestsNorAsyncio():
+    loaded = runPython("import sys\n"
+                       "from fodupload.cli import main\n"
+                       "try:\n"
+                       "    main(['--help'])\n"
+                       "except SystemExit:\n"
+                       "    pass\n"
+                       "print('requests' in sys.modules, 'asyncio' in sys.modules, 'fodupload.importer' in sys.modules)")
+    assert loaded.splitlines()[-1] == "False False False"
+
+def testThreadedImportRunsWithoutAsyncio(mockFod, workDirectory):
+    sheetPath = writeCsv(workDirectory / 'apps.csv', HEADERS, [templateRow(number) for number in range(3)])
+    loaded = subprocess.check_output([sys.executable, '-c', "import sys\n"
+                                                              "sys.path.insert(0, sys.argv[1])\n"
+                                                              "from fodupload.cli import main\n"
+                                                              "main(sys.argv[2:])\n"
+                                                              "print('asyncio' in sys.modules)",
+                                      REPO_DIR, sheetPath, 'key', 'secret', '-d', '-q', '--api-url', mockFod.url, '--rate', '100000/s', '--cache-ttl', '0'])
+    assert loaded.decode().strip() == "False"
+    assert len(mockFod.state.scanSetups) == 3
+
+def testPackageRunsAsAModule():
+    usage = subprocess.check_output([sys.executable, '-m', 'fodupload', '--help'], cwd=REPO_DIR).decode()
+    assert usage.startswith("usage: ")
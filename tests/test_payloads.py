@@ -0,0 +1,36 @@
+import json
+
+from fodupload import DynamicScanSettings, ImportRow, TEMPLATE_COLUMNS, applicationPayload, dynamicFormRequest, generateSiteAvailability, releasePayload
+from sheets import COLUMN, templateRow
+
+def importRow(values):
+    return ImportRow(2, dict(zip([field for field, header in TEMPLATE_COLUMNS], values)))
+
+def testPayloadsEscapeWhatTheFileHas():
+    values = templateRow(0)
+    values[COLUMN['applicationName']] = 'App "Zero" \\ main'
+    values[COLUMN['releaseName']] = 'R1 "beta"'
+    row = importRow(values)
+    assert json.loads(applicationPayload(row, '1000', [{'id': 7, 'value': 72}])) == {
+        'applicationName': 'App "Zero" \\ main', 'applicationType': 'Web_Thick_Client', 'releaseName': 'R1 "beta"', 'ownerId': 1000,
+        'businessCriticalityType': 'High', 'attributes': [{'id': 7, 'value': 72}], 'sdlcStatusType': 'QA'}
+    assert json.loads(releasePayload(row, 100)) == {'applicationId': 100, 'releaseName': 'R1 "beta"', 'releaseDescription': "", 'copyState': False,
+                                                    'sdlcStatusType': 'QA'}
+
+def testScanSetupPayload():
+    values = templateRow(0)
+    values[COLUMN['exclusions']] = ''
+    values[COLUMN['siteAvailability']] = 'Monday:0800-1700;'
+    path, payload = dynamicFormRequest(500, DynamicScanSettings(importRow(values)))
+    assert path == '/api/v3/releases/500/dynamic-scans/scan-setup'
+    payload = json.loads(payload)
+    assert payload['blockout'] == json.loads(generateSiteAvailability('Monday:0800-1700;'))
+    assert (payload['exclusionsList'], payload['restrictToDirectoryAndSubdirectories'], payload['multiFactorAuth']) == ([], True, False)
+    assert (payload['assessmentTypeId'], payload['repeatScheduleType'], payload['entitlementFrequencyType']) == (268, 'NoRepeat', 'Subscription')
+    assert 'primaryUserPassword' not in payload
+
+def testRowsWithOneScheduleShareItsBlockoutJson():
+    first, second = templateRow(0), templateRow(1)
+    second[COLUMN['siteAvailability']] = ' all day '
+    assert DynamicScanSettings(importRow(first)).blockout is DynamicScanSettings(importRow(second)).blockout
+    assert dynamicFormRequest(1, DynamicScanSettings(importRow(first)))[1].endswith(',"blockout":' + generateSiteAvailability('ALL DAY') + '}')
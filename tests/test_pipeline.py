@@ -0,0 +1,55 @@
+import threading
+import time
+
+import pytest
+
+from fakeapi import FakeTenant
+from fodupload import AddApplications, ImportJournal, LocalCache, PipelineStage, parseStageWorkers
+from sheets import HEADERS, templateRow, writeCsv
+
+def testStageWorkersDefaultToWorkers():
+    assert parseStageWorkers([], 3) == {'resolve': 3, 'create': 3, 'release': 1, 'dynamic': 3}
+    assert parseStageWorkers(['create=4,dynamic=2', 'release=2'], 1) == {'resolve': 1, 'create': 4, 'release': 2, 'dynamic': 2}
+
+@pytest.mark.parametrize('spec', ['upload=2', 'create', 'create=0', 'create=two'])
+def testBadStageWorkersRaiseValueError(spec):
+    with pytest.raises(ValueError, match="should look like create=4"):
+        parseStageWorkers([spec], 1)
+
+def testFullQueueHoldsBackWhoeverFeedsIt():
+    release = threading.Event()
+    handled = []
+    stage = PipelineStage('create', lambda task: (release.wait(5), handled.append(task)), 1, queueSize=2)
+    stage.start()
+    feeder = threading.Thread(target=lambda: [stage.put(task) for task in range(6)])
+    feeder.start()
+    #One row is being handled and two are queued, so the feeder waits to hand over the fourth
+    time.sleep(0.2)
+    assert feeder.is_alive() and stage.queue.qsize() == 2 and handled == []
+    release.set()
+    feeder.join(5)
+    stage.finish()
+    assert handled == list(range(6)) and stage.handled == 6
+
+def testBatchStageTakesUpToBatchSizeRows():
+    batches = []
+    stage = PipelineStage('release', batches.append, 1, batchSize=5, maxWait=0.05)
+    stage.start()
+    for task in range(12):
+        stage.put(task)
+    stage.finish()
+    assert sorted(task for batch in batches for task in batch) == list(range(12))
+    assert all(len(batch) <= 5 for batch in batches) and len(batches) >= 3
+
+def testEveryRowPassesTheStagesItNeeds(tmp_path):
+    rows = [templateRow(number) for number in range(20)]
+    #A row without a required value fails in the parse stage, and an unknown owner in the resolve stage
+    rows[3][0] = ''
+    rows[4][5] = 'Nobody'
+    path = writeCsv(tmp_path / 'apps.csv', HEADERS, rows)
+    tenant = FakeTenant()
+    AddApplications(path, 'key', 'secret', 2, tenant, LocalCache(None), 100, ImportJournal(str(tmp_path / 'journal.db'), path),
+                    parseStageWorkers(['create=3,dynamic=2'], 2), 4, fillDynamicForm=True)
+    assert len(tenant.applications) == 18 and len(tenant.scanSetups) == 18
+    journal = ImportJournal(str(tmp_path / 'journal.db'), path, resume=True)
+    assert journal.summary().endswith(": 18 applications, 18 releases, 18 dynamic forms filled out, 0 dynamic forms failed")
@@ -0,0 +1,48 @@
+import threading
+import time
+
+import pytest
+
+from fodupload import RateLimiter, RowProgress
+
+def testRateLimiterParsesSpecs():
+    limiter = RateLimiter.fromSpecs(['applications=30/min', '5/s', 'scan-setup = 2 / hour'])
+    assert limiter.rates == {'*': 5.0, 'applications': 0.5, 'scan-setup': 2 / 3600.0}
+    assert RateLimiter.fromSpecs([]).rates == {'*': 2.0}
+
+@pytest.mark.parametrize('spec', ['apps=2/s', '2/fortnight', 'fast', '=2/s'])
+def testRateLimiterRejectsBadSpecs(spec):
+    with pytest.raises(ValueError):
+        RateLimiter.fromSpecs([spec])
+
+def testRateLimiterAllowsABurstThenSpacesRequests():
+    #A bucket holds one second of requests, so at 20/s the first 20 go at once and the next 5 take a quarter of a second
+    limiter = RateLimiter({'*': 20.0})
+    started = time.monotonic()
+    for request in range(20):
+        limiter.acquire('applications')
+    assert time.monotonic() - started < 0.1
+    for request in range(5):
+        limiter.acquire('applications')
+    assert time.monotonic() - started >= 0.2
+
+def testRateLimiterKeepsABucketPerEndpoint():
+    limiter = RateLimiter({'*': 1.0, 'users': 0})
+    started = time.monotonic()
+    for endpoint in RateLimiter.ENDPOINTS:
+        limiter.acquire(endpoint)
+    #No limit at all for users
+    for request in range(10):
+        limiter.acquire('users')
+    assert time.monotonic() - started < 0.5
+
+def testRowProgressCountsRowsFromEveryWorker():
+    progress = RowProgress(40)
+    percentages = []
+    workers = [threading.Thread(target=lambda: percentages.extend(progress.advance() for row in range(10))) for worker in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert progress.doneRows == 40
+    assert any('100' in str(percentage) for percentage in percentages)
@@ -0,0 +1,60 @@
+#The reconcile command against the mock FoD API, after an import of the same file
+import json
+
+import pytest
+
+from fodupload import main
+from sheets import COLUMN, HEADERS, templateRow, writeCsv
+
+def importThenReconcile(server, rows, workDirectory, change=None):
+    #Imports the rows, lets change() alter the mock tenant, and returns reconcile's exit code and JSON report
+    sheetPath = writeCsv(workDirectory / 'apps.csv', HEADERS, rows)
+    arguments = [sheetPath, 'test-key', 'test-secret', '-d', '--api-url', server.url, '--rate', '100000/s', '--cache-ttl', '0', '-q']
+    main(arguments)
+    if change is not None:
+        change(server.state)
+    reportPath = str(workDirectory / 'reconcile.json')
+    with pytest.raises(SystemExit) as stopped:
+        main(['reconcile'] + arguments + ['--report', reportPath])
+    with open(reportPath, encoding='utf-8') as reportFile:
+        return stopped.value.code, dict((line['applicationName'], line) for line in json.load(reportFile))
+
+def applicationNamed(state, name):
+    return [application for application in state.applications.values() if application['applicationName'] == name][0]
+
+def releaseOf(state, name):
+    return [releaseId for releaseId, release in state.releases.items() if release['applicationName'] == name][0]
+
+def testImportedRowsAreMatched(mockFod, workDirectory):
+    code, report = importThenReconcile(mockFod, [templateRow(number) for number in range(4)], workDirectory)
+    assert code == 0
+    assert [line['status'] for line in report.values()] == ['matched'] * 4
+    assert all(line['journal'] == 'imported' and line['releaseId'] for line in report.values())
+    #A listing of each, and a scan setup for every row: no request per application
+    assert mockFod.state.calls['GET /api/v3/releases/{id}/dynamic-scans/scan-setup'] == 4
+
+def testWhatChangedInFoDIsReported(mockFod, workDirectory):
+    def change(state):
+        applicationNamed(state, 'App 0')['businessCriticalityType'] = 'Low'
+        del state.releases[releaseOf(state, 'App 1')]
+        state.scanSetups[releaseOf(state, 'App 2')]['timeZone'] = 'UTC'
+        #The blockout is compared as well, though the import splices it in to the payload as JSON text
+        state.scanSetups[releaseOf(state, 'App 3')]['blockout'][0]['hourBlocks'][3]['checked'] = False
+    code, report = importThenReconcile(mockFod, [templateRow(number) for number in range(5)], workDirectory, change)
+    assert code == 1
+    assert report['App 0']['status'] == 'mismatched' and report['App 0']['details'] == ["Business Criticality: file has High, FoD has Low"]
+    assert report['App 1']['status'] == 'missing' and "Release R1 not in FoD" in report['App 1']['details']
+    assert report['App 2']['details'] == ["Dynamic scan setup differs in timeZone"]
+    assert report['App 3']['details'] == ["Dynamic scan setup differs in blockout"]
+    assert report['App 4']['status'] == 'matched'
+
+def testUnreadableDynamicColumnsAreAnErrorOfTheirRow(mockFod, workDirectory):
+    def change(state):
+        #Rewritten after the import, as the import would have turned the row down
+        rows[1][COLUMN['siteAvailability']] = 'Someday:0800-1700'
+        writeCsv(workDirectory / 'apps.csv', HEADERS, rows)
+    rows = [templateRow(number) for number in range(3)]
+    code, report = importThenReconcile(mockFod, rows, workDirectory, change)
+    assert code == 1
+    assert report['App 1']['status'] == 'error' and report['App 1']['details'][0].startswith("Dynamic scan columns: ")
+    assert report['App 0']['status'] == report['App 2']['status'] == 'matched'
@@ -0,0 +1,26 @@
+import sqlite3
+
+from fakeapi import FakeClient, FakeTenant
+from fodupload import AddApplications, ImportJournal, LocalCache, lookupReleases
+from sheets import HEADERS, templateRow, writeCsv
+
+def releaseLookups(client):
+    return [call[2]['filters'] for call in client.calls if call[1] == '/api/v3/releases' and 'filters' in call[2]]
+
+def testReleasesOfSeveralApplicationsAreOneRequest():
+    client = FakeClient({'/api/v3/releases': [{'releaseId': 5000 + number, 'applicationId': number % 30, 'releaseName': 'R' + str(number)} for number in range(60)]})
+    found = lookupReleases(client, range(25))
+    #The first release listed for an application is the one it was created with
+    assert found == dict((str(number), 5000 + number) for number in range(25))
+    assert len(releaseLookups(client)) == 1 and len(releaseLookups(client)[0].split('|')) == 25
+
+def testNewApplicationsDontGetAReleaseRequestEach(tmp_path):
+    path = writeCsv(tmp_path / 'apps.csv', HEADERS, [templateRow(number) for number in range(30)])
+    tenant = FakeTenant()
+    AddApplications(path, 'key', 'secret', 4, tenant, LocalCache(None), 100, ImportJournal(str(tmp_path / 'journal.db'), path))
+    assert len(tenant.applications) == 30
+    assert [call for call in tenant.calls if call[1].endswith('/releases') and call[1] != '/api/v3/releases'] == []
+    assert 1 <= len(releaseLookups(tenant)) <= 3
+    #Every row's release still reaches the journal
+    journal = sqlite3.connect(str(tmp_path / 'journal.db'))
+    assert journal.execute("SELECT COUNT(releaseId) FROM rows").fetchone()[0] == 30
@@ -0,0 +1,143 @@
+import datetime
+import email.utils
+import os
+import stat
+import time
+
+import pytest
+
+import fodupload.client
+from fakeapi import FakeResponse
+from fodupload import CircuitBreaker, DeadLetterFile, FodClient, RetryPolicy, RowReader
+from sheets import HEADERS, templateRow, writeCsv
+
+class ConnectTimeout(Exception):
+    pass
+
+class ReadTimeout(Exception):
+    pass
+
+def statusResponse(statusCode, headers=None):
+    return FakeResponse(statusCode, {}, headers)
+
+#RetryPolicy
+
+@pytest.mark.parametrize('method, endpoint, statusCode, expected', [
+    ('POST', 'applications', 500, None),
+    ('POST', 'releases', 502, None),
+    ('POST', 'applications', 429, '429'),
+    ('POST', 'releases', 503, '503'),
+    ('POST', 'token', 500, '500'),
+    ('GET', 'releases', 500, '500'),
+    ('PUT', 'scan-setup', 504, '504'),
+    ('GET', 'users', 404, None),
+    ('PUT', 'applications', 422, None),
+])
+def testRetryReasonForResponses(method, endpoint, statusCode, expected):
+    assert RetryPolicy().reason(method, endpoint, statusResponse(statusCode)) == expected
+
+def testRetryReasonForErrors():
+    #A POST is only sent again when the connection was never made, as FoD may have acted on one that timed out reading the response
+    policy = RetryPolicy()
+    assert policy.reason('POST', 'applications', error=ConnectTimeout()) == 'ConnectTimeout'
+    assert policy.reason('POST', 'applications', error=ReadTimeout()) is None
+    assert policy.reason('GET', 'applications', error=ReadTimeout()) == 'ReadTimeout'
+
+def testRetryAfterSeconds():
+    assert RetryPolicy.retryAfter(statusResponse(429, {'Retry-After': '120'})) == 120.0
+    assert RetryPolicy.retryAfter(statusResponse(429, {'Retry-After': ' 1.5 '})) == 1.5
+    assert RetryPolicy.retryAfter(statusResponse(429)) is None
+    assert RetryPolicy.retryAfter(statusResponse(429, {'Retry-After': 'soon'})) is None
+    assert RetryPolicy.retryAfter(None) is None
+
+def testRetryAfterHttpDate():
+    now = datetime.datetime.now(datetime.timezone.utc)
+    later = email.utils.format_datetime(now + datetime.timedelta(seconds=90), usegmt=True)
+    earlier = email.utils.format_datetime(now - datetime.timedelta(seconds=90), usegmt=True)
+    assert 80 < RetryPolicy.retryAfter(statusResponse(503, {'Retry-After': later})) <= 90
+    assert RetryPolicy.retryAfter(statusResponse(503, {'Retry-After': earlier})) == 0.0
+
+def testRetryDelayWaitsOutRetryAfter():
+    policy = RetryPolicy(attempts=3, baseDelay=0.5, maxDelay=2)
+    assert all(0 <= policy.delay(attempt) <= 2 for attempt in range(1, 10))
+    assert policy.delay(1, statusResponse(429, {'Retry-After': '30'})) == 30.0
+
+def scriptedClient(monkeypatch, statuses, attempts=3):
+    #A FodClient whose requests get the given statuses in turn, and that doesn't really wait between them
+    client = FodClient('https://fod.example.com', retry=RetryPolicy(attempts=attempts, baseDelay=0.5, maxDelay=2))
+    sent = []
+    def send(endpoint, method, path, **kwargs):
+        sent.append(method + ' ' + path)
+        return statusResponse(statuses[len(sent) - 1])
+    monkeypatch.setattr(client, 'send', send)
+    waited = []
+    monkeypatch.setattr(fodupload.client, 'sleep', waited.append)
+    return client, sent, waited
+
+def testClientSendsAFailedRequestAgain(monkeypatch):
+    client, sent, waited = scriptedClient(monkeypatch, [503, 500, 200])
+    assert client.get('/api/v3/users').status_code == 200
+    assert len(sent) == 3 and len(waited) == 2
+
+def testClientReturnsTheLastResponseWhenItGivesUp(monkeypatch):
+    client, sent, waited = scriptedClient(monkeypatch, [503, 503, 503, 200])
+    assert client.get('/api/v3/users').status_code == 503
+    assert len(sent) == 3
+
+def testClientDoesNotCreateAnythingTwice(monkeypatch):
+    #FoD may have created the application before it failed, so the POST is not sent again
+    client, sent, waited = scriptedClient(monkeypatch, [500, 201])
+    assert client.request('Post', '/api/v3/applications', data='{}').status_code == 500
+    assert sent == ['Post /api/v3/applications'] and waited == []
+
+#CircuitBreaker
+
+def testCircuitOpensAfterTheThreshold():
+    breaker = CircuitBreaker('applications', failureThreshold=3, resetSeconds=60)
+    breaker.failed()
+    breaker.failed()
+    assert breaker.reserve() == 0
+    breaker.failed()
+    assert 59 < breaker.reserve() <= 60
+
+def testResponsesOtherThanServerErrorsResetTheCount():
+    breaker = CircuitBreaker('applications', failureThreshold=2, resetSeconds=60)
+    breaker.failed()
+    breaker.finished(statusResponse(422))
+    breaker.finished(statusResponse(500))
+    assert breaker.reserve() == 0
+
+def testOneRequestTriesTheEndpointAgain():
+    breaker = CircuitBreaker('applications', failureThreshold=1, resetSeconds=0.05)
+    breaker.failed()
+    time.sleep(0.06)
+    assert breaker.reserve() == 0
+    #While the probe is out, everyone else waits
+    assert breaker.reserve() > 0
+    breaker.failed()
+    assert breaker.reserve() > 0
+    time.sleep(0.06)
+    assert breaker.reserve() == 0
+    breaker.finished(statusResponse(200))
+    assert breaker.reserve() == 0 and breaker.reserve() == 0
+
+def testThresholdOfZeroTurnsTheCircuitOff():
+    breaker = CircuitBreaker('applications', failureThreshold=0, resetSeconds=60)
+    for attempt in range(10):
+        breaker.failed()
+    assert breaker.reserve() == 0
+
+#DeadLetterFile
+
+def testDeadLetterRowsCanBeImportedAgain(tmp_path):
+    rows = list(RowReader(writeCsv(tmp_path / 'apps.csv', HEADERS, [templateRow(number) for number in range(3)])))
+    deadLetter = DeadLetterFile(str(tmp_path / 'log' / 'FodDeadLetter.jsonl')).start()
+    deadLetter.add(rows[0], "ValueError('Creating application App 0 failed')")
+    deadLetter.add(rows[2], "The dynamic scan form was not filled out")
+    assert stat.S_IMODE(os.stat(deadLetter.path).st_mode) == 0o600
+    replayed = list(RowReader(deadLetter.path))
+    assert [row.applicationName for row in replayed] == ['App 0', 'App 2']
+    assert replayed[1].attributes == rows[2].attributes
+    #An import starts with an empty file
+    DeadLetterFile(deadLetter.path).start()
+    assert not os.path.exists(deadLetter.path)
@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+from fodupload import TEMPLATE_COLUMNS, ImportFileError, RowReader
+from sheets import HEADERS, templateRow, writeCsv
+
+def testRowReaderMapsHeaders(tmp_path):
+    #Headers match on their letters and digits without what is in brackets, and other columns are custom attributes
+    headers = ['application name', 'Business Criticality', 'applicationType', 'RELEASE NAME', 'SDLC Status', 'Release Owner', 'Business Units']
+    path = writeCsv(tmp_path / 'rows.csv', headers, [['App 1', 'High', 'Web/Thick Client', 'R1', 'QA/Test', 'User1', 'Bank'],
+                                                     ['', '', '', '', '', '', ''],
+                                                     ['App 2', 'Low', 'Web/Thick Client', 'R2', 'Production', 'User2']])
+    rows = list(RowReader(path))
+    assert [row.rowNumber for row in rows] == [2, 4]
+    assert [rows[0].get(field) for field in ('applicationName', 'businessCriticality', 'sdlcStatus', 'releaseOwner')] == ['App 1', 'High', 'QA/Test', 'User1']
+    assert dict(rows[0].attributes) == {'Business Units': 'Bank'}
+    #A short line leaves the rest of its columns empty
+    assert rows[1].get('dynamicSiteUrl') == ""
+    assert dict(rows[1].attributes) == {'Business Units': ''}
+
+def testXlsxCsvAndJsonLinesReadTheSame(tmp_path):
+    openpyxl = pytest.importorskip('openpyxl')
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = 'Sheet1'
+    sheet.append(HEADERS)
+    for number in range(3):
+        sheet.append(templateRow(number))
+    #Spreadsheets give numbers as floats and booleans as bools, which are read back the way they were typed
+    sheet.cell(row=2, column=HEADERS.index('Subscription') + 1, value=True)
+    sheet.cell(row=3, column=HEADERS.index('Release Name') + 1, value=2.0)
+    workbook.save(str(tmp_path / 'rows.xlsx'))
+
+    rows = [templateRow(number) for number in range(3)]
+    rows[1][HEADERS.index('Release Name')] = '2'
+    writeCsv(tmp_path / 'rows.csv', HEADERS, rows)
+    with open(str(tmp_path / 'rows.jsonl'), 'w', encoding='utf-8') as jsonFile:
+        for row in rows:
+            jsonFile.write(json.dumps(dict(zip(HEADERS, row))) + '\n')
+
+    def read(name):
+        return [(row.rowNumber, [row.get(field) for field, header in TEMPLATE_COLUMNS], dict(row.attributes))
+                for row in RowReader(str(tmp_path / name), requireDynamic=True)]
+    assert read('rows.xlsx') == read('rows.csv')
+    #A JSON Lines file has no header line, so its first row is line 1
+    assert [(rowNumber + 1, fields, attributes) for rowNumber, fields, attributes in read('rows.jsonl')] == read('rows.csv')
+    assert read('rows.csv')[1][1][3] == '2'
+
+def testRowReaderRejectsDuplicateColumns(tmp_path):
+    path = writeCsv(tmp_path / 'rows.csv', HEADERS + ['applicationName'], [templateRow(0) + ['App 0']])
+    with pytest.raises(ImportFileError, match="'applicationName' appears more than once"):
+        RowReader(path)
+
+def testRowReaderRejectsMissingColumns(tmp_path):
+    headers = [header for header in HEADERS if not header.startswith(('Release Owner', 'Time Zone'))]
+    path = writeCsv(tmp_path / 'rows.csv', headers, [])
+    with pytest.raises(ImportFileError, match=r"missing the column\(s\): Release Owner \(FOD Username\)$"):
+        RowReader(path)
+    with pytest.raises(ImportFileError, match=r"Release Owner \(FOD Username\), Time Zone$"):
+        RowReader(path, requireDynamic=True)
+
+def testRowReaderRejectsEmptyAndUnknownFiles(tmp_path):
+    (tmp_path / 'empty.csv').write_text('')
+    with pytest.raises(ImportFileError, match="is empty"):
+        RowReader(str(tmp_path / 'empty.csv'))
+    with pytest.raises(ImportFileError, match="Unsupported import file type '.txt'"):
+        RowReader(str(tmp_path / 'rows.txt'))
+    (tmp_path / 'rows.jsonl').write_text('{"Application Name": "App 0"\n')
+    with pytest.raises(ImportFileError, match="Line 1 of .* is not valid JSON"):
+        list(RowReader(str(tmp_path / 'rows.jsonl')))
@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+from fodupload import DAYS, generateSiteAvailability
+
+def oldSiteAvailability(availabilityCell):
+    #generateSiteAvailability as it was before the blockout was built from a week mask: the first window of each day, whole hours only
+    checked = availabilityCell == 'ALL DAY' or availabilityCell == ""
+    avail = [{'day': day, 'hourBlocks': [{'hour': hour, 'checked': checked} for hour in range(24)]} for day in DAYS]
+    if checked:
+        return json.dumps(avail)
+    for dayIndex, day in enumerate(DAYS):
+        if availabilityCell.find(day) != -1:
+            dayStart = availabilityCell.find(day)
+            dayEnd = availabilityCell.find(';', dayStart)
+            timeStart = availabilityCell.find(':', dayStart)
+            timeSplit = availabilityCell.find('-', dayStart)
+            startTime = availabilityCell[timeStart + 1:timeSplit][0:2]
+            endTime = availabilityCell[timeSplit + 1:dayEnd][0:2]
+            try:
+                startTime = int(startTime)
+            except ValueError:
+                startTime = 0
+            for hour in range(startTime, int(endTime)):
+                avail[dayIndex]['hourBlocks'][hour]['checked'] = True
+    return json.dumps(avail)
+
+@pytest.mark.parametrize('availabilityCell', ['ALL DAY', '', 'Monday:0800-1700;Tuesday:0900-1200;', 'Saturday:0000-2400;Sunday:0000-2400;',
+                                              'Wednesday:-1700;', 'Friday:1300-1700', 'Sunday:0000-0100;Thursday:2200-2400;'])
+def testBlockoutMatchesOldGenerateSiteAvailability(availabilityCell):
+    assert json.loads(generateSiteAvailability(availabilityCell)) == json.loads(oldSiteAvailability(availabilityCell))
+
+def testBlockoutIsBuiltOncePerSchedule():
+    #Cells that only differ in spaces and case share the one cached blockout
+    assert generateSiteAvailability(' monday : 0800-1700 ; ') is generateSiteAvailability('Monday:0800-1700;')
+    assert generateSiteAvailability('all day') is generateSiteAvailability('ALL DAY')
+
+def testBlockoutTakesSeveralWindowsAndClockForms():
+    blockout = json.loads(generateSiteAvailability('Mon:08:00-12:00,13-1730;'))
+    monday = [block['hour'] for block in blockout[DAYS.index('Monday')]['hourBlocks'] if block['checked']]
+    #13:00 to 17:30 leaves the hour from 17:00 unavailable, as blockouts are whole hours
+    assert monday == [8, 9, 10, 11, 13, 14, 15, 16]
+    assert not any(block['checked'] for day in blockout if day['day'] != 'Monday' for block in day['hourBlocks'])
+
+@pytest.mark.parametrize('availabilityCell', ['Someday:0800-1700;', 'Monday:0800;', 'Monday:1700-0800;', 'Monday:0870-0900;', 'Monday:2500-2600;'])
+def testUnreadableSiteAvailabilityRaisesValueError(availabilityCell):
+    with pytest.raises(ValueError):
+        generateSiteAvailability(availabilityCell)
@@ -0,0 +1,71 @@
+#--sync against the mock FoD API: a second run sends only what changed in the file since the first
+import os
+import sqlite3
+
+from fodupload import main
+from sheets import COLUMN, HEADERS, templateRow, writeCsv
+
+def syncRow(number, **changes):
+    #A template row whose criticality, SDLC status, exclusions and site availability vary with its number, as rows of a real file do
+    row = templateRow(number)
+    row[COLUMN['businessCriticality']]  = ['High', 'Medium', 'Low'][number % 3]
+    row[COLUMN['sdlcStatus']]           = ['Development', 'QA/Test', 'Production'][number % 3]
+    row[COLUMN['exclusions']]           = '/logout;/admin' if number % 2 else ''
+    row[COLUMN['siteAvailability']]     = ['ALL DAY', 'Monday:0800-1700;Tuesday:0900-1200;'][number % 2]
+    for field, value in changes.items():
+        row[COLUMN[field]] = value
+    return row
+
+def runImport(server, sheetPath, *arguments):
+    main([sheetPath, 'test-key', 'test-secret', '--api-url', server.url, '--rate', '100000/s', '--cache-ttl', '0', '-q', '-d', '--sync'] + list(arguments))
+    with server.state.lock:
+        return dict(server.state.calls)
+
+def callsSince(before, after, endpoint):
+    return after.get(endpoint, 0) - before.get(endpoint, 0)
+
+def testSyncOnlySendsWhatChanged(mockFod, workDirectory):
+    rows = [syncRow(number) for number in range(6)]
+    sheetPath = writeCsv(workDirectory / 'apps.csv', HEADERS, rows)
+    calls = runImport(mockFod, sheetPath)
+    assert calls.get('POST /api/v3/applications') == 6
+    assert calls.get('PUT /api/v3/releases/{id}/dynamic-scans/scan-setup') == 6
+
+    #Nothing has changed, so nothing is sent
+    unchanged = runImport(mockFod, sheetPath)
+    for endpoint in ('POST /api/v3/applications', 'POST /api/v3/releases', 'PUT /api/v3/applications/{id}', 'PUT /api/v3/releases/{id}',
+                     'PUT /api/v3/releases/{id}/dynamic-scans/scan-setup'):
+        assert callsSince(calls, unchanged, endpoint) == 0, endpoint
+
+    #One business criticality, one site availability and one owner changed, a release added and a row gone
+    rows[0] = syncRow(0, businessCriticality='Low')
+    rows[1] = syncRow(1, siteAvailability='ALL DAY')
+    rows[2] = syncRow(2, releaseOwner='User40')
+    rows[5] = syncRow(3, releaseName='R2')
+    writeCsv(sheetPath, HEADERS, rows)
+    changed = runImport(mockFod, sheetPath)
+    assert callsSince(unchanged, changed, 'POST /api/v3/applications') == 0
+    assert callsSince(unchanged, changed, 'POST /api/v3/releases') == 1
+    #The index can't tell whether custom attributes differ, so they are sent with any other change to their row's columns
+    assert callsSince(unchanged, changed, 'PUT /api/v3/applications/{id}') == 2
+    assert callsSince(unchanged, changed, 'PUT /api/v3/releases/{id}') == 1
+    assert callsSince(unchanged, changed, 'PUT /api/v3/releases/{id}/dynamic-scans/scan-setup') == 2
+
+    applications = dict((application['applicationName'], application) for application in mockFod.state.applications.values())
+    assert applications['App 0']['businessCriticalityType'] == 'Low'
+    assert [release['ownerId'] for release in mockFod.state.releases.values() if release['applicationName'] == 'App 2'] == [140]
+    #App 5 is reported as gone from the file, and forgotten by the sync, but not deleted from FoD
+    assert len(mockFod.state.applications) == 6
+    connection = sqlite3.connect(os.path.join('log', 'FodImport.db'))
+    synced = connection.execute("SELECT applicationName, releaseName FROM synced ORDER BY applicationName, releaseName").fetchall()
+    connection.close()
+    assert synced == [('App 0', 'R1'), ('App 1', 'R1'), ('App 2', 'R1'), ('App 3', 'R1'), ('App 3', 'R2'), ('App 4', 'R1')]
+
+def testTheApplicationTypeIsOnlyWarnedAbout(mockFod, workDirectory, caplog):
+    sheetPath = writeCsv(workDirectory / 'apps.csv', HEADERS, [syncRow(0)])
+    runImport(mockFod, sheetPath)
+    writeCsv(sheetPath, HEADERS, [syncRow(0, applicationType='Mobile')])
+    before = dict(mockFod.state.calls)
+    runImport(mockFod, sheetPath)
+    assert callsSince(before, mockFod.state.calls, 'PUT /api/v3/applications/{id}') == 0
+    assert "its Application Type can't be changed to Mobile through the API" in open(os.path.join('log', 'FodImport.log'), encoding='utf-8').read()
@@ -0,0 +1,105 @@
+import asyncio
+import os
+import stat
+import threading
+import time
+
+import pytest
+
+from fakeapi import AsyncFakeClient, FakeClient, FakeResponse, FakeTenant
+from fodupload import (AddApplications, AddApplicationsAsync, AuthenticationError, FodClient, ImportJournal, LocalCache, TokenManager,
+                       TOKEN_REFRESH_MARGIN, main)
+from sheets import HEADERS, templateRow, writeCsv
+
+def tokenClient(expiresIn=3600, delay=0):
+    #A FakeClient whose token endpoint hands out token1, token2, ... each with the given lifetime
+    issued = []
+    def token(match, kwargs):
+        time.sleep(delay)
+        issued.append(kwargs['data'])
+        return 200, {'access_token': 'token' + str(len(issued)), 'token_type': 'bearer', 'expires_in': expiresIn}
+    return FakeClient(routes={('POST', '/oauth/token'): token}), issued
+
+@pytest.mark.parametrize('expiresIn, margin', [(3600, TOKEN_REFRESH_MARGIN), (100, 20)])
+def testTokenIsReplacedBeforeItExpires(expiresIn, margin):
+    client, issued = tokenClient(expiresIn)
+    tokens = TokenManager(client, 'key', 'secret')
+    before = time.time()
+    assert tokens.token() == 'token1'
+    assert before + expiresIn - margin <= tokens.refreshAt <= time.time() + expiresIn - margin
+
+    #Inside the margin the token is replaced, and not before
+    tokens.refreshAt = time.time() + 1
+    assert tokens.token() == 'token1'
+    tokens.refreshAt = time.time() - 1
+    assert tokens.token() == 'token2'
+    assert len(issued) == 2
+
+def testConcurrentWorkersWaitForOneRefresh():
+    client, issued = tokenClient(delay=0.2)
+    tokens = TokenManager(client, 'key', 'secret')
+    seen = []
+    workers = [threading.Thread(target=lambda: seen.append(tokens.token())) for worker in range(8)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert seen == ['token1'] * 8
+    assert len(issued) == 1
+
+def testTokenIsSharedThroughThePrivateCache(tmp_path):
+    client, issued = tokenClient()
+    assert TokenManager(client, 'key', 'secret', LocalCache(str(tmp_path), 24, 'tenant')).token() == 'token1'
+    #Another run for the same tenant uses the cached token, one for another tenant authenticates
+    assert TokenManager(client, 'key', 'secret', LocalCache(str(tmp_path), 24, 'tenant')).token() == 'token1'
+    assert TokenManager(client, 'key', 'secret', LocalCache(str(tmp_path), 24, 'other')).token() == 'token2'
+    assert len(issued) == 2
+    if os.name == 'posix':
+        for name in os.listdir(str(tmp_path)):
+            assert stat.S_IMODE(os.stat(os.path.join(str(tmp_path), name)).st_mode) == 0o600
+
+def testRejectedTokenIsNotTakenFromTheCacheAgain(tmp_path):
+    client, issued = tokenClient()
+    cache = LocalCache(str(tmp_path), 24, 'tenant')
+    tokens = TokenManager(client, 'key', 'secret', cache)
+    assert tokens.token() == 'token1'
+    tokens.invalidate('token1')
+    assert tokens.token() == 'token2'
+    assert TokenManager(client, 'key', 'secret', cache).token() == 'token2'
+
+def testTurnedDownTokenIsReplacedAndTheRequestSentAgain():
+    client, issued = tokenClient()
+    fodClient = FodClient()
+    sent = []
+    def send(endpoint, method, path, **kwargs):
+        if endpoint == 'token':
+            return client.request(method, path, **kwargs)
+        sent.append(kwargs['headers']['authorization'])
+        return FakeResponse(401 if len(sent) == 1 else 200, {'items': [], 'totalCount': 0})
+    fodClient.send = send
+    fodClient.useTokenManager(TokenManager(client, 'key', 'secret'))
+    assert fodClient.get('/api/v3/users').status_code == 200
+    assert sent == ['Bearer token1', 'Bearer token2']
+
+def turnedDownTenant():
+    tenant = FakeTenant()
+    tenant.routes[('POST', '/oauth/token')] = lambda match, kwargs: (401, {'error': 'invalid_client'})
+    return tenant
+
+def testImportStopsWhenAuthenticationFails(tmp_path):
+    path = writeCsv(tmp_path / 'apps.csv', HEADERS, [templateRow(0)])
+    tenant = turnedDownTenant()
+    with pytest.raises(AuthenticationError):
+        AddApplications(path, 'key', 'secret', 1, tenant, LocalCache(None), 100, ImportJournal(':memory:', path))
+    with pytest.raises(AuthenticationError):
+        asyncio.run(AddApplicationsAsync(path, 'key', 'secret', 1, AsyncFakeClient(tenant), LocalCache(None), 100, ImportJournal(':memory:', path)))
+    assert [call[1] for call in tenant.calls] == ['/oauth/token', '/oauth/token']
+
+def testCommandLineExitsNonZeroWhenAuthenticationFails(tmp_path, monkeypatch):
+    import fodupload.client
+    path = writeCsv(tmp_path / 'apps.csv', HEADERS, [templateRow(0)])
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(fodupload.client, 'FodClient', lambda *args, **kwargs: turnedDownTenant())
+    with pytest.raises(SystemExit) as stopped:
+        main([path, 'key', 'secret'])
+    assert stopped.value.code == "Import stopped: Could not authenticate with the FoD API, so no rows were imported"
@@ -0,0 +1,80 @@
+from fakeapi import FakeClient
+from fodupload import LocalCache, collectOwners, getUsers, resolveOwners
+from sheets import COLUMN, HEADERS, templateRow, writeCsv
+
+def directory(count):
+    #The API's own order (here by name, Z first) is not the order users were added in
+    users = [{'userId': 1000 + number, 'userName': 'User' + str(number)} for number in range(count)]
+    return sorted(users, key=lambda user: user['userName'], reverse=True)
+
+def userOffsets(client):
+    return sorted(call[2]['offset'] for call in client.calls if call[1] == '/api/v3/users')
+
+def testUserPagesAreFetchedConcurrentlyInIdOrder():
+    client = FakeClient({'/api/v3/users': directory(230)})
+    users = getUsers(client, LocalCache(None), workers=2)
+    assert len(users) == 230 and users['user17'] == 1017
+    assert userOffsets(client) == [0, 50, 100, 150, 200]
+    assert all(call[2]['orderBy'] == 'userId' and call[2]['orderByDirection'] == 'ASC' for call in client.calls)
+
+def testOnlyUsersAddedSinceTheLastRunAreFetched(tmp_path):
+    client = FakeClient({'/api/v3/users': directory(230)})
+    getUsers(client, LocalCache(str(tmp_path), 24, 'tenant'))
+    #A user added since has the highest ID but a name the API's default order puts first
+    client.listings['/api/v3/users'].insert(0, {'userId': 5000, 'userName': 'AAA'})
+    client.calls = []
+    users = getUsers(client, LocalCache(str(tmp_path), 24, 'tenant'))
+    assert users['aaa'] == 5000 and len(users) == 231
+    #Only the last page the cache knew about is fetched again
+    assert userOffsets(client) == [200]
+
+def testUserCacheIsRebuiltWhenTheDirectoryNoLongerMatches(tmp_path):
+    client = FakeClient({'/api/v3/users': directory(230)})
+    getUsers(client, LocalCache(str(tmp_path), 24, 'tenant'))
+    #User229 is on the page that is fetched again, and now has another ID
+    for user in client.listings['/api/v3/users']:
+        if user['userName'] == 'User229':
+            user['userId'] = 9229
+    client.calls = []
+    users = getUsers(client, LocalCache(str(tmp_path), 24, 'tenant'))
+    assert users['user229'] == 9229
+    assert userOffsets(client) == [0, 50, 100, 150, 200, 200]
+    #Users removed from FoD make the cache rebuild too
+    del client.listings['/api/v3/users'][:10]
+    client.calls = []
+    assert len(getUsers(client, LocalCache(str(tmp_path), 24, 'tenant'))) == 220
+    assert userOffsets(client) == [0, 50, 100, 150, 200, 200]
+
+def filteredLookups(client):
+    return [call[2]['filters'] for call in client.calls if call[1] == '/api/v3/users' and 'filters' in call[2]]
+
+def testOwnersAreCollectedOnceEach(tmp_path):
+    rows = [templateRow(number) for number in range(5)]
+    for row, owner in zip(rows, ['Alice', 'alice', 'Bob', '', 'ALICE']):
+        row[COLUMN['releaseOwner']] = owner
+    path = writeCsv(tmp_path / 'rows.csv', HEADERS, rows)
+    assert collectOwners(path) == {'alice': 'Alice', 'bob': 'Bob'}
+
+def testFewOwnersAreLookedUpInBatches(tmp_path):
+    client = FakeClient({'/api/v3/users': directory(500)})
+    owners = dict(('user' + str(number), 'User' + str(number)) for number in range(22))
+    owners['nobody'] = 'Nobody'
+    users = resolveOwners(client, owners, LocalCache(str(tmp_path), 24, 'tenant'), workers=1, threshold=100)
+    #23 names are three filtered requests of at most ten names, and owners that don't exist in FoD are left out
+    assert len(filteredLookups(client)) == 3 and len(client.calls) == 3
+    assert all(len(lookup.split('|')) <= 10 for lookup in filteredLookups(client))
+    assert users['user21'] == 1021 and 'nobody' not in users
+    #The owners found are cached, so the next run only asks for the one still missing
+    client.calls = []
+    resolveOwners(client, owners, LocalCache(str(tmp_path), 24, 'tenant'), workers=1, threshold=100)
+    assert filteredLookups(client) == ['userName:Nobody']
+
+def testManyOwnersFetchTheWholeDirectory():
+    client = FakeClient({'/api/v3/users': directory(120)})
+    owners = dict(('user' + str(number), 'User' + str(number)) for number in range(30))
+    users = resolveOwners(client, owners, LocalCache(None), workers=1, threshold=20)
+    assert len(users) == 120 and filteredLookups(client) == []
+    #A threshold of 0 always fetches the directory
+    client.calls = []
+    resolveOwners(client, {'user1': 'User1'}, LocalCache(None), workers=1, threshold=0)
+    assert filteredLookups(client) == [] and len(client.calls) == 3
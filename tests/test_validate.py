@@ -0,0 +1,64 @@
+import csv
+
+from fakeapi import FakeTenant
+from fodupload import (AddApplications, ApplicationIndex, AttributeCatalog, ImportJournal, ImportRow, LocalCache, RowValidator, TEMPLATE_COLUMNS,
+                       ValidateApplications)
+from sheets import COLUMN, HEADERS, templateRow, writeCsv
+
+USERS = dict(('user' + str(number), 1000 + number) for number in range(60))
+
+def importRow(values, attributes=None):
+    return ImportRow(2, dict(zip([field for field, header in TEMPLATE_COLUMNS], values)), {'Business Units': 'Bank'} if attributes is None else attributes)
+
+def testTemplateRowHasNoProblems():
+    validator = RowValidator(USERS, AttributeCatalog(FakeTenant(), LocalCache(None)), fillDynamicForm=True)
+    assert validator.problems(importRow(templateRow(3))) == []
+
+def testEveryProblemOfARowIsReported():
+    values = templateRow(3)
+    values[COLUMN['applicationName']] = ''
+    values[COLUMN['businessCriticality']] = 'Extreme'
+    values[COLUMN['releaseOwner']] = 'Nobody'
+    values[COLUMN['dynamicSiteUrl']] = 'ftp://app3.example.com'
+    values[COLUMN['authenticationMode']] = 'FormsAuthentication'
+    row = importRow(values, {'Business Units': 'Farm', 'Region': ''})
+    catalog = AttributeCatalog(FakeTenant(), LocalCache(None))
+    problems = RowValidator(USERS, catalog).problems(row)
+    assert problems == ["No value for Application Name",
+                        "Business Criticality (High, Medium, Low) 'Extreme' should be one of High, Medium, Low",
+                        "Release owner 'Nobody' is not a FoD user",
+                        "'Farm' is not one of the values of custom attribute 'Business Units'"]
+    #The dynamic scan columns are only checked with -d
+    assert RowValidator(USERS, catalog, fillDynamicForm=True).problems(row)[len(problems):] == [
+        "Dynamic site URL 'ftp://app3.example.com' should start with http:// or https://",
+        "Authentication mode FormsAuthentication needs a primary username and password"]
+
+def testOwnerOfAnExistingApplicationIsNotChecked():
+    values = templateRow(3)
+    values[COLUMN['releaseOwner']] = 'Nobody'
+    applications = ApplicationIndex([{'applicationId': 100, 'applicationName': 'App 3'}], [])
+    catalog = AttributeCatalog(FakeTenant(), LocalCache(None))
+    assert RowValidator(USERS, catalog, applications=applications).problems(importRow(values)) == []
+    assert RowValidator(USERS, catalog).problems(importRow(values)) == ["Release owner 'Nobody' is not a FoD user"]
+
+def testValidateReportsProblemsWithoutChangingAnything(tmp_path):
+    rows = [templateRow(number) for number in range(3)]
+    rows[1][COLUMN['sdlcStatus']] = 'Retired'
+    path = writeCsv(tmp_path / 'apps.csv', HEADERS, rows)
+    tenant = FakeTenant()
+    reportPath = str(tmp_path / 'report' / 'validation.csv')
+    assert ValidateApplications(path, 'key', 'secret', tenant, LocalCache(None), 100, True, reportPath) == 1
+    assert [call[1] for call in tenant.calls if call[0] != 'GET'] == ['/oauth/token']
+    with open(reportPath, newline='', encoding='utf-8') as reportFile:
+        assert list(csv.reader(reportFile)) == [['Row', 'Application Name', 'Problem'],
+                                                ['3', 'App 1', "SDLC Status (Development, QA/Test, Production) 'Retired' should be one of Development, QA, Production"]]
+
+def testImportDropsInvalidRowsBeforeTheApi(tmp_path):
+    rows = [templateRow(number) for number in range(4)]
+    rows[2][COLUMN['applicationType']] = 'Mainframe'
+    path = writeCsv(tmp_path / 'apps.csv', HEADERS, rows)
+    tenant = FakeTenant()
+    AddApplications(path, 'key', 'secret', 1, tenant, LocalCache(None), 100, ImportJournal(':memory:', path))
+    #The row with an application type FoD doesn't have is never sent
+    assert [application['applicationName'] for application in tenant.applications] == ['App 0', 'App 1', 'App 3']
+    assert tenant.count('POST', '/api/v3/applications') == 3